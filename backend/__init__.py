@@ -16,7 +16,19 @@ from .models_db import (
 from .models_db import init_db
 from .models_db import NotInDBError
 
+from .schema import PageSchema, Property, ColumnBatch, SchemaError, notion_failures
+from .schema import SERIE_SCHEMA, SEANCE_SCHEMA, EXERCICE_SCHEMA, MUSCLE_GROUP_SCHEMA
+
+from .connection import ConnectionPool, PoolStats, get_pool
+from .cache import IdentityMap, ReferenceCache, get_reference_cache
+
 from .database import TursoDB, TursoCloud
 from .database import NotNullConstraintError, UniqueConstraintError
+from .push import PushScheduler, PushStats
+from .health import HealthImporter, ImportStats, iter_records
+from .rollups import refresh_rollups, rebuild_rollups
+from .progression import Progression, load_progression
+
+from .ratelimit import RateLimitedAsyncClient, RateLimitedClient, TokenBucket, AIMD, RequestMetrics
 
 from httpx import ConnectError, RemoteProtocolError
\ No newline at end of file
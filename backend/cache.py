@@ -0,0 +1,162 @@
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Callable, Generic, TypeVar
+from .connection import get_pool
+from .models import Exercice, MuscleGroup
+from settings import DB_PATH, logger
+
+
+T = TypeVar("T", Exercice, MuscleGroup)
+
+
+
+
+class IdentityMap(Generic[T]):
+    """Map d'identité bornée (LRU) indexée par ID Notion et par nom."""
+    def __init__(self, maxsize: int=512) -> None:
+        self.maxsize = maxsize
+        self._by_id: OrderedDict[str, T] = OrderedDict()
+        self._by_name: dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def get(self, id: str) -> T | None:
+        obj = self._by_id.get(id)
+        if obj is None:
+            self.misses += 1
+            return None
+        self._by_id.move_to_end(id)
+        self.hits += 1
+        return obj
+
+    def get_by_name(self, name: str) -> T | None:
+        id = self._by_name.get(name)
+        return self.get(id) if id is not None else None
+
+    def peek(self, key: str, by_name: bool=False) -> T | None:
+        """Comme `get`/`get_by_name`, sans toucher à l'ordre LRU ni aux compteurs"""
+        id = self._by_name.get(key) if by_name else key
+        return self._by_id.get(id) if id is not None else None
+
+    def add(self, obj: T) -> T:
+        self._by_id[obj.id] = obj
+        self._by_id.move_to_end(obj.id)
+        self._by_name[obj.name] = obj.id
+
+        while len(self._by_id) > self.maxsize:
+            _, evicted = self._by_id.popitem(last=False)
+            # Le nom peut désigner un autre objet homonyme, ajouté depuis
+            if self._by_name.get(evicted.name) == evicted.id:
+                del self._by_name[evicted.name]
+        return obj
+
+    def clear(self) -> None:
+        self._by_id.clear()
+        self._by_name.clear()
+
+
+
+class ReferenceCache:
+    """Cache des données de référence (exercices et groupes musculaires).
+
+    Le contenu est vidé dès que `meta.last_update` change pour `exercices` ou
+    `muscle_group`. Cette vérification est faite au plus une fois toutes les
+    `check_interval` secondes : entre deux vérifications, une lecture ne coûte
+    qu'un accès au dictionnaire.
+    """
+    TABLES = ("exercices", "muscle_group")
+
+    def __init__(self, db_path: str=DB_PATH, maxsize: int=512, check_interval: float=5.0) -> None:
+        self.db_path = db_path
+        self.check_interval = check_interval
+        self.exercices: IdentityMap[Exercice] = IdentityMap(maxsize)
+        self.muscle_groups: IdentityMap[MuscleGroup] = IdentityMap(maxsize)
+
+        self._token: tuple = None
+        self._checked_at = float("-inf")
+        self._generation = 0            # incrémenté à chaque vidage
+        self._lock = threading.RLock()
+
+
+    def _read_token(self) -> tuple:
+        with get_pool(self.db_path).read() as conn:
+            cur = conn.execute(
+                f"SELECT table_name, last_update FROM meta WHERE table_name IN ({', '.join('?' * len(self.TABLES))}) ORDER BY table_name",
+                self.TABLES
+            )
+            return tuple(cur.fetchall())
+
+    def validate(self) -> None:
+        """Vide le cache si les tables de référence ont été mises à jour depuis le dernier contrôle."""
+        now = monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+
+        token = self._read_token()
+        with self._lock:
+            if token != self._token:
+                if self._token is not None:
+                    logger.debug(f"Reference data changed, clearing cache: {token}")
+                self._clear()
+                self._token = token
+            self._checked_at = now
+
+    def invalidate(self) -> None:
+        """Vide le cache et force un nouveau contrôle de `meta` à la prochaine lecture."""
+        with self._lock:
+            self._clear()
+            self._token = None
+            self._checked_at = float("-inf")
+
+    def _clear(self) -> None:
+        self.exercices.clear()
+        self.muscle_groups.clear()
+        self._generation += 1
+
+    def _lookup(self, identity_map: IdentityMap[T], key: str, loader: Callable[[str], T], by_name: bool=False) -> T:
+        self.validate()
+        with self._lock:
+            obj = identity_map.get_by_name(key) if by_name else identity_map.get(key)
+            generation = self._generation
+        if obj is not None:
+            return obj
+
+        # Chargement hors verrou : un défaut de cache ne bloque pas les autres sessions
+        loaded = loader(key)
+        with self._lock:
+            obj = identity_map.peek(key, by_name)
+            if obj is not None:
+                # Chargé entre-temps par un autre thread : garder l'instance partagée
+                return obj
+            if generation != self._generation:
+                # Cache vidé pendant le chargement : l'objet lu est peut-être périmé
+                return loaded
+            return identity_map.add(loaded)
+
+    def exercice(self, id: str, loader: Callable[[str], Exercice]) -> Exercice:
+        return self._lookup(self.exercices, id, loader)
+
+    def exercice_by_name(self, name: str, loader: Callable[[str], Exercice]) -> Exercice:
+        return self._lookup(self.exercices, name, loader, by_name=True)
+
+    def muscle_group(self, id: str, loader: Callable[[str], MuscleGroup]) -> MuscleGroup:
+        return self._lookup(self.muscle_groups, id, loader)
+
+
+
+
+_caches: dict[str, ReferenceCache] = {}
+_caches_lock = threading.Lock()
+
+def get_reference_cache(path: str=DB_PATH) -> ReferenceCache:
+    """Retourne le cache de référence partagé du processus pour `path`."""
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = _caches[path] = ReferenceCache(path)
+        return cache
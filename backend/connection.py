@@ -0,0 +1,215 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from queue import LifoQueue, Empty
+from time import perf_counter
+from typing import Callable, Iterator
+from settings import DB_PATH, logger
+
+
+
+
+# Mode de journal de la base, persistant : fixé une fois à la création du pool
+JOURNAL_MODE = "WAL"
+
+# Profil PRAGMA appliqué à chaque connexion du pool
+PRAGMAS = {
+    "busy_timeout": 5000,           # ms d'attente sur un verrou avant SQLITE_BUSY
+    "cache_size": -64000,           # ~64 Mo de cache de pages par connexion
+    "mmap_size": 268435456,         # 256 Mo lus via mmap
+    "temp_store": "MEMORY",
+    "synchronous": "NORMAL",        # suffisant en WAL, un fsync par checkpoint
+}
+
+
+
+@dataclass
+class PoolStats:
+    """Métriques d'utilisation du pool de connexions."""
+    hits: int = 0           # connexion lecteur réutilisée
+    misses: int = 0         # nouvelle connexion lecteur ouverte
+    waits: int = 0          # attente d'une connexion libre (pool plein)
+    wait_time: float = 0.0  # temps total d'attente en secondes
+    writes: int = 0         # transactions d'écriture
+
+
+
+class ConnectionPool:
+    """Pool thread-safe de connexions SQLite en lecture seule, plus un unique écrivain.
+
+    Les connexions sont ouvertes à la demande jusqu'à `max_readers` puis réutilisées,
+    ce qui évite de payer l'ouverture et le parsing du schéma à chaque requête.
+    Le mode WAL est appliqué au fichier dès la création du pool : les écritures
+    passent par `TursoDB` et non par `write()`, il ne peut donc pas attendre
+    l'ouverture de l'écrivain.
+    """
+    def __init__(self, path: str=DB_PATH, max_readers: int=8, timeout: float=10.0, trace: Callable[[str], None]=None) -> None:
+        self.path = path
+        self.max_readers = max_readers
+        self.timeout = timeout
+        self.trace = trace
+
+        self._readers: LifoQueue[sqlite3.Connection] = LifoQueue()
+        self._opened = 0
+        self._writer: sqlite3.Connection = None
+        self._watcher: sqlite3.Connection = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        self._stats = PoolStats()
+        self._set_journal_mode()
+
+
+    def _set_journal_mode(self) -> None:
+        """Passe la base en `JOURNAL_MODE` (persistant dans le fichier, sans effet s'il y est déjà)"""
+        conn = sqlite3.connect(self.path, timeout=self.timeout)
+        try:
+            mode, = conn.execute(f"PRAGMA journal_mode={JOURNAL_MODE}").fetchone()
+        except sqlite3.OperationalError as e:
+            # Base verrouillée par un autre processus : les lecteurs gardent le mode courant
+            logger.warning(f"Journal {JOURNAL_MODE} non appliqué à {self.path}: {e}")
+            return
+        finally:
+            conn.close()
+        if mode.upper() != JOURNAL_MODE:
+            logger.warning(f"Journal {JOURNAL_MODE} refusé pour {self.path}, mode actuel: {mode}")
+
+    @property
+    def stats(self) -> PoolStats:
+        """Copie des métriques courantes"""
+        with self._lock:
+            return replace(self._stats)
+
+    def _connect(self, readonly: bool) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=self.timeout)
+        if self.trace is not None:
+            conn.set_trace_callback(self.trace)
+
+        for pragma, value in PRAGMAS.items():
+            conn.execute(f"PRAGMA {pragma}={value}")
+        if readonly:
+            conn.execute("PRAGMA query_only=ON")
+
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            conn = self._readers.get_nowait()
+            with self._lock:
+                self._stats.hits += 1
+            return conn
+        except Empty:
+            pass
+
+        with self._lock:
+            can_open = self._opened < self.max_readers
+            if can_open:
+                self._opened += 1
+                self._stats.misses += 1
+
+        if can_open:
+            try:
+                return self._connect(readonly=True)
+            except sqlite3.Error:
+                with self._lock:
+                    self._opened -= 1
+                raise
+
+        start = perf_counter()
+        try:
+            conn = self._readers.get(timeout=self.timeout)
+        except Empty:
+            raise TimeoutError(f"Aucune connexion disponible après {self.timeout}s ({self.max_readers} lecteurs).")
+        with self._lock:
+            self._stats.waits += 1
+            self._stats.wait_time += perf_counter() - start
+        return conn
+
+    @contextmanager
+    def read(self) -> Iterator[sqlite3.Connection]:
+        """Emprunte une connexion en lecture seule et la rend au pool après usage."""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._readers.put(conn)
+
+    @contextmanager
+    def write(self) -> Iterator[sqlite3.Connection]:
+        """Donne accès exclusif à la connexion d'écriture, dans une transaction.
+
+        Commit en sortie normale, rollback si une exception est levée.
+        """
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._connect(readonly=False)
+            try:
+                yield self._writer
+                self._writer.commit()
+            except BaseException:
+                self._writer.rollback()
+                raise
+            with self._lock:
+                self._stats.writes += 1
+
+    def data_version(self) -> tuple[int, str]:
+        """Jeton de changement de la base, peu coûteux à lire à chaque rerun.
+
+        `PRAGMA data_version` n'est comparable que sur une même connexion et ne
+        bouge qu'aux commits des autres connexions : il est lu sur une connexion
+        dédiée qui n'écrit jamais, si bien que tout commit (pool, synchronisation
+        Turso, autre processus) le change. `MAX(meta.last_update)` couvre les
+        synchronisations qui avancent un watermark sans toucher aux lignes lues.
+
+        Returns:
+            tuple[int, str]: (data_version, dernier last_update)
+        """
+        with self._lock:
+            if self._watcher is None:
+                self._watcher = self._connect(readonly=True)
+            version, = self._watcher.execute("PRAGMA data_version").fetchone()
+            try:
+                last_update, = self._watcher.execute("SELECT MAX(last_update) FROM meta").fetchone()
+            except sqlite3.OperationalError:
+                last_update = None
+            return version, last_update
+
+
+    def close(self) -> None:
+        """Ferme toutes les connexions inactives et l'écrivain."""
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except Empty:
+                break
+        with self._lock:
+            self._opened = 0
+            if self._watcher is not None:
+                self._watcher.close()
+                self._watcher = None
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        logger.debug(f"Pool {self.path} fermé: {self.stats}")
+
+
+
+
+_pools: dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+def get_pool(path: str=DB_PATH, **kwargs) -> ConnectionPool:
+    """Retourne le pool partagé du processus pour `path`, créé au premier appel.
+
+    Args:
+        path (str, optional): Chemin de la base. Defaults to DB_PATH.
+        **kwargs: Options de `ConnectionPool`, utilisées uniquement à la création.
+    """
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            pool = _pools[path] = ConnectionPool(path, **kwargs)
+        return pool
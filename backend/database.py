@@ -1,9 +1,13 @@
 import turso.sync
-from turso import IntegrityError
+from turso import IntegrityError, DatabaseError
 import libsql
+from httpx import ConnectError, RemoteProtocolError
 from settings import logger
-from typing import Any
-from utility import retry
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator, Sequence
+from itertools import batched
+from utility import retry, RetryPolicy, RetryBudget, CircuitBreaker
+from .push import PushScheduler
 
 from icecream import ic
 
@@ -12,7 +16,7 @@ from icecream import ic
 class NotNullConstraintError(IntegrityError):
     def __init__(self, original_error: Exception, table: str = None, columns: list[str] = None, values: list = None):
         msg = str(original_error)
-        column_error = msg[27:-5]
+        column_error = msg[27:-5].strip().split(".")[-1]
         
         idx_error = columns.index(column_error)
         col_msg = f"{column_error}: {values[idx_error]}"
@@ -53,21 +57,64 @@ class UniqueConstraintError(IntegrityError):
 
 
 
+# Erreurs réseau de la synchronisation Turso (remontées en DatabaseError par le moteur)
+TURSO_RETRY_POLICIES = {
+    IntegrityError: None,
+    ConnectError: RetryPolicy(retries=5, base_delay=1.0),
+    RemoteProtocolError: RetryPolicy(retries=5, base_delay=1.0),
+    DatabaseError: RetryPolicy(retries=3, base_delay=2.0),
+}
+# Pas de nouvel essai immédiat pour les push : le scheduler réessaie au cycle suivant
+TURSO_PUSH_POLICIES = {exc: policy and RetryPolicy(retries=0) for exc, policy in TURSO_RETRY_POLICIES.items()}
+turso_breaker = CircuitBreaker("turso", failure_threshold=5, reset_timeout=60.0)
+turso_retry_budget = RetryBudget()
+
+
+
+
 class TursoDB():
-    def __init__(self, path: str, remote_url: str, auth_token: str) -> None:
+    def __init__(self, path: str, remote_url: str, auth_token: str, push_interval: float=5.0, push_max_pending: int=50) -> None:
         logger.debug(f"Initializing TursoDB with path: {path}, remote_url: {remote_url}, auth_token: {'***' if auth_token else None}")
         self.conn = turso.sync.connect(path=path, remote_url=remote_url, auth_token=auth_token)
+        self.pusher = PushScheduler(
+            self.conn,
+            min_interval=push_interval,
+            max_pending=push_max_pending,
+            push=retry(policies=TURSO_PUSH_POLICIES, breaker=turso_breaker)(self.conn.push),
+        )
+        self.lock = self.pusher.lock
       
     
-    @retry
+    @retry(policies=TURSO_RETRY_POLICIES, budget=turso_retry_budget, breaker=turso_breaker)
     def sync(self) -> None:
         logger.debug("Synchronization TursoDB")
-        changed = self.conn.pull()
+        with self.lock:
+            changed = self.conn.pull()
         logger.info(f"Pulled: {changed}")  # True if there were new remote changes
 
         stats = self.conn.stats()
         logger.info(f"Network received (bytes): {stats.network_received_bytes}")
         # conn.checkpoint()  # compact local WAL after many writes
+
+    def close(self) -> None:
+        """Pousse les commits en attente et arrête le push en arrière-plan."""
+        self.pusher.close()
+
+    @contextmanager
+    def transaction(self) -> Iterator[turso.sync.ConnectionSync]:
+        """Regroupe plusieurs écritures (`insert_many`/`upsert_many` avec `commit=False`,
+        `conn.execute`) dans une seule transaction, sous `lock`.
+
+        Commit en sortie normale puis push planifié, rollback si une exception est levée.
+        """
+        with self.lock:
+            try:
+                yield self.conn
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+        self.pusher.mark_dirty()
         
         
     def insert(self, table: str, values: dict|list, columns: list[str]=None) -> None:
@@ -86,38 +133,116 @@ class TursoDB():
         columns = ', '.join(keys)
         placeholders = ', '.join(':' + str(key) for key in keys)
             
-        try:
-            cur = self.conn.execute(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})")
-            self.conn.commit()
-            self.conn.push()
-            
-            return cur.lastrowid
-        except IntegrityError as e:
-            if "NOT NULL constraint failed" in str(e):
+        with self.lock:
+            try:
+                cur = self.conn.execute(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", values)
+                self.conn.commit()
+            except IntegrityError as e:
                 self.conn.rollback()
-                logger.error(f"IntegrityError: {e} \nValues: {values}")
-            else:
-                raise e
+                if "NOT NULL constraint failed" in str(e):
+                    logger.error(f"IntegrityError: {e} \nValues: {values}")
+                    return
+                else:
+                    raise e
+        self.pusher.mark_dirty()
+            
+        return cur.lastrowid
         
     def _insert_list(self, table: str, values: list|tuple, columns: list[str]) -> None:
         placeholders = ', '.join('?' * len(values))
         
-        try:
-            cur = self.conn.execute(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", values)
-            self.conn.commit()
-            self.conn.push()
+        with self.lock:
+            try:
+                cur = self.conn.execute(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", values)
+                self.conn.commit()
+            except IntegrityError as e:
+                self.conn.rollback()
+                raise self._map_integrity_error(e, table, columns, values)
+        self.pusher.mark_dirty()
+
+        return cur.lastrowid
+        
+    
+    def insert_many(self, table: str, rows: Iterable[Sequence], columns: list[str], chunk_size: int=500, push_every: int=None, commit: bool=True) -> int:
+        """Insère des lignes par paquets : une transaction par paquet, poussées en arrière-plan par `pusher`.
+
+        Args:
+            table (str): Table cible
+            rows (Iterable[Sequence]): Valeurs des lignes, dans l'ordre de `columns`
+            columns (list[str]): Colonnes insérées
+            chunk_size (int, optional): Nombre de lignes par transaction. Defaults to 500.
+            push_every (int, optional): Demande un push immédiat tous les N paquets. Defaults to None (push regroupé).
+            commit (bool, optional): Commite chaque paquet. False dans un bloc `transaction()`,
+                qui commite (ou annule) l'ensemble. Defaults to True.
+
+        Raises:
+            NotNullConstraintError | UniqueConstraintError: Sur la première ligne fautive du paquet en erreur.
+                Les paquets précédents restent commités.
+
+        Returns:
+            int: Nombre de lignes écrites
+        """
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        return self._write_many(sql, table, rows, columns, chunk_size, push_every, commit)
+
+    def upsert_many(self, table: str, rows: Iterable[Sequence], columns: list[str], conflict: list[str], update: list[str]=None, chunk_size: int=500, push_every: int=None, commit: bool=True) -> int:
+        """Comme `insert_many`, mais met à jour les lignes existantes en cas de conflit.
+
+        Args:
+            conflict (list[str]): Colonnes de la contrainte d'unicité (clause ON CONFLICT)
+            update (list[str], optional): Colonnes mises à jour en cas de conflit. Defaults to toutes les autres.
+        """
+        update = update if update is not None else [col for col in columns if col not in conflict]
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) ON CONFLICT({', '.join(conflict)})"
+        if update:
+            sql += " DO UPDATE SET " + ", ".join(f"{col}=excluded.{col}" for col in update)
+        else:
+            sql += " DO NOTHING"
+        return self._write_many(sql, table, rows, columns, chunk_size, push_every, commit)
+
+    def _write_many(self, sql: str, table: str, rows: Iterable[Sequence], columns: list[str], chunk_size: int, push_every: int, commit: bool=True) -> int:
+        written = 0
+        chunks = 0
+        for chunk in batched(rows, chunk_size):
+            with self.lock:
+                try:
+                    self.conn.executemany(sql, chunk)
+                    if commit:
+                        self.conn.commit()
+                except IntegrityError as e:
+                    self.conn.rollback()
+                    self._raise_row_error(sql, table, columns, chunk, e)
 
-            return cur.lastrowid
-        except IntegrityError as e:
+            written += len(chunk)
+            chunks += 1
+            if commit:
+                self.pusher.mark_dirty(urgent=bool(push_every) and chunks % push_every == 0)
+
+        logger.info(f"{written} rows written to {table} in {chunks} {'transactions' if commit else 'chunks, not committed'}.")
+        return written
+
+    def _raise_row_error(self, sql: str, table: str, columns: list[str], chunk: tuple[Sequence], error: IntegrityError) -> None:
+        """Rejoue un paquet en erreur ligne par ligne pour lever l'erreur sur la ligne fautive."""
+        try:
+            for values in chunk:
+                try:
+                    self.conn.execute(sql, values)
+                except IntegrityError as e:
+                    raise self._map_integrity_error(e, table, columns, values)
+        finally:
             self.conn.rollback()
-            msg = str(e)
-            
-            if "NOT NULL constraint failed" in msg:
-                raise NotNullConstraintError(e, table, columns, values)
-            elif "UNIQUE constraint failed" in msg:
-                raise UniqueConstraintError(e, table, columns, values)
-            else:
-                raise e
+        raise error
+
+    @staticmethod
+    def _map_integrity_error(error: IntegrityError, table: str, columns: list[str], values: Sequence) -> IntegrityError:
+        msg = str(error)
+        
+        if "NOT NULL constraint failed" in msg:
+            return NotNullConstraintError(error, table, columns, values)
+        elif "UNIQUE constraint failed" in msg:
+            return UniqueConstraintError(error, table, columns, values)
+        else:
+            return error
         
    
    
@@ -0,0 +1,136 @@
+"""Réduction des séries temporelles avant envoi à Plotly.
+
+Entre les loaders et la construction des graphiques : une courbe n'a pas
+besoin de plus de points que de pixels, ni un histogramme de plus de barres
+que sa largeur ne peut en afficher.
+
+    lttb            Largest-Triangle-Three-Buckets : garde la forme d'une courbe
+    downsample_line DataFrame réduit par LTTB sur une colonne
+    time_buckets    barres agrégées par jour, semaine, mois, trimestre ou année
+
+Les fonctions renvoient les données brutes quand elles tiennent dans le budget.
+"""
+import numpy as np
+import pandas as pd
+
+
+
+
+# Largeur d'un graphique `use_container_width` dans la mise en page centrée de Streamlit
+CHART_WIDTH = 704
+# Largeur minimale lisible d'une barre, en pixels
+MIN_BAR_WIDTH = 6
+
+# Pas de regroupement des barres, du plus fin au plus grossier
+# (semaines du lundi au dimanche, étiquetées par le lundi)
+FREQUENCIES = ("D", "W-MON", "MS", "QS", "YS")
+
+
+
+def point_budget(width: int=CHART_WIDTH, per_pixel: float=1.0) -> int:
+    """Nombre de points d'une courbe large de `width` pixels"""
+    return max(3, int(width * per_pixel))
+
+
+def bar_budget(width: int=CHART_WIDTH) -> int:
+    """Nombre de barres d'un histogramme large de `width` pixels"""
+    return max(1, width // MIN_BAR_WIDTH)
+
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices des `n_out` points retenus par Largest-Triangle-Three-Buckets.
+
+    Le premier et le dernier point sont gardés ; les autres sont répartis en
+    `n_out - 2` paquets consécutifs, et dans chacun on garde le point formant
+    le plus grand triangle avec le point retenu précédent et la moyenne du
+    paquet suivant. Les pics et creux survivent, contrairement à un pas fixe.
+
+    Args:
+        x (np.ndarray): Abscisses croissantes (numériques ou datetime64)
+        y (np.ndarray): Ordonnées, sans NaN
+        n_out (int): Nombre de points voulus
+
+    Returns:
+        np.ndarray: Indices croissants dans `x`/`y` (tous si `n_out` >= len(x))
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype("datetime64[ns]").astype(np.int64)
+    x = x.astype(np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # n_out - 2 paquets sur les points 1..n-2, chacun non vide car n - 2 >= n_out - 2
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # Moyennes de chaque paquet, plus le dernier point comme « paquet suivant » du dernier
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    sizes = np.diff(edges)
+    avg_x = np.append(sums_x / sizes, x[-1])
+    avg_y = np.append(sums_y / sizes, y[-1])
+
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Double de l'aire du triangle (a, point du paquet, moyenne du paquet suivant)
+        area = np.abs(
+            (x[a] - avg_x[i + 1]) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (avg_y[i + 1] - y[a])
+        )
+        a = lo + int(area.argmax())
+        indices[i + 1] = a
+    return indices
+
+
+def downsample_line(df: pd.DataFrame, x: str, y: str, n_out: int=None) -> pd.DataFrame:
+    """Lignes de `df` retenues par LTTB sur (x, y), triées par x.
+
+    Args:
+        df (pd.DataFrame): Données brutes
+        x (str): Colonne des abscisses (dates)
+        y (str): Colonne des ordonnées ; les lignes où elle est NaN sont ignorées
+        n_out (int, optional): Budget de points. Defaults to `point_budget()`.
+
+    Returns:
+        pd.DataFrame: Sous-ensemble de `df` (toutes les lignes si dans le budget)
+    """
+    n_out = n_out or point_budget()
+    df = df[df[y].notna()].sort_values(x, kind="stable")
+    if len(df) <= n_out:
+        return df
+    xs = df[x]
+    # Dates avec fuseau : to_numpy() donnerait des Timestamp objets
+    xs = xs.to_numpy("datetime64[ns]") if pd.api.types.is_datetime64_any_dtype(xs) else xs.to_numpy()
+    return df.iloc[lttb(xs, df[y].to_numpy(), n_out)]
+
+
+def time_buckets(df: pd.DataFrame, x: str, columns: list[str], max_bars: int=None, how: str="sum") -> tuple[pd.DataFrame, str]:
+    """Agrège les barres par le plus petit pas de `FREQUENCIES` qui tient dans `max_bars`.
+
+    Args:
+        df (pd.DataFrame): Une ligne par barre brute (séance...)
+        x (str): Colonne des dates
+        columns (list[str]): Colonnes à agréger
+        max_bars (int, optional): Budget de barres. Defaults to `bar_budget()`.
+        how (str, optional): Agrégation pandas. Defaults to "sum".
+
+    Returns:
+        tuple[pd.DataFrame, str]: Barres (colonnes x et `columns`) et pas utilisé,
+            None si les données brutes tiennent dans le budget
+    """
+    max_bars = max_bars or bar_budget()
+    if len(df) <= max_bars:
+        return df, None
+
+    indexed = df.set_index(x)[columns]
+    for freq in FREQUENCIES:
+        buckets = indexed.resample(freq, closed="left", label="left").agg(how)
+        if len(buckets) <= max_bars:
+            break
+    return buckets.reset_index(), freq
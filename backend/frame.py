@@ -0,0 +1,291 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from datetime import datetime as dt
+from typing import Iterable
+from .connection import get_pool
+from .loaders import PRIMARY_MUSCLE_GROUP
+from settings import DB_PATH
+
+
+
+
+# Colonnes lues depuis SQLite, dans l'ordre du SELECT de `SeriesFrame.from_cursor`
+ROW_DTYPE = np.dtype([
+    ("seance", np.int64),       # rowid de la séance
+    ("exo", np.int64),          # rowid de l'exercice
+    ("num", np.int16),
+    ("reps", np.int16),
+    ("weight", np.float32),
+    ("date_ts", np.int64),
+])
+
+SERIES_QUERY = """
+    SELECT COALESCE(w.rowid, -1), e.rowid, s.num, s.reps, s.weight, CAST(s.date_ts AS INTEGER)
+    FROM series AS s
+    JOIN exercices AS e ON e.id = s.exo_id
+    LEFT JOIN seances AS w ON w.id = s.seance_id
+"""
+
+SECONDS_PER_DAY = 86_400
+
+
+
+
+@dataclass
+class ReferenceTables:
+    """Tables de correspondance code -> exercice / groupe musculaire.
+
+    Les codes sont les positions dans ces tableaux, dans l'ordre des rowid.
+    """
+    exercice_rowids: np.ndarray     # int64 trié, pour convertir rowid -> code
+    exercice_ids: np.ndarray
+    exercices: np.ndarray           # noms
+    muscle_groups: np.ndarray       # noms (pas uniques : `muscle_group.name` n'a pas de contrainte)
+    body_parts: np.ndarray          # partie du corps de chaque groupe musculaire
+    primary_muscle_group: np.ndarray    # code du groupe principal de chaque exercice, -1 si aucun
+    muscle_group_names: np.ndarray      # noms distincts, triés
+    muscle_group_name_code: np.ndarray  # position du nom de chaque groupe dans `muscle_group_names`
+
+    @classmethod
+    def load(cls, conn: sqlite3.Connection) -> "ReferenceTables":
+        exos = conn.execute("SELECT rowid, id, name FROM exercices ORDER BY rowid").fetchall()
+        mgs = conn.execute("SELECT rowid, name, body_part FROM muscle_group ORDER BY rowid").fetchall()
+        # Une ligne par exercice : son groupe principal
+        links = conn.execute(f"""
+            WITH {PRIMARY_MUSCLE_GROUP}
+            SELECT e.rowid, mg.rowid
+            FROM primary_mg AS p
+            JOIN exercices AS e ON e.id = p.exercice_id
+            JOIN muscle_group AS mg ON mg.id = p.muscle_group_id
+        """).fetchall()
+
+        exercice_rowids = np.array([row[0] for row in exos], dtype=np.int64)
+        mg_rowids = np.array([row[0] for row in mgs], dtype=np.int64)
+        primary = np.full(len(exos), -1, dtype=np.int32)
+        if links:
+            exo_rowids, link_mg_rowids = np.array(links, dtype=np.int64).T
+            primary[np.searchsorted(exercice_rowids, exo_rowids)] = np.searchsorted(mg_rowids, link_mg_rowids)
+
+        muscle_groups = np.array([row[1] for row in mgs], dtype=object)
+        # Groupes homonymes fusionnés sous un même libellé
+        names, name_code = np.unique(muscle_groups.astype(str), return_inverse=True)
+
+        return cls(
+            exercice_rowids=exercice_rowids,
+            exercice_ids=np.array([row[1] for row in exos], dtype=object),
+            exercices=np.array([row[2] for row in exos], dtype=object),
+            muscle_groups=muscle_groups,
+            body_parts=np.array([row[2] for row in mgs], dtype=object),
+            primary_muscle_group=primary,
+            muscle_group_names=names.astype(object),
+            muscle_group_name_code=name_code.astype(np.int32),
+        )
+
+    def exercice_code(self, name: str) -> int:
+        codes = np.flatnonzero(self.exercices == name)
+        if not len(codes):
+            raise KeyError(name)
+        return int(codes[0])
+
+
+
+class SeriesFrame:
+    """Séries stockées en colonnes NumPy, pour les agrégations.
+
+    Une ligne par série, sans objet Python par ligne : l'exercice et la séance
+    sont des codes entiers, résolus via `tables` (exercices, groupes musculaires)
+    uniquement pour les libellés des résultats.
+    """
+    __slots__ = ("seance", "exo", "num", "reps", "weight", "date_ts", "tables")
+
+    def __init__(self, seance: np.ndarray, exo: np.ndarray, num: np.ndarray, reps: np.ndarray, weight: np.ndarray, date_ts: np.ndarray, tables: ReferenceTables) -> None:
+        self.seance = seance        # code dense de la séance (0..n_seances-1)
+        self.exo = exo              # code de l'exercice dans `tables`
+        self.num = num
+        self.reps = reps
+        self.weight = weight
+        self.date_ts = date_ts      # secondes depuis epoch (UTC)
+        self.tables = tables
+
+
+    @classmethod
+    def from_cursor(cls, cursor: Iterable[tuple], tables: ReferenceTables, count: int=-1) -> "SeriesFrame":
+        """Remplit le frame en une passe depuis un curseur SQLite, sans liste intermédiaire de tuples.
+
+        Args:
+            cursor (Iterable[tuple]): Lignes (rowid séance, rowid exercice, num, reps, poids, date_ts)
+            tables (ReferenceTables): Tables de correspondance des exercices
+            count (int, optional): Nombre de lignes si connu, pour allouer en une fois. Defaults to -1.
+        """
+        rows = np.fromiter(cursor, dtype=ROW_DTYPE, count=count)
+        _, seance = np.unique(rows["seance"], return_inverse=True)
+
+        return cls(
+            seance=seance.astype(np.int32),
+            exo=np.searchsorted(tables.exercice_rowids, rows["exo"]).astype(np.int32),
+            num=rows["num"].copy(),
+            reps=rows["reps"].copy(),
+            weight=rows["weight"].copy(),
+            date_ts=rows["date_ts"].copy(),
+            tables=tables,
+        )
+
+    @classmethod
+    def from_db(cls, start: dt=None, end: dt=None, exercise: str=None, db_path: str=DB_PATH) -> "SeriesFrame":
+        """Charge les séries, éventuellement bornées en date ou limitées à un exercice.
+
+        Args:
+            start (dt, optional): Date de début incluse. Defaults to None.
+            end (dt, optional): Date de fin incluse. Defaults to None.
+            exercise (str, optional): Nom de l'exercice. Defaults to None (tous).
+            db_path (str, optional): Chemin de la base. Defaults to DB_PATH.
+        """
+        where, params = [], []
+        if start is not None:
+            where.append("s.date_ts >= ?")
+            params.append(start.timestamp())
+        if end is not None:
+            where.append("s.date_ts <= ?")
+            params.append(end.timestamp())
+        if exercise is not None:
+            where.append("e.name = ?")
+            params.append(exercise)
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+
+        with get_pool(db_path).read() as conn:
+            tables = ReferenceTables.load(conn)
+            cur = conn.execute(f"{SERIES_QUERY} {clause} ORDER BY s.date_ts", params)
+            return cls.from_cursor(cur, tables)
+
+
+    def __len__(self) -> int:
+        return len(self.exo)
+
+    def __repr__(self) -> str:
+        return f"SeriesFrame({len(self)} series, {self.nbytes / 2**20:.2f} MiB)"
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, column).nbytes for column in ("seance", "exo", "num", "reps", "weight", "date_ts"))
+
+    @property
+    def n_seances(self) -> int:
+        return int(self.seance.max()) + 1 if len(self) else 0
+
+    @property
+    def volume(self) -> np.ndarray:
+        """reps x poids de chaque série"""
+        return self.reps * self.weight.astype(np.float64)
+
+    @property
+    def muscle_group(self) -> np.ndarray:
+        """Code du groupe musculaire principal de chaque série (-1 si aucun)"""
+        return self.tables.primary_muscle_group[self.exo]
+
+    @property
+    def muscle_group_name(self) -> np.ndarray:
+        """Code du nom du groupe musculaire principal dans `tables.muscle_group_names` (-1 si aucun)"""
+        mg = self.muscle_group
+        return np.where(mg >= 0, self.tables.muscle_group_name_code[mg], -1)
+
+    @property
+    def dates(self) -> np.ndarray:
+        return self.date_ts.astype("datetime64[s]")
+
+    def week_start(self) -> np.ndarray:
+        """Lundi (UTC) de la semaine de chaque série, en jours depuis epoch"""
+        days = self.date_ts // SECONDS_PER_DAY
+        # Le 1er janvier 1970 est un jeudi : +3 jours ramène les semaines au lundi
+        return days - (days + 3) % 7
+
+    def filter(self, mask: np.ndarray) -> "SeriesFrame":
+        """Sous-ensemble des séries où `mask` est vrai, partageant les mêmes tables"""
+        return SeriesFrame(
+            self.seance[mask], self.exo[mask], self.num[mask], self.reps[mask],
+            self.weight[mask], self.date_ts[mask], self.tables,
+        )
+
+    def between(self, start: dt=None, end: dt=None) -> "SeriesFrame":
+        mask = np.ones(len(self), dtype=bool)
+        if start is not None:
+            mask &= self.date_ts >= start.timestamp()
+        if end is not None:
+            mask &= self.date_ts <= end.timestamp()
+        return self.filter(mask)
+
+
+    # |-----------Agrégations---------|
+    def total_volume(self) -> float:
+        return float(self.volume.sum())
+
+    def _aggregate(self, codes: np.ndarray, labels: np.ndarray) -> pd.DataFrame:
+        """Séries, reps, volume et charge max par code, pour les codes présents"""
+        n = len(labels)
+        sets = np.bincount(codes, minlength=n)
+        max_weight = np.zeros(n, dtype=np.float32)
+        np.maximum.at(max_weight, codes, self.weight)
+        present = sets > 0
+
+        return pd.DataFrame({
+            "series": sets[present],
+            "reps": np.bincount(codes, weights=self.reps, minlength=n)[present].astype(np.int64),
+            "volume": np.bincount(codes, weights=self.volume, minlength=n)[present],
+            "max_weight": max_weight[present],
+        }, index=pd.Index(labels[present]))
+
+    def by_exercise(self) -> pd.DataFrame:
+        """Agrégats par exercice"""
+        df = self._aggregate(self.exo, self.tables.exercices)
+        df.index.name = "exercice"
+        return df
+
+    def by_muscle_group(self) -> pd.DataFrame:
+        """Agrégats par nom du groupe musculaire principal (séries sans groupe ignorées)"""
+        names = self.muscle_group_name
+        known = names >= 0
+        df = self.filter(known)._aggregate(names[known], self.tables.muscle_group_names)
+        df.index.name = "muscle_group"
+        return df
+
+    def by_body_part(self) -> pd.DataFrame:
+        """Agrégats par partie du corps du groupe musculaire principal"""
+        parts, mg_part = np.unique(self.tables.body_parts.astype(str), return_inverse=True)
+        mg = self.muscle_group
+        known = mg >= 0
+        df = self.filter(known)._aggregate(mg_part[mg[known]], parts.astype(object))
+        df.index.name = "body_part"
+        return df
+
+    def by_week(self) -> pd.DataFrame:
+        """Agrégats par semaine (lundi UTC), plus le nombre de séances"""
+        weeks, codes = np.unique(self.week_start(), return_inverse=True)
+        df = self._aggregate(codes, weeks.astype("datetime64[D]"))
+        # Couples (semaine, séance) distincts, encodés sur un entier
+        n_seances = self.n_seances
+        pairs = np.unique(codes.astype(np.int64) * n_seances + self.seance)
+        df["seances"] = np.bincount(pairs // max(n_seances, 1), minlength=len(weeks))
+        df.index.name = "week"
+        return df
+
+    def by_seance(self) -> pd.DataFrame:
+        """Agrégats par séance, indexés par la date de la séance"""
+        dates = np.zeros(self.n_seances, dtype=np.int64)
+        dates[self.seance] = self.date_ts
+        df = self._aggregate(self.seance, dates.astype("datetime64[s]"))
+        df.index.name = "date"
+        return df
+
+    def to_pandas(self) -> pd.DataFrame:
+        """DataFrame une ligne par série, exercice et groupe musculaire en Categorical"""
+        return pd.DataFrame({
+            "date": pd.to_datetime(self.date_ts, unit="s", utc=True),
+            "seance": self.seance,
+            "exercice": pd.Categorical.from_codes(self.exo, categories=self.tables.exercices),
+            "muscle_group": pd.Categorical.from_codes(self.muscle_group_name, categories=self.tables.muscle_group_names),
+            "num": self.num,
+            "reps": self.reps,
+            "poids": self.weight,
+            "volume": self.volume,
+        })
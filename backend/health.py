@@ -0,0 +1,417 @@
+import argparse
+import json
+import multiprocessing as mp
+import os
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from datetime import datetime as dt, timezone
+from os import getenv
+from os.path import join as pjoin
+from dotenv import load_dotenv
+from time import perf_counter
+from typing import IO, BinaryIO, Iterator
+from utility import HealthRecord
+from .database import TursoDB
+from .models_db import init_db
+from settings import DB_PATH, workspace, logger
+
+
+
+
+HEALTH_COLUMNS = ["type", "source", "unit", "value", "category", "start_ts", "end_ts", "created_ts"]
+INSERT_HEALTH = f"""
+    INSERT OR IGNORE INTO health_records ({', '.join(HEALTH_COLUMNS)})
+    VALUES ({', '.join('?' * len(HEALTH_COLUMNS))})
+"""
+
+# Début d'un <Record> de premier niveau : un élément par ligne, indenté d'un espace
+# dans les exports Apple (les <Record> d'une <Correlation> le sont de deux)
+RECORD_BOUNDARY = b"\n <Record "
+READ_BLOCK = 1 << 20
+
+# Clés de la table `meta`
+WATERMARK_KEY = "health:watermark"      # creationDate max des imports terminés
+CHECKPOINT_KEY = "health:checkpoint"    # progression de l'import en cours (JSON)
+
+
+
+
+@dataclass
+class ImportStats:
+    """Bilan d'un import d'export Apple Health."""
+    records: int = 0        # éléments <Record> lus
+    inserted: int = 0
+    skipped: int = 0        # déjà importés (watermark, reprise ou doublon)
+    invalid: int = 0        # dates ou type manquants
+    elapsed: float = 0.0
+
+    @property
+    def rate(self) -> float:
+        """Records lus par seconde"""
+        return self.records / self.elapsed if self.elapsed else 0.0
+
+
+
+def _top_level_records(events: Iterator[tuple[str, ET.Element]]) -> Iterator[dict[str, str]]:
+    """Attributs des `<Record>` de premier niveau, en vidant l'arbre au fur et à mesure"""
+    root = None
+    depth = 0
+    for event, element in events:
+        if event == "start":
+            if root is None:
+                root = element
+            else:
+                depth += 1
+            continue
+        depth -= 1
+        if depth == 0:
+            if element.tag == "Record":
+                yield element.attrib
+            root.clear()
+
+
+def iter_records(source: str | IO[bytes]) -> Iterator[dict[str, str]]:
+    """Attributs de chaque `<Record>` d'un export.xml, en mémoire constante.
+
+    Le fichier est lu au fil de l'eau (`iterparse`) et chaque élément de premier
+    niveau est supprimé de l'arbre une fois traité, enfants compris
+    (MetadataEntry, HeartRateVariabilityMetadataList...).
+
+    Args:
+        source (str | IO[bytes]): Chemin ou fichier ouvert de l'export
+    """
+    yield from _top_level_records(ET.iterparse(source, events=("start", "end")))
+
+
+def iter_records_range(path: str, start: int, end: int) -> Iterator[dict[str, str]]:
+    """Comme `iter_records`, pour les octets [start, end) de l'export (voir `split_chunks`).
+
+    La plage ne contient que des éléments complets : elle est enveloppée dans
+    une racine `<HealthData>` et donnée par blocs à un `XMLPullParser`.
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+
+    def events() -> Iterator[tuple[str, ET.Element]]:
+        parser.feed(b"<HealthData>")
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                block = f.read(min(READ_BLOCK, remaining))
+                if not block:
+                    break
+                remaining -= len(block)
+                parser.feed(block)
+                yield from parser.read_events()
+        parser.feed(b"</HealthData>")
+        parser.close()
+        yield from parser.read_events()
+
+    yield from _top_level_records(events())
+
+
+def _find(f: BinaryIO, needle: bytes, start: int, end: int) -> int:
+    """Position de `needle` dans [start, end) du fichier, -1 si absent"""
+    pos = start
+    while pos < end:
+        f.seek(pos)
+        block = f.read(min(READ_BLOCK, end - pos) + len(needle) - 1)
+        found = block.find(needle)
+        if found >= 0:
+            return pos + found if pos + found < end else -1
+        pos += READ_BLOCK
+    return -1
+
+
+def split_chunks(path: str, chunk_bytes: int=16 << 20) -> list[tuple[int, int]]:
+    """Découpe l'export en plages d'environ `chunk_bytes` octets, chacune commençant sur un `<Record>`.
+
+    Les plages couvrent du premier `<Record>` à la balise `</HealthData>` ;
+    l'en-tête (DTD, `<ExportDate>`, `<Me>`) n'en fait pas partie.
+
+    Returns:
+        list[tuple[int, int]]: Plages (début, fin) en octets
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        f.seek(max(0, size - 4096))
+        tail = f.read()
+        closing = tail.rfind(b"</HealthData>")
+        end = size - len(tail) + closing if closing >= 0 else size
+
+        first = _find(f, b"<Record ", 0, end)
+        if first < 0:
+            return []
+        bounds = [first]
+        while True:
+            boundary = _find(f, RECORD_BOUNDARY, bounds[-1] + chunk_bytes, end)
+            if boundary < 0:
+                break
+            bounds.append(boundary + 1)
+    bounds.append(end)
+    return list(zip(bounds, bounds[1:]))
+
+
+def fingerprint(path: str) -> str:
+    """Identifie un fichier d'export, pour ne reprendre un import que sur le même fichier"""
+    stat = os.stat(path)
+    return f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+
+
+@dataclass
+class ChunkResult:
+    """Records d'une plage de l'export, convertis par un processus de `HealthImporter`."""
+    index: int
+    rows: list[tuple] = field(default_factory=list)
+    records: int = 0
+    skipped: int = 0
+    invalid: int = 0
+    high: int = 0       # creationDate max des records retenus
+
+
+def convert_records(records: Iterator[dict[str, str]], watermark: int, result: ChunkResult) -> Iterator[tuple]:
+    """Lignes de `health_records` des records créés à partir de `watermark` ; compte le reste dans `result`
+
+    Les records de la seconde même du watermark sont gardés : une synchronisation
+    de la montre en crée beaucoup avec le même creationDate, et ceux déjà importés
+    sont écartés par `INSERT OR IGNORE` sur l'index unique `idx_health_record`.
+    """
+    to_row = HealthRecord.row_from_attrib
+    high = result.high
+    for attrib in records:
+        result.records += 1
+        try:
+            row = to_row(attrib)
+        except (KeyError, TypeError, ValueError):
+            result.invalid += 1
+            continue
+        created = row[-1]
+        if created is not None:
+            if created < watermark:
+                result.skipped += 1
+                continue
+            if created > high:
+                high = created
+        result.high = high
+        yield row
+
+
+def parse_chunk(task: tuple[int, str, int, int, int]) -> ChunkResult:
+    """Parse une plage de l'export dans un processus de travail.
+
+    Args:
+        task (tuple): (index, chemin, début, fin, watermark)
+    """
+    index, path, start, end, watermark = task
+    result = ChunkResult(index)
+    result.rows = list(convert_records(iter_records_range(path, start, end), watermark, result))
+    return result
+
+
+
+
+class HealthImporter:
+    """Importe un export Apple Health dans la table `health_records`.
+
+    Les records sont insérés par paquets de `chunk_size`, un paquet par
+    transaction, avec la progression (`CHECKPOINT_KEY`) : un import interrompu
+    reprend après le dernier paquet commité. Un import terminé enregistre la
+    creationDate max (`WATERMARK_KEY`) ; les exports suivants, cumulatifs,
+    n'insèrent que les records créés après.
+
+    Args:
+        turso_db (TursoDB): Base cible
+        chunk_size (int, optional): Records par transaction. Defaults to 5000.
+    """
+    def __init__(self, turso_db: TursoDB, chunk_size: int=5000) -> None:
+        self.turso_db = turso_db
+        self.chunk_size = chunk_size
+
+
+    def _get_meta(self, key: str) -> str | None:
+        res = self.turso_db.conn.execute("SELECT last_update FROM meta WHERE table_name = ?", (key,)).fetchone()
+        return res[0] if res else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        self.turso_db.conn.execute("""
+            INSERT INTO meta (table_name, last_update)
+                VALUES (?, ?)
+                ON CONFLICT(table_name) DO UPDATE SET last_update=excluded.last_update
+            """,
+            (key, value)
+        )
+
+    def watermark(self) -> int:
+        """creationDate max déjà importée, en secondes depuis epoch (0 si aucun import)"""
+        with self.turso_db.lock:
+            value = self._get_meta(WATERMARK_KEY)
+        return int(dt.fromisoformat(value).timestamp()) if value else 0
+
+    def import_file(self, path: str) -> ImportStats:
+        """Importe `path`, en reprenant l'import interrompu du même fichier s'il y en a un.
+
+        Args:
+            path (str): Chemin de export.xml
+
+        Returns:
+            ImportStats: Records lus, insérés, ignorés
+        """
+        with self.turso_db.lock:
+            init_db(self.turso_db.conn)
+            self.turso_db.conn.commit()
+            checkpoint = json.loads(self._get_meta(CHECKPOINT_KEY) or "{}")
+        watermark = self.watermark()
+
+        file_id = fingerprint(path)
+        resume = checkpoint.get("records", 0) if checkpoint.get("file") == file_id else 0
+        high = max(checkpoint.get("created", 0) if resume else 0, watermark)
+        if resume:
+            logger.info(f"Resuming {path} after {resume} records")
+        logger.info(f"Importing {path} (watermark {dt.fromtimestamp(watermark, timezone.utc).isoformat()})")
+
+        stats = ImportStats()
+        start = perf_counter()
+        records = iter_records(path)
+        for _ in zip(range(resume), records):
+            stats.records += 1
+            stats.skipped += 1
+
+        progress = ChunkResult(0, high=high)
+        rows = []
+        for row in convert_records(records, watermark, progress):
+            rows.append(row)
+            if len(rows) >= self.chunk_size:
+                checkpoint = {"file": file_id, "records": stats.records + progress.records, "created": progress.high}
+                self._commit_chunk(rows, stats, checkpoint)
+                rows = []
+
+        self._commit_chunk(rows, stats, None, watermark=progress.high)
+        self._finish(stats, progress, start, path)
+        return stats
+
+    def _finish(self, stats: ImportStats, progress: ChunkResult, start: float, path: str) -> None:
+        stats.records += progress.records
+        stats.skipped += progress.skipped
+        stats.invalid += progress.invalid
+        stats.elapsed = perf_counter() - start
+        logger.info(
+            f"{path}: {stats.records} records, {stats.inserted} inserted, {stats.skipped} skipped, "
+            f"{stats.invalid} invalid in {stats.elapsed:.1f}s ({stats.rate:.0f} records/s)"
+        )
+
+    def import_parallel(self, path: str, workers: int=None, chunk_bytes: int=16 << 20) -> ImportStats:
+        """Importe `path` en parsant des plages de l'export dans `workers` processus.
+
+        L'export est découpé sur des débuts de `<Record>` (`split_chunks`) ; chaque
+        plage est parsée et convertie par un processus, et ce processus-ci, seul
+        écrivain, insère les résultats au fil de leur arrivée (une transaction par
+        plage, avec la liste des plages faites pour la reprise). Au plus
+        2 x `workers` plages sont en cours, ce qui borne la mémoire.
+
+        Args:
+            path (str): Chemin de export.xml
+            workers (int, optional): Nombre de processus. Defaults to os.cpu_count().
+            chunk_bytes (int, optional): Taille des plages en octets. Defaults to 16 Mo.
+
+        Returns:
+            ImportStats: Records lus, insérés, ignorés
+        """
+        workers = workers or os.cpu_count() or 1
+        with self.turso_db.lock:
+            init_db(self.turso_db.conn)
+            self.turso_db.conn.commit()
+            checkpoint = json.loads(self._get_meta(CHECKPOINT_KEY) or "{}")
+        watermark = self.watermark()
+
+        file_id = fingerprint(path)
+        chunks = split_chunks(path, chunk_bytes)
+        same = checkpoint.get("file") == file_id and checkpoint.get("chunk_bytes") == chunk_bytes
+        done = set(checkpoint.get("chunks", [])) if same else set()
+        high = max(checkpoint.get("created", 0) if same else 0, watermark)
+        if done:
+            logger.info(f"Resuming {path}: {len(done)}/{len(chunks)} chunks already imported")
+        logger.info(f"Importing {path} in {len(chunks)} chunks with {workers} processes")
+
+        stats = ImportStats()
+        start = perf_counter()
+        progress = ChunkResult(0, high=high)
+        tasks = iter([(i, path, a, b, watermark) for i, (a, b) in enumerate(chunks) if i not in done])
+
+        with ProcessPoolExecutor(workers, mp_context=mp.get_context("spawn")) as pool:
+            pending = set()
+            while True:
+                for task in tasks:
+                    pending.add(pool.submit(parse_chunk, task))
+                    if len(pending) >= 2 * workers:
+                        break
+                if not pending:
+                    break
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    result = future.result()
+                    done.add(result.index)
+                    progress.records += result.records
+                    progress.skipped += result.skipped
+                    progress.invalid += result.invalid
+                    progress.high = max(progress.high, result.high)
+                    checkpoint = {"file": file_id, "chunk_bytes": chunk_bytes, "chunks": sorted(done), "created": progress.high}
+                    self._commit_chunk(result.rows, stats, checkpoint)
+
+        self._commit_chunk([], stats, None, watermark=progress.high)
+        self._finish(stats, progress, start, path)
+        return stats
+
+    def _commit_chunk(self, rows: list[tuple], stats: ImportStats, checkpoint: dict | None, watermark: int=None) -> None:
+        """Insère `rows` et enregistre la progression dans la même transaction.
+
+        Sans `checkpoint`, l'import est terminé : la progression est effacée et le
+        watermark avancé à `watermark`.
+        """
+        with self.turso_db.lock:
+            try:
+                cur = self.turso_db.conn.executemany(INSERT_HEALTH, rows)
+                inserted = max(cur.rowcount, 0)
+                if checkpoint is not None:
+                    self._set_meta(CHECKPOINT_KEY, json.dumps(checkpoint))
+                else:
+                    self.turso_db.conn.execute("DELETE FROM meta WHERE table_name = ?", (CHECKPOINT_KEY,))
+                    self._set_meta(WATERMARK_KEY, dt.fromtimestamp(watermark, timezone.utc).isoformat())
+                self.turso_db.conn.commit()
+            except Exception:
+                self.turso_db.conn.rollback()
+                raise
+        stats.inserted += inserted
+        stats.skipped += len(rows) - inserted
+        self.turso_db.pusher.mark_dirty()
+
+
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Importe un export Apple Health (export.xml) dans health_records.")
+    parser.add_argument("path", help="chemin de export.xml")
+    parser.add_argument("--workers", type=int, default=0, help="processus de parsing (0 : import en série)")
+    parser.add_argument("--chunk-mb", type=int, default=16, help="taille des plages parsées en parallèle")
+    args = parser.parse_args()
+
+    load_dotenv(dotenv_path=pjoin(workspace, 'settings', '.env'))
+    turso_db = TursoDB(
+        path=DB_PATH,
+        remote_url=getenv("TURSO_DATABASE_URL"),
+        auth_token=getenv("TURSO_AUTH_TOKEN")
+    )
+    try:
+        importer = HealthImporter(turso_db)
+        if args.workers:
+            importer.import_parallel(args.path, workers=args.workers, chunk_bytes=args.chunk_mb << 20)
+        else:
+            importer.import_file(args.path)
+    finally:
+        turso_db.close()
+
+
+if __name__=='__main__':
+    main()
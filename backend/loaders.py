@@ -0,0 +1,205 @@
+"""Chargements et agrégations utilisés par les pages Streamlit.
+
+Sans dépendance à Streamlit, pour pouvoir être mesurés hors de l'application
+(voir `benchmarks/bench_loaders.py`).
+"""
+import pandas as pd
+from datetime import date, timedelta, datetime as dt
+from dateutil.tz import tzlocal
+from numpy import cos, pi
+from typing import Iterable
+from .connection import get_pool
+from .models import Seance
+from .models_db import SeanceDB
+from .rollups import EPOCH
+from utility import timer_performance
+
+
+
+
+# |-----------Tendances---------|
+def day_range(start: date=None, end: date=None) -> tuple[int, int]:
+    """Bornes incluses en jours depuis epoch (colonne `day` des rollups, en jours locaux), sans limite si None"""
+    return (
+        (start - EPOCH).days if start is not None else -2**31,
+        (end - EPOCH).days if end is not None else 2**31,
+    )
+
+def load_seance_data(start: date=None, end: date=None) -> pd.DataFrame:
+    """Charger les agrégats par séance (table rollup_seance, voir `backend.rollups`)
+
+    Args:
+        start (date, optional): Premier jour (local) inclus. Defaults to tout l'historique.
+        end (date, optional): Dernier jour (local) inclus. Defaults to tout l'historique.
+    """
+    with get_pool().read() as conn:
+        df = pd.read_sql(
+            """SELECT date_ts,
+                      duration,
+                      volume,
+                      reps AS total_reps,
+                      series AS total_serie
+                FROM rollup_seance
+                WHERE day BETWEEN ? AND ? AND series > 0
+                ORDER BY date_ts DESC
+            """, conn, params=day_range(start, end))
+
+    # Heure locale sans fuseau, comme les jours des rollups : regroupements par jour/semaine cohérents
+    df['date'] = pd.to_datetime(df['date_ts'], unit="s", utc=True).dt.tz_convert(tzlocal()).dt.tz_localize(None)
+    df["duration"] = pd.to_timedelta(df["duration"], unit="s")
+
+    return df
+
+# Groupe musculaire principal (plus petit `target`) de chaque exercice, calculé
+# une fois par requête au lieu d'une sous-requête corrélée par ligne
+PRIMARY_MUSCLE_GROUP = """
+    primary_mg AS (
+        SELECT exercice_id, muscle_group_id
+        FROM (
+            SELECT exercice_id, muscle_group_id,
+                   ROW_NUMBER() OVER (PARTITION BY exercice_id ORDER BY target, muscle_group_id) AS rank
+            FROM exercice_muscle_group
+        )
+        WHERE rank = 1
+    )
+"""
+
+def load_body_part_data(start: date=None, end: date=None) -> pd.DataFrame:
+    """Séries, reps et volume par jour et par partie du corps du groupe musculaire
+    principal des exercices (table rollup_exercise_day, voir `backend.rollups`)
+
+    Args:
+        start (date, optional): Premier jour (local) inclus. Defaults to tout l'historique.
+        end (date, optional): Dernier jour (local) inclus. Defaults to tout l'historique.
+    """
+    with get_pool().read() as conn:
+        df = pd.read_sql(
+            f"""WITH {PRIMARY_MUSCLE_GROUP}
+                SELECT r.day,
+                      mg.body_part,
+                      SUM(r.series) AS series,
+                      SUM(r.reps) AS reps,
+                      SUM(r.volume) AS volume
+                FROM rollup_exercise_day AS r
+                JOIN primary_mg AS p ON p.exercice_id = r.exo_id
+                JOIN muscle_group AS mg ON mg.id = p.muscle_group_id
+                WHERE r.day BETWEEN ? AND ?
+                GROUP BY r.day, mg.body_part
+                ORDER BY r.day DESC
+            """, conn, params=day_range(start, end))
+
+    df['date'] = pd.to_datetime(df['day'], unit="D")
+
+    return df
+
+
+
+
+# |-----------Entraînement---------|
+@timer_performance
+def open_history() -> list[Seance]:
+    return SeanceDB.load_many()
+
+def group_workout_by_week(workouts: Iterable[Seance]) -> dict:
+    """Renvoie la liste des séances sous forme de dictionnaire avec comme clé la semaine et valeurs les séances de la semaines
+
+    Args:
+        workouts (Iterable[Seance]): Liste des séances
+
+    Returns:
+        dict: Dictionaire des séances rangé par semaines
+    """
+    weeks = {}
+    for workout in workouts:
+        year, week, _ = workout.date.isocalendar()
+        key = (year, week)
+
+        if key not in weeks:
+            weeks[key] = set()
+
+        weeks[key].add(workout.name)
+
+    return weeks
+
+def count_streak(workouts: Iterable[Seance]) -> int:
+    """Count the number of consecutive weeks with at least one workout.
+
+    Args:
+        workouts (list): List of Workout objects.
+
+    Returns:
+        int: Number of consecutive weeks with at least one workout.
+    """
+    weeks = group_workout_by_week(workouts)
+    sorted_weeks = sorted(weeks.keys(), reverse=True)
+
+    required_sessions = {"Upper A", "Lower", "Upper B"}
+    streak_count = 0
+    current_year, current_week, _ = date.today().isocalendar()
+    for year_week in sorted_weeks:
+        if year_week == (current_year, current_week) and not required_sessions.issubset(weeks[year_week]):
+            continue  # Ignore la semaine actuelle si elle n'est pas terminé
+        elif required_sessions.issubset(weeks[year_week]):
+            streak_count += 1
+        else:
+            break
+
+    return streak_count
+
+def weekly_workouts_volume(week_date: date=None) -> int:
+    """Calculate the total volume of workouts for a given week.
+
+    Args:
+        week_date (date): Date to retrieve week from. Defaults to today.
+
+    Returns:
+        float: Total volume of workouts for the week.
+    """
+    week_date = week_date or date.today()
+    start_of_week = week_date - timedelta(days=week_date.weekday())
+    end_of_week = start_of_week + timedelta(days=7)
+
+    with get_pool().read() as conn:
+        cur = conn.cursor()
+
+        cur.execute("""
+            SELECT duration FROM seances
+            WHERE date_ts >= ? AND date_ts < ?
+        """, (
+            dt.combine(start_of_week, dt.min.time()).timestamp(),
+            dt.combine(end_of_week, dt.min.time()).timestamp(),
+        ))
+
+        total_seconds = sum([duration or 0 for duration, in cur.fetchall()])
+
+    return total_seconds // 60
+
+
+
+
+# |-----------Flux---------|
+def load_exercise_series(exercise: str) -> pd.DataFrame:
+    """Séries d'un exercice, de la plus récente à la plus ancienne"""
+    with get_pool().read() as conn:
+        df = pd.read_sql_query("""
+            SELECT e.name AS Exercise, s.num AS "Set Number", s.reps AS Reps, s.weight AS Weight, s.date_ts AS Date
+            FROM series AS s
+            JOIN exercices AS e
+                ON s.exo_id = e.id
+            WHERE e.name = ?
+            ORDER BY s.date_ts DESC
+        """, conn, params=(exercise,))
+    df['Date'] = pd.to_datetime(df['Date'], unit="s", utc=True)
+
+    return df
+
+
+def volume(poids, reps):
+    return poids * reps
+
+
+def phi(poids, reps, rep_max=6, rep_min=4):
+    return (1 - cos(pi * (reps - rep_min) / (rep_max - rep_min)))/2
+
+def score(poids, reps, eps=0.07):
+    return poids * (1 - eps*phi(poids, reps))
@@ -1,6 +1,8 @@
 from datetime import datetime as dt, timedelta
 from turso.sync import ConnectionSync
+from typing import Sequence
 from settings import DB_PATH, logger
+from .rollups import refresh_rollups
 
 
 class MissingDataError(Exception):
@@ -9,11 +11,17 @@ class MissingDataError(Exception):
 
 
 class MuscleGroup():
+    __slots__ = ("id", "name", "body_part")
+
     def __init__(self, id: str, name: str, body_part: str) -> None:
         self.id = id
         self.name = name
         self.body_part = body_part
         
+    @classmethod
+    def from_row(cls, row: Sequence) -> "MuscleGroup":
+        """Construit depuis une ligne (id, name, body_part), sans accès à la base"""
+        return cls(*row)
     
     def __str__(self) -> str:
         return self.name
@@ -24,15 +32,28 @@ class MuscleGroup():
     def __hash__(self):
         return hash(self.id)
 
+    def __eq__(self, other):
+        if not isinstance(other, MuscleGroup):
+            return NotImplemented
+        return self.id == other.id
+
 
 
 class Exercice():
+    __slots__ = ("id", "name", "muscle_group", "difficulty")
+
     def __init__(self, id: str, name: str, muscle_group: list[MuscleGroup]=None, difficulty: str=None) -> None:
         self.id: str = id
         self.name: str = name
         self.muscle_group = muscle_group
         self.difficulty = difficulty
 
+    @classmethod
+    def from_row(cls, row: Sequence, muscle_group: list[MuscleGroup]=None) -> "Exercice":
+        """Construit depuis une ligne (id, name, dificulty), sans accès à la base"""
+        id, name, difficulty = row
+        return cls(id, name, muscle_group, difficulty)
+
     def __str__(self) -> str:
         return self.name
     
@@ -42,11 +63,18 @@ class Exercice():
     def __hash__(self):
         return hash(self.id)
 
+    def __eq__(self, other):
+        if not isinstance(other, Exercice):
+            return NotImplemented
+        return self.id == other.id
+
 
 
 
 class Serie():
-    def __init__(self, id=None, exo: str=None, date: dt=None, num: int=None, reps: int=None, poids: float=None, seance_id: str=None) -> None:
+    __slots__ = ("id", "exo", "date", "num", "reps", "poids", "seance_id")
+
+    def __init__(self, id=None, exo: Exercice=None, date: dt=None, num: int=None, reps: int=None, poids: float=None, seance_id: str=None) -> None:
         self.id: str = id
         self.exo: Exercice = exo
         self.date: dt = date
@@ -55,6 +83,16 @@ class Serie():
         self.poids: float = poids
         self.seance_id: str = seance_id
     
+    @classmethod
+    def from_row(cls, row: Sequence, exo: Exercice) -> "Serie":
+        """Construit depuis une ligne (id, seance_id, num, reps, weight, date_ts), sans accès à la base
+
+        Args:
+            row (Sequence): Colonnes de la table series, hors exo_id
+            exo (Exercice): Exercice de la série, déjà résolu
+        """
+        id, seance_id, num, reps, weight, date_ts = row
+        return cls(id, exo, dt.fromtimestamp(date_ts), num, reps, weight, seance_id)
 
     def __repr__(self):
         return f"Série {self.num}: {self.reps} reps - {self.poids} kg"
@@ -66,6 +104,8 @@ class Serie():
         return hash((self.num, self.exo, self.date))
     
     def __eq__(self, other):
+        if not isinstance(other, Serie):
+            return NotImplemented
         return self.exo == other.exo and self.date == other.date and self.num == other.num
         
     def save_to_db(self, connection: ConnectionSync) -> None:
@@ -89,6 +129,8 @@ class Serie():
             "weight": self.poids,
             "date_ts": self.date.timestamp()
         })
+        # Pas de refresh_rollups ici : l'appelant rafraîchit une fois par séance
+        # (`Seance.save_to_db`, `NotionAPI.get_series`)
         
         logger.info(f"Serie {self.num}: {self.exo.name} - {self.date.date()} saved.")
         # except sqlite3.ProgrammingError as e:
@@ -106,17 +148,29 @@ class Serie():
 
 
 class Seance():
-    def __init__(self, id: str=None, name: str=None, body_part: str=None, date: dt=None, content={}, duration: timedelta=None) -> None:
+    __slots__ = ("id", "name", "body_part", "date", "content", "duration")
+
+    def __init__(self, id: str=None, name: str=None, body_part: str=None, date: dt=None, content: dict[str,list[Serie]]=None, duration: timedelta=None) -> None:
         self.id: str = id
         self.name: str = name
         self.body_part: str = body_part
         self.date: dt = date
-        self.content: dict[str,list[Serie]] = content
+        self.content: dict[str,list[Serie]] = content if content is not None else {}
         self.duration: timedelta = duration
  
+    @classmethod
+    def from_row(cls, row: Sequence, content: dict[str,list[Serie]]=None) -> "Seance":
+        """Construit depuis une ligne (id, name, date_ts, body_part, duration), sans accès à la base"""
+        id, name, date_ts, body_part, duration = row
+        return cls(id, name, body_part, dt.fromtimestamp(date_ts), content, timedelta(seconds=duration or 0))
         
     def __hash__(self):
         return hash(self.id)
+
+    def __eq__(self, other):
+        if not isinstance(other, Seance):
+            return NotImplemented
+        return self.id == other.id
             
     def __str__(self):
         return f"{self.name} - {self.date}"
@@ -142,5 +196,6 @@ class Seance():
             "body_part": self.body_part,
             "duration": self.duration.total_seconds(),
         })
+        refresh_rollups(connection, [self.id])
         
         logger.info(f"Seance: {self.name} - {self.date.date()} saved.")
\ No newline at end of file
@@ -1,11 +1,18 @@
-import sqlite3
-from notion_client import Client
-from utility import JsonFile, timer_performance
+import asyncio
+from notion_client import AsyncClient
+from utility import timer_performance
 from datetime import datetime as dt, timedelta
 from .models import Exercice, Serie, Seance, MuscleGroup
+from .connection import get_pool
+from .cache import get_reference_cache
+from .push import PushScheduler
+from .rollups import create_rollups
+from .schema import EXERCICE_SCHEMA, MUSCLE_GROUP_SCHEMA, notion_failures
+from contextlib import AbstractContextManager, nullcontext
 from settings import DB_PATH, logger
 import json
 from turso.sync import ConnectionSync
+from typing import Awaitable, Iterable
 
 from icecream import ic
 
@@ -21,8 +28,6 @@ class NotInDBError(ValueError):
 
 
 
-
-
 def init_db(conn: ConnectionSync) -> None:
     # Création de la table muscle_groupe
     conn.execute("""
@@ -38,13 +43,13 @@ def init_db(conn: ConnectionSync) -> None:
     CREATE TABLE IF NOT EXISTS exercices (
         id TEXT PRIMARY KEY NOT NULL,
         name TEXT NOT NULL UNIQUE,
-        dificulty TEXT NOT NULL CHECK (dificulty IN ('easy', 'medium', 'hard')),
+        dificulty TEXT NOT NULL CHECK (dificulty IN ('easy', 'medium', 'hard'))
     )
     """)
     
     # Création de la table de liaison exercices muscle_group    
     conn.execute("""
-    CREATE TABLE exercice_muscle_group (
+    CREATE TABLE IF NOT EXISTS exercice_muscle_group (
         exercice_id TEXT NOT NULL,
         muscle_group_id TEXT NOT NULL,
         target INTEGER NOT NULL CHECK (target BETWEEN 1 AND 10),
@@ -89,7 +94,21 @@ def init_db(conn: ConnectionSync) -> None:
         last_update TEXT
     )
     """)
-    
+
+    # Création de la table health_records (export Apple Health, voir backend.health)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS health_records (
+        type TEXT NOT NULL,
+        source TEXT NOT NULL DEFAULT '',
+        unit TEXT,
+        value REAL,
+        category TEXT,
+        start_ts INTEGER NOT NULL,
+        end_ts INTEGER NOT NULL,
+        created_ts INTEGER
+    )
+    """)
+
     conn.execute("""
     CREATE INDEX IF NOT EXISTS idx_emg_muscle
         ON exercice_muscle_group(muscle_group_id);
@@ -107,6 +126,20 @@ def init_db(conn: ConnectionSync) -> None:
     CREATE INDEX IF NOT EXISTS idx_series_seance
         ON series (seance_id);
     """)
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_health_type_start
+        ON health_records (type, start_ts);
+    """)
+    # Identité d'un record : l'export n'a pas d'identifiant, et une même fenêtre peut
+    # porter plusieurs mesures (valeurs ou unités différentes). IFNULL car des NULL
+    # ne sont jamais égaux pour un index UNIQUE : sans lui, un réimport dupliquerait.
+    conn.execute("""
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_health_record
+        ON health_records (type, source, start_ts, end_ts, IFNULL(unit, ''), IFNULL(value, ''), IFNULL(category, ''));
+    """)
+
+    # Tables d'agrégats des séances (voir backend.rollups)
+    create_rollups(conn)
 
     conn.execute("""
     CREATE VIEW IF NOT EXISTS seances_human AS
@@ -134,132 +167,193 @@ def init_db(conn: ConnectionSync) -> None:
 
 
 class ExoDB:
-    def __init__(self, db_path, turso_client: ConnectionSync) -> None:
+    def __init__(self, db_path, turso_client: ConnectionSync, push_scheduler: PushScheduler=None) -> None:
         self.db_path = db_path
         self.turso_client = turso_client
+        self.push_scheduler = push_scheduler
+
+    def _write_lock(self) -> AbstractContextManager:
+        """Verrou de la connexion Turso partagé avec le push en arrière-plan, s'il y en a un"""
+        return self.push_scheduler.lock if self.push_scheduler is not None else nullcontext()
 
     @staticmethod
     def get_exo_by_name(name: str, db_path: str=DB_PATH) -> Exercice:
         """Retourne l'exercice par son nom"""
-        with sqlite3.connect(db_path) as conn:
-            cur = conn.cursor()
-
-            cur.execute("SELECT id, name FROM exercices WHERE name==?", (name,))
-            res = cur.fetchone()
-            return Exercice(*res)
+        return get_reference_cache(db_path).exercice_by_name(
+            name, lambda name: ExerciceDB._load(name, db_path, by_name=True)
+        )
     
     @staticmethod
     def get_exo_by_id(id: str, db_path: str=DB_PATH) -> Exercice:
         """Retourne l'exercice par son ID Notion"""
-        with sqlite3.connect(db_path) as conn:
-            cur = conn.cursor()
-
-            cur.execute("SELECT id, name FROM exercices WHERE id==?", (id,))
-            res = cur.fetchone()
-            
-            if res is None:
-                raise NotInDBError(f"Exercice {id} introuvable en base de données.\nnotion.so/{id.replace('-', '')}")
-            
-            return Exercice(*res)
+        return get_reference_cache(db_path).exercice(id, lambda id: ExerciceDB._load(id, db_path))
 
     
     @timer_performance
-    def sync_from_notion(self, client_notion: Client, notion_url: str='026420f9e2b44f2bb72560c9775ac355') -> None:
-        """Récupère les nouveaux exercices depuis Notion et insère uniquement ceux qui n'existent pas
+    async def sync_from_notion(self, client_notion: AsyncClient, notion_url: str='026420f9e2b44f2bb72560c9775ac355', max_concurrency: int=8) -> None:
+        """Récupère les exercices depuis Notion et met à jour la base locale si la BDD Notion a changé
 
         Args:
-            client_notion (Client): Client notion
+            client_notion (AsyncClient): Client notion
             notion_url (str, optional): url de la BDD. Defaults to '026420f9e2b44f2bb72560c9775ac355'.
+            max_concurrency (int, optional): Nombre maximal de requêtes Notion simultanées. Defaults to 8.
         """
-        if self.has_change(client_notion, notion_url):
+        self.notion_calls = 0
+        db_header = await self._call(client_notion.databases.retrieve(notion_url))
+        if not self.has_change(db_header):
             logger.info("Exercices are up to date.")
             return
 
         logger.info("Syncing exercices from Notion...")
-        db = client_notion.databases.query(notion_url)
+        pages = []
+        data_source_id = db_header['data_sources'][0]['id']
+        response = await self._call(client_notion.data_sources.query(data_source_id))
+        pages.extend(response['results'])
+        while response.get('has_more'):
+            response = await self._call(client_notion.data_sources.query(data_source_id, start_cursor=response['next_cursor']))
+            pages.extend(response['results'])
         
-        self.fetch(db['results'], client_notion)
-        self.upate_date()
-            
-        self.turso_client.push()
-        logger.info("Exercices database updated.")
+        exos = await self.fetch(pages, client_notion, max_concurrency)
+        notion_failures.dump("error_data")
+        notion_failures.clear()
+        self.save_exos(exos, mark_synced=True)
+        logger.info(f"Exercices database updated: {len(pages)} exercices, {self.notion_calls} Notion calls.")
 
-    def fetch(self, pages: dict, client_notion: Client) -> None:
-        """Fetch the Notion database and update the local database if there are new exercices.
+    async def _call(self, request: Awaitable[dict]) -> dict:
+        """Attend une requête Notion en la comptabilisant dans `notion_calls`"""
+        self.notion_calls += 1
+        return await request
+
+    async def fetch(self, pages: list[dict], client_notion: AsyncClient, max_concurrency: int=8) -> list[Exercice]:
+        """Construit les exercices des pages Notion en récupérant leurs groupes musculaires.
+
+        Chaque groupe musculaire distinct n'est récupéré qu'une seule fois, en parallèle.
 
         Args:
-            pages (dict): Dictionnaires des exo référencés
+            pages (list[dict]): Pages Notion des exercices
+            client_notion (AsyncClient): Client notion
+            max_concurrency (int, optional): Nombre maximal de requêtes Notion simultanées. Defaults to 8.
+
+        Returns:
+            list[Exercice]: Exercices avec leurs groupes musculaires résolus
         """
-        for page in pages:
-            exo = self.retrieve_exos(page, client_notion)
-            self.save_exo(exo)
-            
-            mgs = exo.muscle_group
-            self.save_muscle_group(mgs)
-
-            logger.info(f"New exercice added: {exo.name} - {id}")
-
-    def retrieve_exos(self, page: dict, client_notion: Client) -> Exercice:
-        id = JsonFile.safe_get(page, "id")
-        name = JsonFile.safe_get(page, "properties.Name.title.0.plain_text")
-        muscle_group_ids = JsonFile.safe_get(page, "properties.Muscle Group.relation")
-        muscle_group = [self.retrieve_muscle_group(relation['id'], client_notion) for relation in muscle_group_ids]
-        difficulty = JsonFile.safe_get(page, "properties.Difficulty.select.name")
-
-        return Exercice(id, name, muscle_group, difficulty)
- 
-    def retrieve_muscle_group(self, id: str, client_notion: Client) -> MuscleGroup:
-        page = client_notion.pages.retrieve(id)
-        name = JsonFile.safe_get(page, "properties.Name.title.0.plain_text")
-        body_part = JsonFile.safe_get(page, "properties.Body Part.select.name")
-        
-        return MuscleGroup(id, name, body_part)
+        exos = EXERCICE_SCHEMA.parse(pages)
+        mg_ids = {id for ids in exos["muscle_groups"] for id in ids or []}
+        semaphore = asyncio.Semaphore(max_concurrency)
+        mg_pages = await asyncio.gather(*(self.retrieve_muscle_group(id, client_notion, semaphore) for id in mg_ids))
+        muscle_groups = {
+            id: MuscleGroup(id, name, body_part)
+            for id, name, body_part in MUSCLE_GROUP_SCHEMA.parse(mg_pages).rows()
+        }
+        logger.info(f"{len(muscle_groups)} muscle groups retrieved for {len(pages)} exercices.")
+        if exos.rejected:
+            logger.warning(f"{len(exos.rejected)} exercices ignored, see error_data.json")
+
+        return [
+            Exercice(id, name, [muscle_groups[mg] for mg in mgs or [] if mg in muscle_groups], difficulty)
+            for id, name, mgs, difficulty in exos.rows()
+        ]
+
+    async def retrieve_muscle_group(self, id: str, client_notion: AsyncClient, semaphore: asyncio.Semaphore) -> dict:
+        async with semaphore:
+            return await self._call(client_notion.pages.retrieve(id))
     
+    def save_exos(self, exos: list[Exercice], push: bool=True, mark_synced: bool=False) -> None:
+        """Enregistre un lot d'exercices, leurs groupes musculaires et les liaisons en une seule transaction.
+
+        Les liaisons existantes des exercices du lot sont remplacées, l'ordre des
+        groupes musculaires donnant la valeur `target` (1 = groupe principal).
+
+        Args:
+            exos (list[Exercice]): Exercices à enregistrer
+            push (bool, optional): Pousse les changements vers Turso après le commit, via
+                `push_scheduler` s'il est fourni. Defaults to True.
+            mark_synced (bool, optional): Date `meta.last_update` des exercices et groupes
+                musculaires, ce qui marque tout le catalogue comme synchronisé avec Notion.
+                Réservé à `sync_from_notion`. Defaults to False.
+        """
+        muscle_groups = {mg.id: mg for exo in exos for mg in exo.muscle_group or []}
+        links = [
+            (exo.id, mg.id, min(target, 10))
+            for exo in exos
+            for target, mg in enumerate(exo.muscle_group or [], start=1)
+        ]
+
+        with self._write_lock():
+            try:
+                self._upsert_muscle_groups(muscle_groups.values())
+                self.turso_client.executemany(
+                    """INSERT INTO exercices (id, name, dificulty) 
+                        VALUES (?, ?, ?)
+                        ON CONFLICT(id) DO UPDATE SET
+                            name=excluded.name,
+                            dificulty=excluded.dificulty;
+                        """,
+                    [(exo.id, exo.name, exo.difficulty) for exo in exos]
+                )
+                self.turso_client.executemany(
+                    "DELETE FROM exercice_muscle_group WHERE exercice_id = ?",
+                    [(exo.id,) for exo in exos]
+                )
+                self.turso_client.executemany(
+                    """INSERT INTO exercice_muscle_group (exercice_id, muscle_group_id, target)
+                        VALUES (?, ?, ?)
+                        """,
+                    links
+                )
+                if mark_synced:
+                    self.upate_date(commit=False)
+                self.turso_client.commit()
+            except Exception:
+                self.turso_client.rollback()
+                raise
+        get_reference_cache(self.db_path).invalidate()
+        logger.info(f"{len(exos)} exercices, {len(muscle_groups)} muscle groups and {len(links)} links saved.")
+
+        if push and self.push_scheduler is not None:
+            self.push_scheduler.mark_dirty()
+        elif push:
+            self.turso_client.push()
+
     def save_exo(self, exo: Exercice) -> None:
-        mg_ids = [group.id for group in exo.muscle_group] if isinstance(exo.muscle_group, list) else exo.muscle_group.id
-        self.turso_client.execute(
-            """INSERT INTO exercices (id, name, muscle_group, dificulty) 
-                VALUES (?, ?, ?, ?)
-                ON CONFLICT(id) DO UPDATE SET
-                    name=excluded.name,
-                    muscle_group=excluded.muscle_group,
-                    dificulty=excluded.dificulty;
-                """,
-            (exo.id, exo.name, json.dumps(mg_ids), exo.difficulty)
-        )
-        self.turso_client.commit()
-        self.logger.info(f"Exercice saved: {exo.name} - {exo.id}")
+        self.save_exos([exo])
     
     def save_muscle_group(self, mgs: MuscleGroup|list[MuscleGroup]) -> None:
         if isinstance(mgs, MuscleGroup):
             mgs = [mgs]
 
-        for mg in mgs:
-            self.turso_client.execute(
-                """INSERT INTO muscle_group (id, name, body_part) 
-                    VALUES (?, ?, ?)
-                    ON CONFLICT(id) DO UPDATE SET
-                        name=excluded.name,
-                        body_part=excluded.body_part;
-                    """,
-                (mg.id, mg.name, mg.body_part)
-            )
-            self.turso_client.commit()
-            self.logger.info(f"Muscle group saved: {mg.name} - {mg.id}")
+        with self._write_lock():
+            try:
+                self._upsert_muscle_groups(mgs)
+                self.turso_client.commit()
+            except Exception:
+                self.turso_client.rollback()
+                raise
+        logger.info(f"{len(mgs)} muscle groups saved.")
+
+    def _upsert_muscle_groups(self, mgs: Iterable[MuscleGroup]) -> None:
+        self.turso_client.executemany(
+            """INSERT INTO muscle_group (id, name, body_part) 
+                VALUES (?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    name=excluded.name,
+                    body_part=excluded.body_part;
+                """,
+            [(mg.id, mg.name, mg.body_part) for mg in mgs]
+        )
         
         
-    def has_change(self, client_notion: Client, notion_url: str) -> bool:
+    def has_change(self, db_header: dict) -> bool:
         """Check if the Notion database has been updated since the last sync.
 
         Args:
-            client_notion (Client): Client notion
+            db_header (dict): Objet database renvoyé par `databases.retrieve`
 
         Returns:
             bool: Booléen indiquant si la DB a changé
         """
-        db_header = client_notion.databases.retrieve(notion_url)
         uptdate_date = dt.fromisoformat(db_header['last_edited_time'].replace("Z", "+00:00"))
-        with sqlite3.connect(self.db_path) as conn:
+        with get_pool(self.db_path).read() as conn:
             cur = conn.cursor()
             cur.execute("SELECT last_update FROM meta WHERE table_name=?", ("exercices",))
             try:
@@ -267,11 +361,11 @@ class ExoDB:
             except TypeError:
                 return True
 
-            local_last_update = dt.fromisoformat(date)
+            local_last_update = dt.fromisoformat(date).astimezone()
         
         return local_last_update < uptdate_date
 
-    def upate_date(self) -> None:
+    def upate_date(self, commit: bool=True) -> None:
         for db in ["exercices", "muscle_group"]:
             self.turso_client.execute("""
                 INSERT INTO meta (table_name, last_update)
@@ -280,72 +374,90 @@ class ExoDB:
                 """, 
                 (db, dt.now().isoformat())
             )
-        self.turso_client.commit()
+        if commit:
+            self.turso_client.commit()
+            get_reference_cache(self.db_path).invalidate()
 
 
 
 
 class MuscleGroupDB(MuscleGroup):
+    __slots__ = ()
+
     def __init__(self, id: str):
         assert id is not None, "MuscleGroupDB id cannot be None."
-        self.id = id
-        with sqlite3.connect(DB_PATH) as conn:
+        mg = get_reference_cache().muscle_group(id, self._load)
+
+        self.id = mg.id
+        self.name = mg.name
+        self.body_part = mg.body_part
+
+    @staticmethod
+    def _load(id: str, db_path: str=DB_PATH) -> MuscleGroup:
+        with get_pool(db_path).read() as conn:
             cur = conn.cursor()
             
             cur.execute("""
-                SELECT name, body_part
+                SELECT id, name, body_part
                 FROM muscle_group
                 WHERE id = ?
             """, (id,))
-            try:
-                name, body_part = cur.fetchone()
-            except TypeError:
+            row = cur.fetchone()
+            if row is None:
                 raise NotInDBError(f"Groupe musculaire {id} introuvable en base de données.\nnotion.so/{id.replace('-', '')}")
         
-        self.name = name
-        self.body_part = body_part
+        return MuscleGroup.from_row(row)
 
 
 
 class ExerciceDB(Exercice):
+    __slots__ = ()
+
     def __init__(self, id: str):
-        self.id = id
-        with sqlite3.connect(DB_PATH) as conn:
+        exo = get_reference_cache().exercice(id, self._load)
+
+        self.id = exo.id
+        self.name = exo.name
+        self.muscle_group = exo.muscle_group
+        self.difficulty = exo.difficulty
+        
+    @staticmethod
+    def _load(key: str, db_path: str=DB_PATH, by_name: bool=False) -> Exercice:
+        """Charge un exercice et ses groupes musculaires depuis la base (sans passer par le cache)"""
+        with get_pool(db_path).read() as conn:
             cur = conn.cursor()
             
-            cur.execute("""
-                SELECT name, dificulty
+            cur.execute(f"""
+                SELECT id, name, dificulty
                 FROM exercices
-                WHERE id = ?
-            """, (id,))
-            try:
-                name, dificulty = cur.fetchone()
-            except TypeError:
-                raise NotInDBError(f"Exercice {id} introuvable en base de données.\nnotion.so/{id.replace('-', '')}")
-        
-        self.name = name
-        self.muscle_group = self._parse_muscle_group(id)
-        self.difficulty = dificulty
-        
-    
-    def _parse_muscle_group(self, ids: list[str]) -> list[MuscleGroup]:
-        with sqlite3.connect(DB_PATH) as conn:
-            cur = conn.cursor()
+                WHERE {'name' if by_name else 'id'} = ?
+            """, (key,))
+            row = cur.fetchone()
+            if row is None:
+                raise NotInDBError(f"Exercice {key} introuvable en base de données.\nnotion.so/{key.replace('-', '')}")
+            id = row[0]
+
             cur.execute("""
                 SELECT muscle_group_id
                 FROM exercice_muscle_group
                 WHERE exercice_id = ?
-            """, (self.id,))
+                ORDER BY target
+            """, (id,))
             mg_ids = [mg_id for mg_id, in cur.fetchall()]
 
-        return [MuscleGroupDB(mg_id) for mg_id in mg_ids]
+        cache = get_reference_cache(db_path)
+        muscle_group = [cache.muscle_group(mg_id, lambda id: MuscleGroupDB._load(id, db_path)) for mg_id in mg_ids]
+
+        return Exercice.from_row(row, muscle_group)
 
 
 
 class SerieDB(Serie):
+    __slots__ = ()
+
     def __init__(self, id: str, *args, **kwargs) -> None:
         self.id = id
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_pool().read() as conn:
             cur = conn.cursor()
             
             cur.execute("""
@@ -369,9 +481,11 @@ class SerieDB(Serie):
 
 
 class SeanceDB(Seance):
+    __slots__ = ()
+
     def __init__(self, id: str, *args, **kwargs) -> None:
         self.id = id
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_pool().read() as conn:
             cur = conn.cursor()
 
             cur.execute("""
@@ -395,7 +509,7 @@ class SeanceDB(Seance):
         """Récupère les séries associées à la séance et les organise par exercice."""
         
         # Récupérer les IDs des séries associées à la séance
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_pool().read() as conn:
             cur = conn.cursor()
             cur.execute("""
                     SELECT id FROM series
@@ -412,8 +526,82 @@ class SeanceDB(Seance):
         exos = [ExoDB.get_exo_by_id(id=exo_id) for exo_id in exo_ids]
 
         # Organiser les séries par exercice
-        self.content = {
+        return {
             exo.name: [s for s in series if s.exo.id == exo.id]
             for exo in exos
         }
 
+
+
+    @classmethod
+    def load_many(cls, ids: Iterable[str]=None, start: dt=None, end: dt=None, db_path: str=DB_PATH) -> list[Seance]:
+        """Charge plusieurs séances complètes (séries, exercices, groupes musculaires) en deux requêtes.
+
+        Le nombre de requêtes ne dépend pas du nombre de séances : une jointure
+        seances/series/exercices puis une requête pour les groupes musculaires.
+
+        Args:
+            ids (Iterable[str], optional): IDs Notion des séances à charger. Defaults to None (toutes).
+            start (dt, optional): Date de début incluse. Defaults to None.
+            end (dt, optional): Date de fin incluse. Defaults to None.
+            db_path (str, optional): Chemin de la base. Defaults to DB_PATH.
+
+        Returns:
+            list[Seance]: Séances triées par date décroissante
+        """
+        where, params = [], []
+        if ids is not None:
+            where.append("w.id IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(list(ids)))
+        if start is not None:
+            where.append("w.date_ts >= ?")
+            params.append(start.timestamp())
+        if end is not None:
+            where.append("w.date_ts <= ?")
+            params.append(end.timestamp())
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+
+        with get_pool(db_path).read() as conn:
+            cur = conn.cursor()
+            cur.execute(f"""
+                SELECT w.id, w.name, w.date_ts, w.body_part, w.duration,
+                       s.id, s.num, s.reps, s.weight, s.date_ts,
+                       e.id, e.name, e.dificulty
+                FROM seances AS w
+                LEFT JOIN series AS s ON s.seance_id = w.id
+                LEFT JOIN exercices AS e ON e.id = s.exo_id
+                {clause}
+                ORDER BY w.date_ts DESC, w.id, s.num ASC
+            """, params)
+            rows = cur.fetchall()
+
+            cur.execute("""
+                SELECT emg.exercice_id, mg.id, mg.name, mg.body_part
+                FROM exercice_muscle_group AS emg
+                JOIN muscle_group AS mg ON mg.id = emg.muscle_group_id
+                ORDER BY emg.exercice_id, emg.target
+            """)
+            muscle_groups: dict[str, list[MuscleGroup]] = {}
+            for exo_id, *mg in cur.fetchall():
+                muscle_groups.setdefault(exo_id, []).append(MuscleGroup.from_row(mg))
+
+        seances: dict[str, Seance] = {}
+        exos: dict[str, Exercice] = {}
+        for row in rows:
+            seance_id = row[0]
+            seance = seances.get(seance_id)
+            if seance is None:
+                seance = seances[seance_id] = Seance.from_row(row[:5])
+
+            serie_id, num, reps, weight, serie_ts, exo_id = row[5:11]
+            if serie_id is None:
+                continue
+
+            exo = exos.get(exo_id)
+            if exo is None:
+                exo = exos[exo_id] = Exercice.from_row(row[10:], muscle_groups.get(exo_id, []))
+
+            serie = Serie.from_row((serie_id, seance_id, num, reps, weight, serie_ts), exo)
+            seance.content.setdefault(exo.name, []).append(serie)
+
+        return list(seances.values())
@@ -8,113 +8,88 @@ sys.path.append(abspath(dirname(__file__) + "/.."))
 from dotenv import load_dotenv
 # # |-----------Module pour le projet---------|
 from notion_client import Client, AsyncClient
-from utility import JsonFile
+from utility import JsonPath
 from settings import DB_PATH, workspace, logger
 from backend import *
-import sqlite3
+from backend.rollups import MAX_PARAMS
 from turso.sync import ConnectionSync
 import aiosqlite
 import asyncio
 from datetime import datetime as dt, timedelta
-from typing import Generator, AsyncGenerator
+from typing import Generator, AsyncGenerator, AsyncIterator
+from dataclasses import dataclass, field
+from itertools import batched
+from time import perf_counter
 
 
 
 load_dotenv(dotenv_path=pjoin(workspace, 'settings', '.env'))
 
 
-client_notion = AsyncClient(auth=getenv("NOTION_TOKEN_CARNET"))
+client_notion = RateLimitedAsyncClient(auth=getenv("NOTION_TOKEN_CARNET"))
 
 
 
 
 
-class SerieNotionPolling(Serie):
-    def __init__(self, id: str, data: dict={}) -> None:
-        if not data:
-            page: dict = client_notion.pages.retrieve(id)
-            data = page['properties']
-            
-        self.id: str = id
-        self.exo: Exercice = self._parse_exo(data)
-        self.date: dt = self._parse_date(data)
-        self.num: int = int(JsonFile.safe_get(data, "Sets.title.0.plain_text"))
-        self.reps: int = int(JsonFile.safe_get(data, "Reps.number"))
-        self.poids: float = float(JsonFile.safe_get(data, "Poids.number"))
-        self.seance_id: str = JsonFile.safe_get(data, "Weekly Split Schedule.relation.0.id")
+SEANCE_SERIES = JsonPath("Workout Exercises.relation")
+
 
 
-    def _parse_exo(self, data: dict) -> Exercice:
-        try:
-            exo_id = JsonFile.safe_get(data, "Exercise.relation.0.id")
-            return ExoDB.get_exo_by_id(exo_id)
-        except NotInDBError as e:
-            JsonFile.write(data, "error_data.json")
-            
-        
-    def _parse_date(self, data: dict) -> dt:
-        date_str = JsonFile.safe_get(data, "Date .date.start")
-        return dt.fromisoformat(date_str)
+
+
+class SerieNotionPolling(Serie):
+    __slots__ = ()
+
+    def __init__(self, id: str, data: dict) -> None:
+        fields = SERIE_SCHEMA.record(data)
+        self.id: str = id
+        self.exo: Exercice = ExoDB.get_exo_by_id(fields["exo_id"])
+        self.date: dt = dt.fromtimestamp(fields["date_ts"])
+        self.num: int = fields["num"]
+        self.reps: int = fields["reps"]
+        self.poids: float = fields["weight"]
+        self.seance_id: str = fields["seance_id"]
 
     
     
 
 class SeanceNotionPolling(Seance):
-    def __init__(self, id: str, data: dict) -> None:
+    __slots__ = ()
+
+    def __init__(self, id: str, data: dict, series: list[Serie]=None) -> None:
+        """Séance construite depuis les propriétés de sa page Notion.
+
+        Args:
+            id (str): ID Notion de la séance
+            data (dict): Propriétés de la page
+            series (list[Serie], optional): Séries déjà récupérées de la séance. Defaults to None.
+        """
+        fields = SEANCE_SCHEMA.record(data)
         self.id: str = id
-        self.name: str = JsonFile.safe_get(data, "Name.title.0.plain_text")
-        self.body_part: str = JsonFile.safe_get(data, "Body Part.select.name")
-        self.date: dt = self._parse_date(data)
-        self.content: dict[str, list[Serie]] = self._parse_content(data)
-        self.duration: timedelta = self._parse_duration(data)
+        self.name: str = fields["name"]
+        self.body_part: str = fields["body_part"]
+        self.date: dt = dt.fromtimestamp(fields["date_ts"])
+        self.content: dict[str, list[Serie]] = self._parse_content(series or [])
+        self.duration: timedelta = self._parse_duration(fields["date_ts"], fields["end_ts"])
         
-    
-    def _parse_date(self, data: dict):
-        date_str = JsonFile.safe_get(data, "Date.date.start")
-        return dt.fromisoformat(date_str)
 
-    def _parse_content(self, data):
-        exos = map(lambda x: ExoDB.get_exo_by_id(x['id']), JsonFile.safe_get(data, "Exercises.relation"))
-        series = self._parse_serie(JsonFile.safe_get(data, "Workout Exercises.relation"))
-        
-        return {
-            exo.name: list(filter(lambda serie: serie.exo.name == exo.name, series)) for exo in exos
-        }
+    def _parse_content(self, series: list[Serie]) -> dict[str, list[Serie]]:
+        content = {}
+        for serie in sorted(series):
+            content.setdefault(serie.exo.name, []).append(serie)
+        return content
         
-    def _parse_duration(self, data):
-        try:
-            start = self.date
-            end_str = JsonFile.safe_get(data, "Date.date.end")
-            end = dt.fromisoformat(end_str)
-            return end - start
-        except TypeError:
+    def _parse_duration(self, start_ts: float, end_ts: float | None) -> timedelta:
+        if end_ts is None:
             logger.warning(f"{self.__repr__} has no end date, setting duration to 0.")
             return timedelta(0)
+        return timedelta(seconds=end_ts - start_ts)
 
-    def _parse_serie(self, ids: list[str]) -> list[Serie]:
-        series = []
-        
-        for e in ids:
-            if self.serie_exists(e['id']):
-                series.append(SerieDB(e['id']))
-            else:
-                series.append(SerieNotionPolling(e['id']))
-                
-        return series
-
-    async def serie_exists(self, id: str) -> bool:
-        conn = await aiosqlite.connect(DB_PATH)
-        async with conn.execute("SELECT id FROM series WHERE id = ?", (id,)) as cursor:
-            res = await cursor.fetchone()
-        with sqlite3.connect(DB_PATH) as conn:
-            cur = conn.cursor()
-            cur.execute("""
-                SELECT EXISTS(
-                    SELECT 1 FROM series 
-                    WHERE exo_id = ?
-                )""", (id,))
-            
-            return cur.fetchone()[0] == 1
+    @staticmethod
+    def serie_ids(data: dict) -> list[str]:
+        """IDs des séries liées à la page de la séance"""
+        return [relation['id'] for relation in SEANCE_SERIES.get(data) or []]
     
 
     def save_seance(self, connection: ConnectionSync) -> None:
@@ -132,32 +107,312 @@ class SeanceNotionPolling(Seance):
 
 
 
+@dataclass
+class StageStats:
+    """Débit d'un étage du pipeline d'ingestion."""
+    name: str
+    items: int = 0
+    busy: float = 0.0   # temps passé à traiter, en secondes
+
+    def report(self, elapsed: float) -> str:
+        rate = self.items / elapsed if elapsed else 0
+        return f"{self.name}: {self.items} items, {rate:.1f}/s, busy {self.busy:.2f}s"
+
+
+
+@dataclass
+class SeanceJob:
+    """Séance en cours d'ingestion, en attente de ses séries."""
+    page: dict
+    edited: dt
+    remaining: int = 0
+    series: list[dict] = field(default_factory=list)     # pages Notion des séries
+    failed: bool = False
+
+
+
+class SeanceIngestPipeline:
+    """Pipeline asyncio d'ingestion des séances Notion.
+
+    pages Notion -> vérification d'existence (une requête par page de résultats)
+    -> récupération concurrente des séries (`workers` tâches) -> écrivain unique par lots.
+
+    Les files sont bornées : un étage lent ralentit ceux qui l'alimentent.
+
+    Avec `skip_existing`, les séances déjà en base sont ignorées, sauf celles
+    modifiées depuis `edited_since` (le watermark précédent) : leurs
+    modifications ne sont pas encore synchronisées.
+
+    Toutes les séries d'une séance traitée sont récupérées et remplacent celles
+    en base. Limite : modifier seulement une page de série ne change pas le
+    `last_edited_time` de sa séance, et n'est donc synchronisé qu'à la
+    prochaine modification de la séance.
+    """
+    def __init__(self, client: AsyncClient, turso_db: TursoDB, skip_existing: bool=True, edited_since: dt=None, workers: int=4, batch_size: int=50, linger: float=0.5, queue_size: int=100) -> None:
+        self.client = client
+        self.turso_db = turso_db
+        self.skip_existing = skip_existing
+        self.edited_since = edited_since
+        self.workers = workers
+        self.batch_size = batch_size
+        self.linger = linger    # attente max de l'écrivain pour compléter un lot
+
+        self.pages_q: asyncio.Queue[list[dict] | None] = asyncio.Queue(maxsize=2)
+        self.series_q: asyncio.Queue[tuple[SeanceJob, str]] = asyncio.Queue(maxsize=queue_size)
+        self.write_q: asyncio.Queue[SeanceJob | None] = asyncio.Queue(maxsize=queue_size)
+
+        self.stats = {name: StageStats(name) for name in ("pages", "check", "fetch", "write")}
+        self.high_water: dt = None      # last_edited_time max des séances écrites
+        self.low_failed: dt = None      # last_edited_time min des séances en échec
+        self.written = 0
+
+
+    async def run(self, pages: AsyncIterator[list[dict]]) -> None:
+        """Ingère les pages de résultats Notion fournies par `pages`"""
+        start = perf_counter()
+        async with aiosqlite.connect(DB_PATH) as conn:
+            async with asyncio.TaskGroup() as tg:
+                producer = tg.create_task(self._produce(pages))
+                checker = tg.create_task(self._check(conn))
+                fetchers = [tg.create_task(self._fetch()) for _ in range(self.workers)]
+                writer = tg.create_task(self._write())
+
+                await producer
+                await checker
+                await self.series_q.join()
+                for task in fetchers:
+                    task.cancel()
+                await self.write_q.put(None)
+                await writer
+
+        elapsed = perf_counter() - start
+        logger.info(f"Ingestion: {self.written} seances in {elapsed:.2f}s")
+        for stage in self.stats.values():
+            logger.info(stage.report(elapsed))
+
+    async def _produce(self, pages: AsyncIterator[list[dict]]) -> None:
+        stats = self.stats["pages"]
+        async for results in pages:
+            stats.items += len(results)
+            await self.pages_q.put(results)
+        await self.pages_q.put(None)
+
+    async def _check(self, conn: aiosqlite.Connection) -> None:
+        stats = self.stats["check"]
+        while (results := await self.pages_q.get()) is not None:
+            t = perf_counter()
+            ids = [page['id'] for page in results]
+            existing_seances = await self._existing(conn, "seances", ids) if self.skip_existing else set()
+
+            jobs = []
+            for page in results:
+                edited = dt.fromisoformat(page['last_edited_time'].replace("Z", "+00:00"))
+                if page['id'] in existing_seances and (self.edited_since is None or edited < self.edited_since):
+                    continue
+                jobs.append((SeanceJob(page, edited), SeanceNotionPolling.serie_ids(page['properties'])))
+
+            stats.items += len(jobs)
+            stats.busy += perf_counter() - t
+
+            # Séries existantes comprises : elles peuvent avoir changé avec la séance
+            for job, serie_ids in jobs:
+                job.remaining = len(serie_ids)
+                if not serie_ids:
+                    await self.write_q.put(job)
+                for id in serie_ids:
+                    await self.series_q.put((job, id))
+
+    @staticmethod
+    async def _existing(conn: aiosqlite.Connection, table: str, ids: list[str]) -> set[str]:
+        if not ids:
+            return set()
+        rows = await conn.execute_fetchall(
+            f"SELECT id FROM {table} WHERE id IN ({', '.join('?' * len(ids))})", ids
+        )
+        return {id for id, in rows}
+
+    async def _fetch(self) -> None:
+        stats = self.stats["fetch"]
+        while True:
+            job, serie_id = await self.series_q.get()
+            t = perf_counter()
+            try:
+                job.series.append(await self.client.pages.retrieve(serie_id))
+            except Exception as e:
+                logger.error(f"Série {serie_id} de la séance {job.page['id']} non récupérée: {e}")
+                job.failed = True
+            finally:
+                stats.items += 1
+                stats.busy += perf_counter() - t
+                job.remaining -= 1
+                if job.remaining == 0:
+                    await self.write_q.put(job)
+                self.series_q.task_done()
+
+    async def _write(self) -> None:
+        loop = asyncio.get_running_loop()
+        done = False
+        while not done:
+            batch = [await self.write_q.get()]
+            deadline = loop.time() + self.linger
+            while batch[-1] is not None and len(batch) < self.batch_size:
+                try:
+                    batch.append(await asyncio.wait_for(self.write_q.get(), max(0, deadline - loop.time())))
+                except TimeoutError:
+                    break
+            if batch[-1] is None:
+                batch.pop()
+                done = True
+            if batch:
+                # Écritures SQLite bloquantes (et verrou partagé avec le push) hors de la boucle
+                await asyncio.to_thread(self._write_batch, batch)
+
+    def _write_batch(self, jobs: list[SeanceJob]) -> None:
+        """Parse les séances du lot et toutes leurs séries d'un bloc, puis les écrit.
+
+        Une séance dont la page ou une série est invalide (propriété manquante,
+        exercice inconnu) n'est pas écrite et sera reprise au prochain passage.
+        """
+        stats = self.stats["write"]
+        t = perf_counter()
+        fetched = [job for job in jobs if not job.failed]
+        seance_of = {page['id']: job.page['id'] for job in fetched for page in job.series}
+        seances = SEANCE_SCHEMA.parse(job.page for job in fetched)
+        series = SERIE_SCHEMA.parse(page for job in fetched for page in job.series)
+
+        invalid = set(seances.rejected) | {seance_of[id] for id in series.rejected}
+        known = self._known_exercices(set(series["exo_id"]))
+        for id, exo_id in series.rows("id", "exo_id"):
+            if exo_id not in known:
+                logger.error(f"Exercice {exo_id} introuvable pour la série {id}")
+                invalid.add(seance_of[id])
+
+        for job in jobs:
+            if job.failed or job.page['id'] in invalid:
+                self.low_failed = job.edited if self.low_failed is None else min(self.low_failed, job.edited)
+            else:
+                self.high_water = job.edited if self.high_water is None else max(self.high_water, job.edited)
+
+        seances = seances.filter(id not in invalid for id in seances["id"])
+        series = series.filter(seance_of[id] not in invalid for id in series["id"])
+        if len(seances):
+            durations = [end - start if end is not None else 0 for start, end in seances.rows("date_ts", "end_ts")]
+            # Séances, séries et agrégats du lot commités ensemble : un échec ne laisse pas les rollups en retard
+            with self.turso_db.transaction() as conn:
+                self.turso_db.upsert_many(
+                    "seances",
+                    zip(seances["id"], seances["name"], seances["date_ts"], seances["body_part"], durations),
+                    ["id", "name", "date_ts", "body_part", "duration"],
+                    conflict=["id"],
+                    commit=False,
+                )
+                # Les séries des séances écrites sont remplacées par celles récupérées
+                self._delete_series(conn, seances["id"])
+                if len(series):
+                    self.turso_db.upsert_many(
+                        "series",
+                        series.rows("id", "seance_id", "num", "exo_id", "reps", "weight", "date_ts"),
+                        ["id", "seance_id", "num", "exo_id", "reps", "weight", "date_ts"],
+                        conflict=["id"],
+                        commit=False,
+                    )
+                refresh_rollups(conn, seances["id"])
+        self.written += len(seances)
+        stats.items += len(seances)
+        stats.busy += perf_counter() - t
+        logger.info(f"{len(seances)} seances, {len(series)} series written ({len(jobs) - len(seances)} failed)")
+
+    @staticmethod
+    def _delete_series(conn: ConnectionSync, seance_ids: list[str]) -> None:
+        for ids in batched(seance_ids, MAX_PARAMS):
+            conn.execute(f"DELETE FROM series WHERE seance_id IN ({', '.join('?' * len(ids))})", ids)
+
+    @staticmethod
+    def _known_exercices(ids: set[str]) -> set[str]:
+        known = set()
+        for id in ids:
+            try:
+                ExoDB.get_exo_by_id(id)
+                known.add(id)
+            except NotInDBError:
+                pass
+        return known
+
+
+
+
+
+
 class NotionAPI():
+    SEANCES_DS_ID = "848c44b2-c392-4618-9c5a-a761cd9b81e0"
+    FULL_SYNC_INTERVAL = timedelta(days=7)
+
     def __init__(self, client: AsyncClient, turso_db: TursoDB) -> None:
-        # ExoDB(db_path=DB_PATH,  turso_client=turso_db.conn).sync_from_notion(client_notion=client)
+        self.client = client
         self.turso_db = turso_db
         self.HISTORY_DS_ID = "5e1bdaf9-cc8d-48b5-ab26-205dcbf47d33"
 
-    async def open_database(self, data_source_id: str="848c44b2-c392-4618-9c5a-a761cd9b81e0") -> AsyncGenerator[dict]:
-        """Yields all the children of the page 'ZtH Carnet de bord'"""
-        response = await client_notion.data_sources.query(
-            data_source_id,
-            sorts=[
+    async def open_database_pages(self, data_source_id: str=SEANCES_DS_ID, since: dt=None) -> AsyncGenerator[list[dict]]:
+        """Yields the children of the page 'ZtH Carnet de bord', one Notion response page at a time
+
+        Args:
+            data_source_id (str, optional): Source de données Notion à parcourir.
+            since (dt, optional): Ne renvoie que les pages modifiées à partir de cette date. Defaults to None (toutes).
+        """
+        query = {
+            "sorts": [
                 {
                     "property": "Date",
                     "direction": "descending"
                 }
             ]
-        )
-        for r in response['results']:
-            yield r
+        }
+        if since is not None:
+            query["filter"] = {
+                "timestamp": "last_edited_time",
+                "last_edited_time": {"on_or_after": since.isoformat()}
+            }
+
+        response = await self.client.data_sources.query(data_source_id, **query)
+        yield response['results']
 
         while response.get('has_more'):
-            response = await client_notion.data_sources.query(data_source_id, start_cursor=response['next_cursor'])
-            for r in response['results']:
+            response = await self.client.data_sources.query(data_source_id, start_cursor=response['next_cursor'], **query)
+            yield response['results']
+
+    async def open_database(self, data_source_id: str=SEANCES_DS_ID, since: dt=None) -> AsyncGenerator[dict]:
+        """Yields all the children of the page 'ZtH Carnet de bord'"""
+        async for results in self.open_database_pages(data_source_id, since):
+            for r in results:
                 yield r
 
-    
+    def get_watermark(self, key: str) -> dt|None:
+        """Lit une date de synchronisation stockée dans la table `meta`"""
+        with get_pool().read() as conn:
+            res = conn.execute("SELECT last_update FROM meta WHERE table_name = ?", (key,)).fetchone()
+        return dt.fromisoformat(res[0]) if res and res[0] else None
+
+    def set_watermark(self, key: str, value: dt) -> None:
+        """Enregistre une date de synchronisation dans la table `meta`"""
+        with self.turso_db.lock:
+            self.turso_db.conn.execute("""
+                INSERT INTO meta (table_name, last_update)
+                    VALUES (?, ?)
+                    ON CONFLICT(table_name) DO UPDATE SET last_update=excluded.last_update
+                """,
+                (key, value.isoformat())
+            )
+            self.turso_db.conn.commit()
+        self.turso_db.pusher.mark_dirty()
+
+    def _needs_full_sync(self, data_source_id: str) -> bool:
+        last_full = self.get_watermark(f"notion:{data_source_id}:full")
+        return (
+            last_full is None
+            or self.get_watermark(f"notion:{data_source_id}") is None
+            or dt.now(last_full.tzinfo) - last_full > self.FULL_SYNC_INTERVAL
+        )
+
     async def get_seance(self) -> AsyncGenerator[Seance]:
         async for page in self.open_database():
             try:
@@ -168,22 +423,62 @@ class NotionAPI():
                 yield SeanceNotionPolling(page['id'], page['properties'])
                 
     async def get_series(self) -> AsyncGenerator[Serie]:
-        async for page in self.open_database():
-            try:
-                serie = SerieDB(page['id'])
-                serie.save_to_db(connection=self.turso_db.conn)
-                yield serie
-            except NotInDBError:
-                yield SerieNotionPolling(page['id'], page['properties'])
+        seance_ids = set()
+        try:
+            async for page in self.open_database():
+                try:
+                    serie = SerieDB(page['id'])
+                    serie.save_to_db(connection=self.turso_db.conn)
+                    seance_ids.add(serie.seance_id)
+                    yield serie
+                except NotInDBError:
+                    yield SerieNotionPolling(page['id'], page['properties'])
+        finally:
+            # Agrégats recalculés une fois par séance touchée, pas à chaque série
+            if seance_ids:
+                refresh_rollups(self.turso_db.conn, seance_ids)
                 
-    async def insert_recent_seance(self) -> None:
-        async for page in self.open_database():
-            conn = await aiosqlite.connect(DB_PATH)
-            res = await conn.execute_fetchall("SELECT id FROM seances WHERE id = ? LIMIT 1", (page['id'],))
-            
-            if not res:
-                seance = SeanceNotionPolling(page['id'], page['properties'])
-                seance.save_to_db(connection=self.turso_db.conn)
+    async def insert_recent_seance(self, full: bool=None, workers: int=4) -> None:
+        """Synchronise les séances Notion, et leurs séries, vers la base locale.
+
+        En mode incrémental, seules les pages modifiées depuis la dernière
+        synchronisation (`last_edited_time`, stocké dans `meta`) sont demandées à
+        Notion et enregistrées. En mode complet, toute la source est parcourue :
+        les séances absentes de la base sont insérées, et celles modifiées depuis
+        le watermark sont mises à jour.
+
+        Args:
+            full (bool, optional): Force (True) ou empêche (False) la réconciliation complète.
+                Defaults to None : complète si aucune n'a eu lieu depuis `FULL_SYNC_INTERVAL`.
+            workers (int, optional): Nombre de séries récupérées en parallèle. Defaults to 4.
+        """
+        data_source_id = self.SEANCES_DS_ID
+        watermark_key = f"notion:{data_source_id}"
+        if full is None:
+            full = self._needs_full_sync(data_source_id)
+
+        previous = self.get_watermark(watermark_key)
+        since = None if full else previous
+        logger.info(f"Syncing seances ({'full' if full else f'since {since}'})")
+
+        started_at = dt.now().astimezone()
+        # En mode complet, les séances existantes modifiées depuis le watermark sont réécrites :
+        # sinon leurs modifications seraient perdues une fois le watermark avancé
+        pipeline = SeanceIngestPipeline(self.client, self.turso_db, skip_existing=full, edited_since=previous, workers=workers)
+        await pipeline.run(self.open_database_pages(data_source_id, since=since))
+
+        # Les séances en échec seront reprises au prochain passage
+        if pipeline.low_failed is not None:
+            high_water = pipeline.low_failed
+        else:
+            high_water = max((date for date in (previous, pipeline.high_water) if date is not None), default=None)
+        if high_water is not None and high_water != previous:
+            self.set_watermark(watermark_key, high_water)
+        if full and pipeline.low_failed is None:
+            self.set_watermark(f"{watermark_key}:full", started_at)
+        logger.info(f"Watermark: {high_water}")
+        notion_failures.dump("error_data")
+        notion_failures.clear()
 
 
 
@@ -200,9 +495,15 @@ async def main():
     )
     # init_db(turso_db.conn)
     # turso_db.sync()
+    # await ExoDB(db_path=DB_PATH, turso_client=turso_db.conn, push_scheduler=turso_db.pusher).sync_from_notion(client_notion=client_notion)
 
     app = NotionAPI(client=client_notion, turso_db=turso_db)
-    await app.insert_recent_seance()
+    try:
+        await app.insert_recent_seance(full=True if "--full" in sys.argv else None)
+    finally:
+        turso_db.close()
+        logger.info(f"Notion: {client_notion.metrics}")
+        logger.debug(f"Notion latency: {client_notion.metrics.histogram()}")
 
     # ic(len(list(app.seances)))
 
@@ -0,0 +1,82 @@
+"""Cache des loaders de pages Streamlit, invalidé par le jeton de version de la base.
+
+Les résultats sont partagés entre sessions (`st.cache_data`) et indexés par le
+jeton `ConnectionPool.data_version()` : un rerun (clic, widget) relit seulement
+le jeton et sert le résultat en cache, et rien n'est recalculé tant qu'une
+synchronisation n'a pas commité.
+
+Module à part, non réexporté par `backend` : les loaders restent utilisables
+sans Streamlit (benchmarks, scripts).
+
+    from backend.page_cache import cached_loader
+    load_seance_data = cached_loader(loaders.load_seance_data)
+"""
+import streamlit as st
+from functools import wraps
+from typing import Any, Callable
+from .connection import get_pool
+from settings import DB_PATH, logger
+
+
+
+
+# Borne mémoire : nombre d'entrées gardées, tous loaders et arguments confondus
+MAX_ENTRIES = 64
+# Filet de sécurité si le jeton ne voit pas un changement (base remplacée sur disque)
+TTL = 3600
+
+_loaders: dict[str, Callable] = {}
+
+
+
+@st.cache_resource
+def _version_state() -> dict:
+    """Dernier jeton vu par le processus, partagé entre sessions"""
+    return {"token": None}
+
+
+def data_version(db_path: str=DB_PATH) -> tuple[int, str]:
+    """Jeton de changement courant ; vide le cache quand il change.
+
+    Les entrées d'un ancien jeton ne seront plus jamais lues : les libérer
+    tout de suite plutôt qu'attendre l'éviction par `MAX_ENTRIES`.
+    """
+    token = get_pool(db_path).data_version()
+    state = _version_state()
+    if state["token"] != token:
+        if state["token"] is not None:
+            logger.info(f"Base modifiée ({state['token']} -> {token}), cache des pages vidé")
+            _load.clear()
+        state["token"] = token
+    return token
+
+
+@st.cache_data(max_entries=MAX_ENTRIES, ttl=TTL, show_spinner=False)
+def _load(name: str, token: tuple[int, str], args: tuple, kwargs: dict) -> Any:
+    # `token` ne sert qu'à la clé de cache
+    return _loaders[name](*args, **kwargs)
+
+
+def cached_loader(func: Callable) -> Callable:
+    """Enveloppe un loader pour servir son résultat depuis le cache tant que la base n'a pas changé.
+
+    Toutes les fonctions enveloppées partagent une seule fonction `st.cache_data`,
+    la clé portant le nom qualifié du loader : la borne `MAX_ENTRIES` vaut donc
+    pour l'ensemble des pages. Les arguments doivent être hashables par Streamlit
+    et le résultat picklable ; chaque appel reçoit une copie, modifiable sans
+    toucher au cache.
+
+    Args:
+        func (Callable): Loader lisant la base via `get_pool()`
+
+    Returns:
+        Callable: Loader avec la même signature
+    """
+    name = f"{func.__module__}.{func.__qualname__}"
+    _loaders[name] = func
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        return _load(name, data_version(), args, kwargs)
+
+    return wrapper
@@ -0,0 +1,107 @@
+"""Progression par exercice : volume, score et 1RM estimé, en colonnes NumPy.
+
+Tous les exercices sont calculés en une passe (`load_progression`), sans appel
+Python par série ; la page Flux met le résultat en cache et le sélecteur
+d'exercice ne fait que filtrer.
+"""
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from .frame import SeriesFrame
+from .loaders import score
+from settings import DB_PATH
+
+
+
+
+# Au-delà, la formule de Brzycki diverge (division par 37 - reps)
+BRZYCKI_MAX_REPS = 36
+
+
+
+def epley(weight: np.ndarray, reps: np.ndarray) -> np.ndarray:
+    """1RM estimé selon Epley : poids x (1 + reps / 30), le poids lui-même pour une répétition"""
+    weight = np.asarray(weight, dtype=np.float64)
+    reps = np.asarray(reps)
+    return np.where(reps == 1, weight, weight * (1 + reps / 30))
+
+
+def brzycki(weight: np.ndarray, reps: np.ndarray) -> np.ndarray:
+    """1RM estimé selon Brzycki : poids x 36 / (37 - reps), NaN au-delà de `BRZYCKI_MAX_REPS` répétitions"""
+    weight = np.asarray(weight, dtype=np.float64)
+    reps = np.asarray(reps)
+    valid = reps <= BRZYCKI_MAX_REPS
+    return np.where(valid, weight * 36 / (37 - np.where(valid, reps, 0)), np.nan)
+
+
+
+@dataclass
+class Progression:
+    """Séries et séances de tous les exercices, avec leurs indicateurs.
+
+    series   une ligne par série : Exercise, Seance, Date, Set Number, Reps,
+             Weight, Volume, Score, 1RM Epley, 1RM Brzycki
+    seances  une ligne par (exercice, séance) : Date, Series, Reps, Volume,
+             Max Weight, Best Score, 1RM Epley, 1RM Brzycki (meilleure série)
+    """
+    series: pd.DataFrame
+    seances: pd.DataFrame
+
+    @property
+    def exercises(self) -> list[str]:
+        """Exercices ayant au moins une série, du plus au moins pratiqué"""
+        counts = self.series["Exercise"].value_counts()
+        return list(counts[counts > 0].index)
+
+    def exercise(self, name: str) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """Séries (plus récentes d'abord) et séances (chronologiques) d'un exercice"""
+        series = self.series[self.series["Exercise"] == name]
+        seances = self.seances[self.seances["Exercise"] == name]
+        return series.iloc[::-1], seances
+
+
+
+def series_metrics(frame: SeriesFrame) -> pd.DataFrame:
+    """Indicateurs de chaque série du frame, calculés sur les colonnes entières"""
+    weight = frame.weight.astype(np.float64)
+    return pd.DataFrame({
+        "Exercise": pd.Categorical.from_codes(frame.exo, categories=frame.tables.exercices),
+        "Seance": frame.seance,
+        "Date": pd.to_datetime(frame.date_ts, unit="s", utc=True),
+        "Set Number": frame.num,
+        "Reps": frame.reps,
+        "Weight": frame.weight,
+        "Volume": frame.volume,
+        "Score": score(weight, frame.reps),
+        "1RM Epley": epley(weight, frame.reps),
+        "1RM Brzycki": brzycki(weight, frame.reps),
+    })
+
+
+def seance_metrics(series: pd.DataFrame) -> pd.DataFrame:
+    """Agrège les indicateurs par exercice et par séance"""
+    grouped = series.groupby(["Exercise", "Seance"], observed=True, sort=False)
+    df = grouped.agg(**{
+        "Date": ("Date", "min"),
+        "Series": ("Reps", "size"),
+        "Reps": ("Reps", "sum"),
+        "Volume": ("Volume", "sum"),
+        "Max Weight": ("Weight", "max"),
+        "Best Score": ("Score", "max"),
+        "1RM Epley": ("1RM Epley", "max"),
+        "1RM Brzycki": ("1RM Brzycki", "max"),
+    })
+    return df.reset_index().sort_values("Date", kind="stable", ignore_index=True)
+
+
+def load_progression(db_path: str=DB_PATH) -> Progression:
+    """Charge les séries de tous les exercices et calcule leur progression.
+
+    Args:
+        db_path (str, optional): Chemin de la base. Defaults to DB_PATH.
+
+    Returns:
+        Progression: Séries et séances, triées par date croissante
+    """
+    series = series_metrics(SeriesFrame.from_db(db_path=db_path))
+    return Progression(series=series, seances=seance_metrics(series))
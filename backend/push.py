@@ -0,0 +1,160 @@
+import atexit
+import threading
+from dataclasses import dataclass, replace
+from time import monotonic, perf_counter
+from turso.sync import ConnectionSync
+from typing import Callable
+from settings import logger
+
+
+
+
+@dataclass
+class PushStats:
+    """Métriques des push vers le remote Turso."""
+    commits: int = 0            # commits locaux signalés
+    pushes: int = 0             # push effectués
+    failures: int = 0           # push en échec (retentés au prochain cycle)
+    last_latency: float = 0.0   # durée du dernier push en secondes
+    total_latency: float = 0.0
+    bytes_sent: int = 0         # octets envoyés, d'après conn.stats()
+
+
+
+class PushScheduler:
+    """Pousse en arrière-plan les commits locaux d'un réplica Turso embarqué.
+
+    Les écritures appellent `mark_dirty()` au lieu de `conn.push()` : les commits
+    sont regroupés et un seul push est fait au plus tard `min_interval` secondes
+    après le premier commit en attente, ou dès que `max_pending` commits sont
+    en attente. Les changements restants sont poussés à la fermeture.
+
+    Un push en échec remet ses commits en attente et n'est retenté qu'après un
+    délai doublé à chaque échec consécutif (`min_interval`, puis x2 jusqu'à
+    `max_backoff`), même si le seuil `max_pending` ou un push urgent le
+    demanderaient plus tôt : hors ligne, pas de boucle de push ni de logs.
+
+    `push` remplace `conn.push` (par exemple enveloppé dans un disjoncteur).
+    `lock` protège la connexion : toute écriture sur `conn` doit le tenir pour
+    qu'un push ne tombe pas au milieu d'une transaction.
+    """
+    def __init__(self, conn: ConnectionSync, min_interval: float=5.0, max_pending: int=50, push: Callable[[], None]=None, max_backoff: float=300.0) -> None:
+        self.conn = conn
+        self.push = push or conn.push
+        self.min_interval = min_interval
+        self.max_pending = max_pending
+        self.max_backoff = max_backoff
+        self.lock = threading.RLock()
+
+        self._pending = 0
+        self._dirty_since: float = None
+        self._urgent = False
+        self._closed = False
+        self._retry_at = 0.0
+        self._failed_in_row = 0
+        self._stats = PushStats()
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="turso-push", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+
+    @property
+    def stats(self) -> PushStats:
+        with self._cond:
+            return replace(self._stats)
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def mark_dirty(self, commits: int=1, urgent: bool=False) -> None:
+        """Signale des commits locaux à pousser.
+
+        Args:
+            commits (int, optional): Nombre de commits effectués. Defaults to 1.
+            urgent (bool, optional): Pousse sans attendre `min_interval`. Defaults to False.
+        """
+        with self._cond:
+            if self._pending == 0:
+                self._dirty_since = monotonic()
+            self._pending += commits
+            self._stats.commits += commits
+            self._urgent = self._urgent or urgent
+            self._cond.notify()
+
+    def _due(self) -> float:
+        """Secondes avant le prochain push (0 si dû maintenant)."""
+        if self._closed:
+            return 0
+        backoff = self._retry_at - monotonic()
+        if backoff > 0:
+            return backoff
+        if self._urgent or self._pending >= self.max_pending:
+            return 0
+        return max(0, self._dirty_since + self.min_interval - monotonic())
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                delay = self._due()
+                if delay:
+                    self._cond.wait(timeout=delay)
+                    continue
+            self._push()
+
+    def _push(self) -> None:
+        with self._cond:
+            pending = self._pending
+            if not pending:
+                return
+            self._pending = 0
+            self._urgent = False
+
+        try:
+            with self.lock:
+                sent_before = self.conn.stats().network_sent_bytes
+                start = perf_counter()
+                self.push()
+                latency = perf_counter() - start
+                sent = self.conn.stats().network_sent_bytes - sent_before
+        except Exception as e:
+            with self._cond:
+                self._stats.failures += 1
+                self._failed_in_row += 1
+                backoff = min(self.max_backoff, self.min_interval * 2 ** (self._failed_in_row - 1))
+                self._retry_at = monotonic() + backoff
+                if self._pending == 0:
+                    self._dirty_since = monotonic()
+                self._pending += pending
+            logger.warning(f"Push Turso échoué ({pending} commits en attente), nouvel essai dans {backoff:.0f}s: {e}")
+            return
+
+        with self._cond:
+            self._failed_in_row = 0
+            self._retry_at = 0.0
+            self._stats.pushes += 1
+            self._stats.last_latency = latency
+            self._stats.total_latency += latency
+            self._stats.bytes_sent += sent
+        logger.debug(f"Pushed {pending} commits in {latency:.2f}s ({sent} bytes)")
+
+    def flush(self) -> None:
+        """Pousse immédiatement les commits en attente, dans le thread appelant."""
+        self._push()
+
+    def close(self) -> None:
+        """Arrête le thread de fond puis pousse les commits restants."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self.flush()
+        atexit.unregister(self.close)
+        logger.info(f"Push scheduler closed: {self.stats}")
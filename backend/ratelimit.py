@@ -0,0 +1,262 @@
+import asyncio
+import threading
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from time import monotonic, perf_counter, sleep
+from typing import Any
+from notion_client import AsyncClient, Client
+from notion_client.errors import HTTPResponseError, RequestTimeoutError
+from httpx import ConnectError, RemoteProtocolError, ReadError
+from utility import retry, RetryPolicy, RetryBudget, CircuitBreaker
+from settings import logger
+
+
+
+
+class TokenBucket:
+    """Seau à jetons : `rate` requêtes par seconde en moyenne, rafales jusqu'à `burst`.
+
+    `reserve()` réserve un jeton et renvoie le temps d'attente avant de pouvoir
+    l'utiliser ; l'attente elle-même est faite par l'appelant (sync ou async).
+    """
+    def __init__(self, rate: float=3.0, burst: int=3) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+
+            wait = max(0.0, -self._tokens / self.rate)
+            return max(wait, self._paused_until - now)
+
+    def pause(self, seconds: float) -> None:
+        """Bloque toutes les réservations pendant `seconds` (Retry-After)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, monotonic() + seconds)
+            self._tokens = min(self._tokens, 0.0)
+
+
+
+class AIMD:
+    """Limite de concurrence adaptative (additive increase, multiplicative decrease).
+
+    La limite augmente de 1 après `limit` succès rapides consécutifs et est
+    divisée par deux sur un 429 ou une latence supérieure à `latency_target`.
+    """
+    def __init__(self, initial: int=3, minimum: int=1, maximum: int=16, latency_target: float=2.0) -> None:
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self._successes = 0
+
+
+    def on_success(self, latency: float) -> None:
+        if latency > self.latency_target:
+            self.on_throttle()
+            return
+        self._successes += 1
+        if self._successes >= self.limit:
+            self.limit = min(self.maximum, self.limit + 1)
+            self._successes = 0
+
+    def on_throttle(self) -> None:
+        self.limit = max(self.minimum, self.limit // 2)
+        self._successes = 0
+
+
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0)
+
+@dataclass
+class RequestMetrics:
+    """Compteurs et histogramme de latence des requêtes Notion."""
+    requests: int = 0
+    errors: int = 0
+    throttled: int = 0      # réponses 429
+    latency_total: float = 0.0
+    latency_buckets: list[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+    by_endpoint: dict[str, int] = field(default_factory=dict)
+
+    def observe(self, endpoint: str, latency: float) -> None:
+        self.requests += 1
+        self.latency_total += latency
+        self.latency_buckets[bisect_left(LATENCY_BUCKETS, latency)] += 1
+        self.by_endpoint[endpoint] = self.by_endpoint.get(endpoint, 0) + 1
+
+    def histogram(self) -> dict[str, int]:
+        labels = [f"<={b}s" for b in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}s"]
+        return dict(zip(labels, self.latency_buckets))
+
+    def __str__(self) -> str:
+        mean = self.latency_total / self.requests if self.requests else 0
+        return f"{self.requests} requests, {self.throttled} throttled, {self.errors} errors, mean latency {mean:.3f}s"
+
+
+
+# Erreurs réseau réessayées par les clients ; les 429 ont leur propre boucle (Retry-After)
+NOTION_RETRY_POLICIES = {
+    RequestTimeoutError: RetryPolicy(retries=3, base_delay=1.0),
+    ConnectError: RetryPolicy(retries=5, base_delay=1.0),
+    RemoteProtocolError: RetryPolicy(retries=3, base_delay=0.5),
+    ReadError: RetryPolicy(retries=3, base_delay=0.5),
+}
+
+
+
+def _endpoint(path: str) -> str:
+    """'pages/<id>' -> 'pages', 'data_sources/<id>/query' -> 'data_sources/query'"""
+    parts = path.strip("/").split("/")
+    return "/".join([parts[0], *parts[2:]])
+
+def _throttled(error: Exception) -> bool:
+    """429 : le service répond, il demande seulement de ralentir"""
+    return isinstance(error, HTTPResponseError) and error.status == 429
+
+def _retry_after(error: HTTPResponseError, default: float) -> float:
+    try:
+        return float(error.headers.get("Retry-After", default))
+    except ValueError:
+        return default
+
+
+
+
+class RateLimitedAsyncClient(AsyncClient):
+    """`AsyncClient` Notion limité à ~3 requêtes/s, qui respecte `Retry-After`
+    et adapte sa concurrence aux 429 et à la latence observés.
+
+    Tous les endpoints (`pages`, `data_sources`, `databases`...) passent par `request`.
+    Les erreurs réseau (timeout, connexion) sont réessayées avec backoff via
+    `utility.retry`, derrière un disjoncteur `breaker`.
+    """
+    def __init__(self, *args, rate: float=3.0, burst: int=3, max_retries: int=5, concurrency: AIMD=None, breaker: CircuitBreaker=None, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = concurrency or AIMD()
+        self.max_retries = max_retries
+        self.metrics = RequestMetrics()
+        self.breaker = breaker or CircuitBreaker("notion", failure_threshold=5, reset_timeout=30.0)
+        self.retry_budget = RetryBudget()
+        # Un 429 n'est pas un échec pour le disjoncteur : il n'empêche pas la boucle Retry-After de `request`
+        self._send = retry(policies=NOTION_RETRY_POLICIES, budget=self.retry_budget, breaker=self.breaker, neutral=_throttled)(self._attempt)
+        self._in_flight = 0
+        self._slot: asyncio.Condition = None
+
+
+    async def _acquire_slot(self) -> None:
+        if self._slot is None:
+            self._slot = asyncio.Condition()
+        async with self._slot:
+            await self._slot.wait_for(lambda: self._in_flight < self.concurrency.limit)
+            self._in_flight += 1
+
+    async def _release_slot(self) -> None:
+        async with self._slot:
+            self._in_flight -= 1
+            self._slot.notify_all()
+
+    async def _attempt(self, endpoint: str, *args: Any) -> tuple[Any, float]:
+        """Un envoi : attend une place et un jeton, puis appelle l'API."""
+        await self._acquire_slot()
+        try:
+            await asyncio.sleep(self.bucket.reserve())
+            start = perf_counter()
+            try:
+                return await super().request(*args), perf_counter() - start
+            finally:
+                self.metrics.observe(endpoint, perf_counter() - start)
+        finally:
+            await self._release_slot()
+
+    async def request(self, path: str, method: str, query: dict=None, body: dict=None, form_data: dict=None, auth: str=None) -> Any:
+        endpoint = _endpoint(path)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response, latency = await self._send(endpoint, path, method, query, body, form_data, auth)
+            except HTTPResponseError as e:
+                if not _throttled(e) or attempt == self.max_retries:
+                    self.metrics.errors += 1
+                    raise
+                delay = _retry_after(e, 1.0)
+                self.metrics.throttled += 1
+                self.concurrency.on_throttle()
+                self.bucket.pause(delay)
+                logger.warning(f"Notion 429 on {endpoint}, retrying in {delay}s (concurrency {self.concurrency.limit})")
+                continue
+            except Exception:
+                self.metrics.errors += 1
+                raise
+
+            self.concurrency.on_success(latency)
+            return response
+
+
+
+class RateLimitedClient(Client):
+    """Version synchrone (thread-safe) de `RateLimitedAsyncClient`."""
+    def __init__(self, *args, rate: float=3.0, burst: int=3, max_retries: int=5, concurrency: AIMD=None, breaker: CircuitBreaker=None, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = concurrency or AIMD()
+        self.max_retries = max_retries
+        self.metrics = RequestMetrics()
+        self.breaker = breaker or CircuitBreaker("notion", failure_threshold=5, reset_timeout=30.0)
+        self.retry_budget = RetryBudget()
+        # Un 429 n'est pas un échec pour le disjoncteur : il n'empêche pas la boucle Retry-After de `request`
+        self._send = retry(policies=NOTION_RETRY_POLICIES, budget=self.retry_budget, breaker=self.breaker, neutral=_throttled)(self._attempt)
+        self._in_flight = 0
+        self._slot = threading.Condition()
+
+
+    def _attempt(self, endpoint: str, *args: Any) -> tuple[Any, float]:
+        with self._slot:
+            self._slot.wait_for(lambda: self._in_flight < self.concurrency.limit)
+            self._in_flight += 1
+        try:
+            sleep(self.bucket.reserve())
+            start = perf_counter()
+            try:
+                return super().request(*args), perf_counter() - start
+            finally:
+                with self._slot:
+                    self.metrics.observe(endpoint, perf_counter() - start)
+        finally:
+            with self._slot:
+                self._in_flight -= 1
+                self._slot.notify_all()
+
+    def request(self, path: str, method: str, query: dict=None, body: dict=None, form_data: dict=None, auth: str=None) -> Any:
+        endpoint = _endpoint(path)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response, latency = self._send(endpoint, path, method, query, body, form_data, auth)
+            except HTTPResponseError as e:
+                if not _throttled(e) or attempt == self.max_retries:
+                    with self._slot:
+                        self.metrics.errors += 1
+                    raise
+                delay = _retry_after(e, 1.0)
+                with self._slot:
+                    self.metrics.throttled += 1
+                    self.concurrency.on_throttle()
+                self.bucket.pause(delay)
+                logger.warning(f"Notion 429 on {endpoint}, retrying in {delay}s (concurrency {self.concurrency.limit})")
+                continue
+            except Exception:
+                with self._slot:
+                    self.metrics.errors += 1
+                raise
+
+            with self._slot:
+                self.concurrency.on_success(latency)
+            return response
@@ -0,0 +1,227 @@
+"""Tables d'agrégats (rollups) des séances, tenues à jour à l'écriture.
+
+    rollup_seance        une ligne par séance : durée, séries, reps, volume
+    rollup_day           par jour local (en jours depuis epoch)
+    rollup_week          par semaine ISO locale (jour du lundi, en jours depuis epoch)
+    rollup_exercise_day  par jour et exercice : séries, reps, volume, charge max
+
+Chaque chemin d'écriture de `seances`/`series` appelle `refresh_rollups` une
+fois avec les séances touchées, dans sa transaction, après avoir écrit leurs
+séries (`Serie.save_to_db` ne le fait pas) : seules ces séances, et les jours
+et semaines où elles étaient ou sont maintenant, sont recalculés.
+`rebuild_rollups` (ou `python -m backend.rollups`) recalcule tout.
+
+Les jours et semaines sont ceux du fuseau local du processus, le même que
+`date.today()` dans les pages : une séance du soir reste sur son jour. Turso
+ne connaît pas le modificateur SQL 'localtime', ils sont donc calculés en
+Python (`local_day`). Les agrégats écrits par une version en jours UTC sont
+corrigés par `python -m backend.rollups`.
+"""
+from datetime import date, datetime as dt
+from itertools import batched
+from os import getenv
+from os.path import join as pjoin
+from time import perf_counter
+from typing import Iterable
+from dotenv import load_dotenv
+from turso.sync import ConnectionSync
+from .database import TursoDB
+from settings import DB_PATH, workspace, logger
+
+
+
+
+ROLLUP_TABLES = ("rollup_seance", "rollup_day", "rollup_week", "rollup_exercise_day")
+
+# Limite de paramètres par requête, sous celle de SQLite
+MAX_PARAMS = 500
+
+
+
+def create_rollups(conn: ConnectionSync) -> None:
+    """Crée les tables d'agrégats (appelé par `init_db`)"""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS rollup_seance (
+        seance_id TEXT PRIMARY KEY NOT NULL,
+        date_ts INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        week INTEGER NOT NULL,
+        body_part TEXT,
+        duration INTEGER,
+        series INTEGER NOT NULL,
+        reps INTEGER NOT NULL,
+        volume REAL NOT NULL
+    )
+    """)
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_rollup_seance_day
+        ON rollup_seance (day);
+    """)
+
+    for table, key in (("rollup_day", "day"), ("rollup_week", "week")):
+        conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            {key} INTEGER PRIMARY KEY NOT NULL,
+            seances INTEGER NOT NULL,
+            duration INTEGER NOT NULL,
+            series INTEGER NOT NULL,
+            reps INTEGER NOT NULL,
+            volume REAL NOT NULL
+        )
+        """)
+
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS rollup_exercise_day (
+        day INTEGER NOT NULL,
+        exo_id TEXT NOT NULL,
+        series INTEGER NOT NULL,
+        reps INTEGER NOT NULL,
+        volume REAL NOT NULL,
+        max_weight REAL NOT NULL,
+        PRIMARY KEY (day, exo_id)
+    )
+    """)
+
+
+
+
+EPOCH = date(1970, 1, 1)
+
+def local_day(ts: float) -> int:
+    """Jour local de l'instant `ts`, en jours depuis epoch"""
+    return (dt.fromtimestamp(ts).date() - EPOCH).days
+
+def week_start(day: int) -> int:
+    """Lundi de la semaine de `day`, en jours depuis epoch (le 1er janvier 1970 est un jeudi)"""
+    return day - (day + 3) % 7
+
+
+# Jour et semaine insérés à 0, puis renseignés par `_localize`
+_SEANCE_SELECT = """
+    SELECT w.id, CAST(w.date_ts AS INTEGER), 0, 0, w.body_part, COALESCE(w.duration, 0),
+           COUNT(s.id), COALESCE(SUM(s.reps), 0), COALESCE(SUM(s.reps * s.weight), 0)
+    FROM seances AS w
+    LEFT JOIN series AS s ON s.seance_id = w.id
+"""
+
+def _period_select(key: str) -> str:
+    return f"""
+        SELECT {key}, COUNT(*), SUM(duration), SUM(series), SUM(reps), SUM(volume)
+        FROM rollup_seance
+    """
+
+_EXERCISE_SELECT = """
+    SELECT r.day, s.exo_id, COUNT(*), SUM(s.reps), SUM(s.reps * s.weight), MAX(s.weight)
+    FROM series AS s
+    JOIN rollup_seance AS r ON r.seance_id = s.seance_id
+"""
+
+
+def _placeholders(values: tuple) -> str:
+    return ", ".join("?" * len(values))
+
+
+def _localize(conn: ConnectionSync, seance_ids: tuple[str, ...]=None) -> None:
+    """Renseigne le jour et la semaine locaux des séances `seance_ids` (toutes si None)"""
+    sql = "SELECT seance_id, date_ts FROM rollup_seance"
+    if seance_ids is None:
+        rows = conn.execute(sql).fetchall()
+    else:
+        rows = conn.execute(f"{sql} WHERE seance_id IN ({_placeholders(seance_ids)})", seance_ids).fetchall()
+    days = [(local_day(date_ts), id) for id, date_ts in rows]
+    conn.executemany(
+        "UPDATE rollup_seance SET day = ?, week = ? WHERE seance_id = ?",
+        [(day, week_start(day), id) for day, id in days]
+    )
+
+
+def _keys(conn: ConnectionSync, column: str, seance_ids: tuple[str, ...]) -> set[int]:
+    rows = conn.execute(
+        f"SELECT DISTINCT {column} FROM rollup_seance WHERE seance_id IN ({_placeholders(seance_ids)})", seance_ids
+    ).fetchall()
+    return {row[0] for row in rows}
+
+
+def refresh_rollups(conn: ConnectionSync, seance_ids: Iterable[str]) -> None:
+    """Recalcule les agrégats des séances `seance_ids` après insertion, modification ou suppression.
+
+    À appeler dans la transaction de l'écriture, sans commit : les agrégats sont
+    commités avec les séries et séances.
+
+    Args:
+        conn (ConnectionSync): Connexion d'écriture
+        seance_ids (Iterable[str]): Séances dont la séance elle-même ou des séries ont changé
+    """
+    days, weeks = set(), set()
+    for ids in batched(dict.fromkeys(seance_ids), MAX_PARAMS):
+        # Jours et semaines d'avant (séance déplacée ou supprimée) et d'après
+        days |= _keys(conn, "day", ids)
+        weeks |= _keys(conn, "week", ids)
+        conn.execute(f"DELETE FROM rollup_seance WHERE seance_id IN ({_placeholders(ids)})", ids)
+        conn.execute(f"""
+            INSERT INTO rollup_seance (seance_id, date_ts, day, week, body_part, duration, series, reps, volume)
+            {_SEANCE_SELECT} WHERE w.id IN ({_placeholders(ids)}) GROUP BY w.id
+            """, ids)
+        _localize(conn, ids)
+        days |= _keys(conn, "day", ids)
+        weeks |= _keys(conn, "week", ids)
+
+    for table, key, keys in (("rollup_day", "day", days), ("rollup_week", "week", weeks)):
+        for chunk in batched(sorted(keys), MAX_PARAMS):
+            conn.execute(f"DELETE FROM {table} WHERE {key} IN ({_placeholders(chunk)})", chunk)
+            conn.execute(f"""
+                INSERT INTO {table} ({key}, seances, duration, series, reps, volume)
+                {_period_select(key)} WHERE {key} IN ({_placeholders(chunk)}) GROUP BY {key}
+                """, chunk)
+
+    for chunk in batched(sorted(days), MAX_PARAMS):
+        conn.execute(f"DELETE FROM rollup_exercise_day WHERE day IN ({_placeholders(chunk)})", chunk)
+        conn.execute(f"""
+            INSERT INTO rollup_exercise_day (day, exo_id, series, reps, volume, max_weight)
+            {_EXERCISE_SELECT} WHERE r.day IN ({_placeholders(chunk)}) GROUP BY r.day, s.exo_id
+            """, chunk)
+
+
+def rebuild_rollups(conn: ConnectionSync) -> None:
+    """Vide et recalcule toutes les tables d'agrégats, sans commit"""
+    create_rollups(conn)
+    for table in ROLLUP_TABLES:
+        conn.execute(f"DELETE FROM {table}")
+    conn.execute(f"""
+        INSERT INTO rollup_seance (seance_id, date_ts, day, week, body_part, duration, series, reps, volume)
+        {_SEANCE_SELECT} GROUP BY w.id
+        """)
+    _localize(conn)
+    for table, key in (("rollup_day", "day"), ("rollup_week", "week")):
+        conn.execute(f"""
+            INSERT INTO {table} ({key}, seances, duration, series, reps, volume)
+            {_period_select(key)} GROUP BY {key}
+            """)
+    conn.execute(f"""
+        INSERT INTO rollup_exercise_day (day, exo_id, series, reps, volume, max_weight)
+        {_EXERCISE_SELECT} GROUP BY r.day, s.exo_id
+        """)
+
+
+
+
+def main() -> None:
+    load_dotenv(dotenv_path=pjoin(workspace, 'settings', '.env'))
+    turso_db = TursoDB(
+        path=DB_PATH,
+        remote_url=getenv("TURSO_DATABASE_URL"),
+        auth_token=getenv("TURSO_AUTH_TOKEN")
+    )
+    try:
+        start = perf_counter()
+        with turso_db.lock:
+            rebuild_rollups(turso_db.conn)
+            turso_db.conn.commit()
+        turso_db.pusher.mark_dirty(urgent=True)
+        logger.info(f"Rollups rebuilt in {perf_counter() - start:.2f}s")
+    finally:
+        turso_db.close()
+
+
+if __name__=='__main__':
+    main()
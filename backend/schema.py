@@ -0,0 +1,246 @@
+import pandas as pd
+from dataclasses import dataclass
+from datetime import datetime as dt
+from typing import Any, Callable, Iterable
+from utility import Extractor, FailureLog
+
+
+
+
+class SchemaError(ValueError):
+    """Exception levée lorsqu'une page Notion ne respecte pas son schéma."""
+    pass
+
+
+
+
+# Propriétés Notion manquantes ou invalides, écrites dans error_data.json en fin de synchronisation
+notion_failures = FailureLog()
+
+
+# Type de propriété Notion -> chemin de sa valeur dans l'objet propriété
+PROPERTY_PATHS = {
+    "title": "title.0.plain_text",
+    "rich_text": "rich_text.0.plain_text",
+    "number": "number",
+    "checkbox": "checkbox",
+    "select": "select.name",
+    "relation": "relation",
+    "relation_id": "relation.0.id",
+    "date_start": "date.start",
+    "date_end": "date.end",
+}
+
+
+
+def relation_ids(relation: list[dict]) -> list[str]:
+    return [item['id'] for item in relation]
+
+def iso_timestamp(value: str) -> float:
+    """Date ISO Notion -> timestamp, tel que stocké dans `date_ts`"""
+    return dt.fromisoformat(value).timestamp()
+
+
+DEFAULT_CONVERTERS: dict[str, Callable[[Any], Any]] = {
+    "relation": relation_ids,
+}
+
+
+
+
+@dataclass(frozen=True)
+class Property:
+    """Une propriété Notion, lue dans une colonne typée.
+
+    Args:
+        column (str): Nom de la colonne produite
+        name (str): Nom de la propriété dans Notion
+        kind (str): Type de propriété, clé de `PROPERTY_PATHS`
+        convert (Callable, optional): Conversion de la valeur brute (int, float, `iso_timestamp`...).
+            Defaults to celle du type, sinon aucune.
+        required (bool, optional): Une valeur manquante rejette la page. Defaults to True.
+    """
+    column: str
+    name: str
+    kind: str
+    convert: Callable[[Any], Any] = None
+    required: bool = True
+
+    @property
+    def path(self) -> str:
+        return f"{self.name}.{PROPERTY_PATHS[self.kind]}"
+
+    @property
+    def converter(self) -> Callable[[Any], Any] | None:
+        return self.convert or DEFAULT_CONVERTERS.get(self.kind)
+
+
+
+class ColumnBatch:
+    """Pages Notion parsées, rangées par colonne.
+
+    Une liste par colonne (plus `id`, l'ID de la page), prête pour `executemany`
+    via `rows` ou pour un DataFrame via `to_pandas`. Les pages rejetées par le
+    schéma ne figurent pas dans les colonnes, leurs IDs sont dans `rejected`.
+    """
+    __slots__ = ("columns", "rejected")
+
+    def __init__(self, columns: dict[str, list], rejected: list[str]=None) -> None:
+        self.columns = columns
+        self.rejected = rejected or []
+
+
+    def __len__(self) -> int:
+        return len(self.columns["id"])
+
+    def __getitem__(self, column: str) -> list:
+        return self.columns[column]
+
+    def __repr__(self) -> str:
+        return f"ColumnBatch({len(self)} rows, {len(self.rejected)} rejected, columns={list(self.columns)})"
+
+    def rows(self, *columns: str) -> list[tuple]:
+        """Lignes des colonnes demandées (toutes par défaut), pour `executemany`"""
+        return list(zip(*(self.columns[column] for column in columns or self.columns)))
+
+    def filter(self, keep: Iterable[bool]) -> "ColumnBatch":
+        """Sous-ensemble des lignes où `keep` est vrai ; les autres sont ajoutées à `rejected`"""
+        keep = list(keep)
+        dropped = [id for id, kept in zip(self.columns["id"], keep) if not kept]
+        if not dropped:
+            return self
+        columns = {name: [value for value, kept in zip(values, keep) if kept] for name, values in self.columns.items()}
+        return ColumnBatch(columns, self.rejected + dropped)
+
+    def to_pandas(self) -> pd.DataFrame:
+        return pd.DataFrame(self.columns)
+
+
+
+class PageSchema:
+    """Schéma déclaratif d'une base Notion : propriétés -> colonnes typées.
+
+    SERIE_SCHEMA.parse(response['results']).rows("id", "reps", "weight")
+
+    Les propriétés sont lues colonne par colonne sur tout le lot
+    (`Extractor.extract_many`), puis chaque colonne est convertie d'un bloc :
+    pas d'appel de fonction par page et par champ.
+
+    Args:
+        name (str): Nom du schéma, pour les logs
+        properties (list[Property]): Propriétés lues, dans l'ordre des colonnes
+        failures (FailureLog, optional): Journal des pages rejetées. Defaults to `notion_failures`.
+    """
+    def __init__(self, name: str, properties: list[Property], failures: FailureLog=notion_failures) -> None:
+        self.name = name
+        self.properties = tuple(properties)
+        self.failures = failures
+        self._extractor = Extractor({prop.column: prop.path for prop in self.properties})
+
+
+    def __repr__(self) -> str:
+        return f"PageSchema({self.name!r}, {[prop.column for prop in self.properties]})"
+
+    @property
+    def columns(self) -> list[str]:
+        return ["id", *(prop.column for prop in self.properties)]
+
+    def parse(self, pages: Iterable[dict]) -> ColumnBatch:
+        """Parse un lot de pages Notion (résultats d'une requête ou pages récupérées une à une).
+
+        Args:
+            pages (Iterable[dict]): Pages Notion, avec leurs clés `id` et `properties`
+
+        Returns:
+            ColumnBatch: Colonnes des pages valides, IDs des pages rejetées
+        """
+        pages = list(pages)
+        raw = self._extractor.extract_many([page['properties'] for page in pages])
+        valid = [True] * len(pages)
+        columns = {"id": [page['id'] for page in pages]}
+
+        for prop in self.properties:
+            values = raw[prop.column]
+            if prop.required:
+                for i, value in enumerate(values):
+                    if value is None and valid[i]:
+                        valid[i] = False
+                        self.failures.record(prop.column, prop.path, pages[i])
+            columns[prop.column] = self._convert(prop, values, valid, pages)
+
+        return ColumnBatch(columns).filter(valid)
+
+    def _convert(self, prop: Property, values: list, valid: list[bool], pages: list[dict]) -> list:
+        convert = prop.converter
+        if convert is None:
+            return values
+        try:
+            return [None if value is None else convert(value) for value in values]
+        except (TypeError, ValueError, KeyError):
+            pass
+
+        # Au moins une valeur invalide : conversion ligne par ligne pour isoler les pages fautives
+        converted = []
+        for i, value in enumerate(values):
+            try:
+                converted.append(None if value is None else convert(value))
+            except (TypeError, ValueError, KeyError):
+                converted.append(None)
+                if valid[i]:
+                    valid[i] = False
+                    self.failures.record(prop.column, prop.path, pages[i])
+        return converted
+
+    def record(self, properties: dict) -> dict[str, Any]:
+        """Colonnes d'une seule page, à partir de ses propriétés
+
+        Raises:
+            SchemaError: Si une propriété requise manque ou ne peut être convertie
+        """
+        record = self._extractor.extract(properties)
+        for prop in self.properties:
+            value = record[prop.column]
+            if value is None:
+                if prop.required:
+                    self.failures.record(prop.column, prop.path, properties)
+                    raise SchemaError(f"Page {self.name} invalide: {prop.column} manquant")
+                continue
+            if (convert := prop.converter) is not None:
+                try:
+                    record[prop.column] = convert(value)
+                except (TypeError, ValueError, KeyError) as e:
+                    self.failures.record(prop.column, prop.path, properties)
+                    raise SchemaError(f"Page {self.name} invalide: {prop.column} = {value!r}") from e
+        return record
+
+
+
+
+# |-----------Schémas des bases Notion---------|
+SERIE_SCHEMA = PageSchema("series", [
+    Property("num", "Sets", "title", int),
+    Property("reps", "Reps", "number", int),
+    Property("weight", "Poids", "number", float),
+    Property("seance_id", "Weekly Split Schedule", "relation_id"),
+    Property("exo_id", "Exercise", "relation_id"),
+    Property("date_ts", "Date ", "date_start", iso_timestamp),
+])
+
+SEANCE_SCHEMA = PageSchema("seances", [
+    Property("name", "Name", "title"),
+    Property("body_part", "Body Part", "select"),
+    Property("date_ts", "Date", "date_start", iso_timestamp),
+    Property("end_ts", "Date", "date_end", iso_timestamp, required=False),
+    Property("series", "Workout Exercises", "relation", required=False),
+])
+
+EXERCICE_SCHEMA = PageSchema("exercices", [
+    Property("name", "Name", "title"),
+    Property("muscle_groups", "Muscle Group", "relation", required=False),
+    Property("difficulty", "Difficulty", "select"),
+])
+
+MUSCLE_GROUP_SCHEMA = PageSchema("muscle_group", [
+    Property("name", "Name", "title"),
+    Property("body_part", "Body Part", "select"),
+])
@@ -0,0 +1,99 @@
+"""Benchmark de l'import Apple Health : série contre parallèle.
+
+Génère un export synthétique (`benchmarks.generate_health`), puis l'importe
+dans une base vide, en série (`HealthImporter.import_file`) et avec
+`--workers` processus (`HealthImporter.import_parallel`), et affiche le débit
+en records/s et l'accélération par rapport à l'import en série. Mesure aussi
+la conversion des dates seule (`strptime`, `fromisoformat`, `health_timestamp`).
+
+    python -m benchmarks.bench_health --records 1000000 --workers 1 2 4 8
+    python -m benchmarks.bench_health --export ~/export.xml --workers 8
+"""
+import argparse
+import json
+import os
+import tempfile
+from datetime import datetime as dt
+from os.path import join as pjoin
+from time import perf_counter
+
+from backend import HealthImporter
+from backend.health import iter_records
+from benchmarks.bench_notion_sync import OfflineTursoDB
+from benchmarks.generate_health import write_export
+from utility.applehealth import health_timestamp, parse_health_date
+
+
+def bench_dates(path: str, limit: int=200_000) -> dict[str, float]:
+    """Dates par seconde de chaque parseur, sur les startDate de l'export"""
+    values = []
+    for attrib in iter_records(path):
+        values.append(attrib["startDate"])
+        if len(values) == limit:
+            break
+
+    parsers = {
+        "strptime": lambda value: int(dt.strptime(value, "%Y-%m-%d %H:%M:%S %z").timestamp()),
+        "fromisoformat": lambda value: int(parse_health_date(value).timestamp()),
+        "health_timestamp": health_timestamp,
+    }
+    rates = {}
+    for name, parse in parsers.items():
+        start = perf_counter()
+        for value in values:
+            parse(value)
+        rates[name] = len(values) / (perf_counter() - start)
+    return rates
+
+
+def run_import(path: str, tmp: str, workers: int, chunk_bytes: int) -> dict:
+    db = pjoin(tmp, f"health_{workers}.db")
+    turso_db = OfflineTursoDB(db)
+    try:
+        importer = HealthImporter(turso_db)
+        if workers:
+            stats = importer.import_parallel(path, workers=workers, chunk_bytes=chunk_bytes)
+        else:
+            stats = importer.import_file(path)
+    finally:
+        turso_db.close()
+        os.remove(db)
+    return {"workers": workers, "records": stats.records, "inserted": stats.inserted, "seconds": round(stats.elapsed, 3), "rate": round(stats.rate)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--export", help="export.xml existant (sinon export généré)")
+    parser.add_argument("--records", type=int, default=500_000, help="records de l'export généré")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--chunk-mb", type=int, default=16)
+    parser.add_argument("--json", help="écrit les résultats dans ce fichier")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.export
+        if path is None:
+            path = pjoin(tmp, "export.xml")
+            with open(path, "w", encoding="utf-8") as f:
+                write_export(f, args.records)
+        size_mb = os.path.getsize(path) / 2**20
+        print(f"{path}: {size_mb:.0f} Mo, {os.cpu_count()} CPU")
+
+        dates = bench_dates(path)
+        print("\nDates/s: " + ", ".join(f"{name} {rate:,.0f}" for name, rate in dates.items()))
+
+        results = [run_import(path, tmp, workers, args.chunk_mb << 20) for workers in [0, *args.workers]]
+
+    serial = results[0]["seconds"]
+    print(f"\n{'processus':>9} | {'temps (s)':>9} | {'records/s':>10} | {'accélération':>12}")
+    for result in results:
+        workers = result["workers"] or "série"
+        print(f"{workers:>9} | {result['seconds']:>9.2f} | {result['rate']:>10,} | {serial / result['seconds']:>11.2f}x")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"size_mb": round(size_mb, 1), "cpus": os.cpu_count(), "dates": dates, "imports": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
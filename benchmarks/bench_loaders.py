@@ -0,0 +1,177 @@
+"""Benchmark des chargements et agrégations des pages Streamlit.
+
+Chaque cas est mesuré sur une base synthétique (`benchmarks.generate_db`) :
+meilleur temps et médiane sur `--repeat` exécutions, pool de connexions et
+cache de référence vides à chaque exécution, puis pic mémoire Python
+(tracemalloc, allocations NumPy/pandas comprises, pas celles de SQLite)
+sur une exécution à part.
+
+    python -m benchmarks.bench_loaders --years 1 10 --json loaders.json
+    python -m benchmarks.bench_loaders --db data/fitness.db
+"""
+import argparse
+import json
+import platform
+import subprocess
+import tempfile
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from datetime import date, timedelta
+from os.path import join as pjoin
+from statistics import median
+from time import perf_counter
+from typing import Any, Callable, Iterator
+from unittest.mock import patch
+
+from backend import ConnectionPool, ReferenceCache
+from backend import cache, connection, loaders
+from backend.frame import SeriesFrame
+from backend.progression import load_progression
+from benchmarks.generate_db import create
+from settings import DB_PATH, logger
+
+
+FLUX_EXERCISE = "Développé Couché"
+
+def week_window():
+    """Fenêtre par défaut de la page Tendances : les 7 derniers jours"""
+    return date.today() - timedelta(days=6), date.today()
+
+
+
+
+@dataclass
+class Case:
+    """Une fonction mesurée ; `setup` prépare ses arguments hors chronométrage."""
+    name: str
+    func: Callable[..., Any]
+    setup: Callable[[], tuple] = tuple
+
+
+@dataclass
+class Result:
+    name: str
+    best: float
+    median: float
+    peak_mb: float
+
+
+def body_part_totals(df):
+    return df.groupby('body_part')[['reps', 'series', 'volume']].sum()
+
+def flux_scores(df):
+    df['Volume'] = df.apply(lambda row: loaders.volume(row['Weight'], row['Reps']), axis=1)
+    df['Score'] = df.apply(lambda row: loaders.score(row['Weight'], row['Reps']), axis=1)
+    return df
+
+
+CASES = [
+    Case("load_seance_data", loaders.load_seance_data),
+    Case("load_body_part_data", loaders.load_body_part_data),
+    Case("load_seance_data_week", loaders.load_seance_data, week_window),
+    Case("load_body_part_data_week", loaders.load_body_part_data, week_window),
+    Case("body_part_totals", body_part_totals, lambda: (loaders.load_body_part_data(),)),
+    Case("open_history", loaders.open_history),
+    Case("count_streak", loaders.count_streak, lambda: (loaders.open_history(),)),
+    Case("weekly_workouts_volume", loaders.weekly_workouts_volume),
+    Case("load_exercise_series", lambda: loaders.load_exercise_series(FLUX_EXERCISE)),
+    Case("flux_scores", flux_scores, lambda: (loaders.load_exercise_series(FLUX_EXERCISE),)),
+    Case("load_progression", load_progression),
+    Case("progression_exercise", lambda data: data.exercise(FLUX_EXERCISE), lambda: (load_progression(),)),
+    Case("series_frame", SeriesFrame.from_db),
+    Case("frame_by_body_part", SeriesFrame.by_body_part, lambda: (SeriesFrame.from_db(),)),
+    Case("frame_by_week", SeriesFrame.by_week, lambda: (SeriesFrame.from_db(),)),
+    Case("frame_by_exercise", SeriesFrame.by_exercise, lambda: (SeriesFrame.from_db(),)),
+]
+
+
+
+
+@contextmanager
+def isolated(path: str) -> Iterator[None]:
+    """Pool et cache neufs pour `path`, à la place de ceux de DB_PATH"""
+    pool = ConnectionPool(path)
+    with patch.dict(connection._pools, {DB_PATH: pool}), patch.dict(cache._caches, {DB_PATH: ReferenceCache(DB_PATH)}):
+        yield
+    pool.close()
+
+
+def run_case(case: Case, path: str, repeat: int) -> Result:
+    times = []
+    for _ in range(repeat):
+        with isolated(path):
+            args = case.setup()
+            start = perf_counter()
+            case.func(*args)
+            times.append(perf_counter() - start)
+
+    with isolated(path):
+        args = case.setup()
+        tracemalloc.start()
+        case.func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return Result(case.name, round(min(times), 5), round(median(times), 5), round(peak / 2**20, 2))
+
+
+def row_counts(path: str) -> dict[str, int]:
+    with isolated(path), connection.get_pool().read() as conn:
+        return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in ("seances", "series", "exercices")}
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="base existante à mesurer (sinon bases générées)")
+    parser.add_argument("--years", type=float, nargs="+", default=[1, 10], help="années d'entraînement générées")
+    parser.add_argument("--per-week", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="+", help="noms des cas à exécuter")
+    parser.add_argument("--json", help="écrit les résultats dans ce fichier")
+    args = parser.parse_args()
+
+    cases = [case for case in CASES if not args.only or case.name in args.only]
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "datasets": [],
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.db:
+            datasets = [(args.db, args.db)]
+        else:
+            datasets = []
+            for years in args.years:
+                path = pjoin(tmp, f"fitness_{years}y.db")
+                create(path, n_seances=round(years * 52 * args.per_week), per_week=args.per_week)
+                datasets.append((f"{years}y", path))
+
+        for label, path in datasets:
+            rows = row_counts(path)
+            print(f"\n{label}: {rows}")
+            print(f"{'cas':<24} | {'meilleur (s)':>12} | {'médiane (s)':>11} | {'pic (Mo)':>8}")
+            results = []
+            for case in cases:
+                result = run_case(case, path, args.repeat)
+                results.append(asdict(result))
+                print(f"{result.name:<24} | {result.best:>12.4f} | {result.median:>11.4f} | {result.peak_mb:>8.2f}")
+            report["datasets"].append({"label": label, "rows": rows, "results": results})
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Résultats écrits dans {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Micro-benchmark des modèles : mémoire par instance et temps de construction.
+
+Compare les modèles à `__slots__` de `backend.models` (constructeur et
+`from_row`) avec leurs équivalents à `__dict__` tels qu'ils étaient avant.
+
+    python -m benchmarks.bench_models -n 100000
+"""
+import argparse
+import gc
+import tracemalloc
+from datetime import datetime as dt, timedelta
+from time import perf_counter
+from typing import Callable
+
+from backend import MuscleGroup, Exercice, Serie, Seance
+
+
+
+
+# |-----------Modèles à __dict__ (avant)---------|
+class DictMuscleGroup:
+    def __init__(self, id, name, body_part):
+        self.id = id
+        self.name = name
+        self.body_part = body_part
+
+class DictExercice:
+    def __init__(self, id, name, muscle_group=None, difficulty=None):
+        self.id = id
+        self.name = name
+        self.muscle_group = muscle_group
+        self.difficulty = difficulty
+
+class DictSerie:
+    def __init__(self, id=None, exo=None, date=None, num=None, reps=None, poids=None, seance_id=None):
+        self.id = id
+        self.exo = exo
+        self.date = date
+        self.num = num
+        self.reps = reps
+        self.poids = poids
+        self.seance_id = seance_id
+
+class DictSeance:
+    def __init__(self, id=None, name=None, body_part=None, date=None, content={}, duration=None):
+        self.id = id
+        self.name = name
+        self.body_part = body_part
+        self.date = date
+        self.content = content
+        self.duration = duration
+
+
+
+
+def measure(build: Callable[[int], object], n: int, repeat: int=5) -> tuple[float, float]:
+    """Construit `n` instances et renvoie (octets par instance, meilleur temps en ns par instance).
+
+    Les arguments sont préparés hors mesure : seul l'objet lui-même est compté.
+    """
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    objects = [build(i) for i in range(n)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    list_overhead = objects.__sizeof__()
+    del objects
+
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = perf_counter()
+        for i in range(n):
+            build(i)
+        best = min(best, perf_counter() - start)
+
+    return (after - before - list_overhead) / n, best / n * 1e9
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=100_000)
+    args = parser.parse_args()
+
+    mg = MuscleGroup("mg", "Pectoraux", "Upper Body")
+    exo = Exercice("exo", "Développé Couché", [mg], "medium")
+    date = dt(2025, 1, 1, 18)
+    duration = timedelta(hours=1)
+    ts = date.timestamp()
+    ids = [f"{i:036d}" for i in range(args.n)]  # chaînes partagées, hors mesure
+
+    mg_row = ("mg", "Pectoraux", "Upper Body")
+    exo_row = ("exo", "Développé Couché", "medium")
+    seance_row = ("seance", "Upper A", ts, "Upper Body", 3600)
+
+    cases = [
+        ("MuscleGroup", "__dict__", lambda i: DictMuscleGroup(ids[i], "Pectoraux", "Upper Body")),
+        ("MuscleGroup", "__slots__", lambda i: MuscleGroup(ids[i], "Pectoraux", "Upper Body")),
+        ("MuscleGroup", "from_row", lambda i: MuscleGroup.from_row(mg_row)),
+        ("Exercice", "__dict__", lambda i: DictExercice(ids[i], "Développé Couché", [mg], "medium")),
+        ("Exercice", "__slots__", lambda i: Exercice(ids[i], "Développé Couché", [mg], "medium")),
+        ("Exercice", "from_row", lambda i: Exercice.from_row(exo_row, [mg])),
+        ("Serie", "__dict__", lambda i: DictSerie(ids[i], exo, date, 1, 8, 60.0, "seance")),
+        ("Serie", "__slots__", lambda i: Serie(ids[i], exo, date, 1, 8, 60.0, "seance")),
+        ("Serie", "from_row", lambda i: Serie.from_row((ids[i], "seance", 1, 8, 60.0, ts), exo)),
+        ("Seance", "__dict__", lambda i: DictSeance(ids[i], "Upper A", "Upper Body", date, {}, duration)),
+        ("Seance", "__slots__", lambda i: Seance(ids[i], "Upper A", "Upper Body", date, {}, duration)),
+        ("Seance", "from_row", lambda i: Seance.from_row(seance_row)),
+    ]
+
+    print(f"{'modèle':<12} | {'variante':<10} | {'octets/instance':>15} | {'ns/instance':>11}")
+    for model, variant, build in cases:
+        size, ns = measure(build, args.n)
+        print(f"{model:<12} | {variant:<10} | {size:>15.0f} | {ns:>11.0f}")
+    print("\nfrom_row inclut la conversion des colonnes (datetime, timedelta, dict de contenu).")
+
+
+if __name__ == "__main__":
+    main()
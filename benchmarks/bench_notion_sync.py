@@ -0,0 +1,161 @@
+"""Benchmark de la synchronisation Notion -> base locale, hors ligne.
+
+Joue une synchronisation complète (exercices puis séances et séries), puis
+deux synchronisations incrémentales (sans changement, puis après modification
+de quelques séances) contre `FakeNotion`, et mesure pour chaque phase le temps
+écoulé et le nombre d'appels par endpoint.
+
+    python -m benchmarks.bench_notion_sync --seances 200 --series 15 --latency 0.05
+    python -m benchmarks.bench_notion_sync --throttle-every 40 --json sync.json
+    python -m benchmarks.bench_notion_sync --replay cassette.json
+
+`--record cassette.json` fait la même synchronisation contre la vraie API
+(NOTION_TOKEN_CARNET) en enregistrant les réponses, pour `--replay`.
+"""
+import argparse
+import asyncio
+import json
+import sqlite3
+import tempfile
+from os import getenv
+from os.path import join as pjoin
+from time import perf_counter
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import httpx
+
+from backend import ConnectionPool, ReferenceCache, ExoDB, PushScheduler, RateLimitedAsyncClient, TursoDB, init_db
+from backend import cache, connection, notion
+from benchmarks.fake_notion import FakeNotion, RecordingTransport, EXOS_DB_ID, SEANCES_DS_ID
+from settings import DB_PATH, logger
+
+
+TOUCHED = 5     # séances modifiées avant la dernière synchronisation incrémentale
+
+
+
+
+class LocalReplica:
+    """Connexion sqlite3 exposant l'interface de `turso.sync.ConnectionSync` utilisée par `TursoDB`, sans remote."""
+    def __init__(self, path: str) -> None:
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.pushes = 0
+
+
+    def __getattr__(self, name: str):
+        return getattr(self.conn, name)
+
+    def push(self) -> None:
+        self.pushes += 1
+
+    def pull(self) -> bool:
+        return False
+
+    def stats(self) -> SimpleNamespace:
+        return SimpleNamespace(network_sent_bytes=0, network_received_bytes=0)
+
+
+
+class OfflineTursoDB(TursoDB):
+    def __init__(self, path: str) -> None:
+        self.conn = LocalReplica(path)
+        self.pusher = PushScheduler(self.conn, min_interval=0.5)
+        self.lock = self.pusher.lock
+
+
+
+
+async def run_phase(name: str, fake: FakeNotion | None, client: RateLimitedAsyncClient, sync) -> dict:
+    if fake is not None:
+        fake.reset_counters()
+    requests_before = client.metrics.requests
+    start = perf_counter()
+    await sync()
+    elapsed = perf_counter() - start
+
+    return {
+        "phase": name,
+        "seconds": round(elapsed, 3),
+        "requests": client.metrics.requests - requests_before,
+        "throttled": fake.throttled if fake is not None else None,
+        "calls": dict(fake.calls) if fake is not None else {},
+    }
+
+
+async def bench(args: argparse.Namespace, path: str) -> list[dict]:
+    fake = None
+    if args.record:
+        transport = RecordingTransport(args.record)
+        auth = getenv("NOTION_TOKEN_CARNET")
+    else:
+        kwargs = dict(latency=args.latency, jitter=args.jitter, page_size=args.page_size, throttle_every=args.throttle_every)
+        fake = FakeNotion.from_cassette(args.replay, **kwargs) if args.replay else FakeNotion.synthetic(args.seances, args.series, **kwargs)
+        transport = fake
+        auth = "fake-token"
+
+    client = RateLimitedAsyncClient(auth=auth, client=httpx.AsyncClient(transport=transport), rate=args.rate, burst=max(3, int(args.rate)))
+    turso_db = OfflineTursoDB(path)
+    api = notion.NotionAPI(client=client, turso_db=turso_db)
+    exo_db = ExoDB(db_path=DB_PATH, turso_client=turso_db.conn, push_scheduler=turso_db.pusher)
+
+    phases = [
+        await run_phase("exercices", fake, client, lambda: exo_db.sync_from_notion(client, notion_url=EXOS_DB_ID)),
+        await run_phase("full", fake, client, lambda: api.insert_recent_seance(full=True, workers=args.workers)),
+        await run_phase("incremental", fake, client, lambda: api.insert_recent_seance(full=False, workers=args.workers)),
+    ]
+    if fake is not None:
+        fake.touch(fake.sources[SEANCES_DS_ID][:TOUCHED])
+        phases.append(await run_phase(f"incremental+{TOUCHED}", fake, client, lambda: api.insert_recent_seance(full=False, workers=args.workers)))
+
+    turso_db.close()
+    await client.aclose()
+    return phases
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seances", type=int, default=200)
+    parser.add_argument("--series", type=int, default=15, help="séries par séance")
+    parser.add_argument("--latency", type=float, default=0.02, help="latence simulée par requête (s)")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--throttle-every", type=int, default=0, help="répond 429 à une requête sur N")
+    parser.add_argument("--rate", type=float, default=1000.0, help="requêtes/s du client (Notion: 3)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--replay", help="cassette enregistrée avec --record")
+    parser.add_argument("--record", help="enregistre les réponses de la vraie API dans ce fichier")
+    parser.add_argument("--json", help="écrit les résultats dans ce fichier")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = pjoin(tmp, "fitness.db")
+        with sqlite3.connect(path) as conn:
+            init_db(conn)
+
+        pool = ConnectionPool(path)
+        with (
+            patch.dict(connection._pools, {DB_PATH: pool}),
+            patch.dict(cache._caches, {DB_PATH: ReferenceCache(DB_PATH)}),
+            patch.object(notion, "DB_PATH", path),
+        ):
+            phases = asyncio.run(bench(args, path))
+
+        with sqlite3.connect(path) as conn:
+            counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in ("exercices", "seances", "series")}
+        pool.close()
+
+    print(f"{'phase':<15} | {'temps (s)':>9} | {'requêtes':>8} | {'429':>4} | appels")
+    for phase in phases:
+        calls = ", ".join(f"{endpoint}: {n}" for endpoint, n in sorted(phase["calls"].items()))
+        print(f"{phase['phase']:<15} | {phase['seconds']:>9.3f} | {phase['requests']:>8} | {phase['throttled'] or 0:>4} | {calls}")
+    print(f"Base: {counts}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"params": vars(args), "phases": phases, "rows": counts}, f, indent=2)
+        logger.info(f"Résultats écrits dans {args.json}")
+
+
+if __name__ == "__main__":
+    main()
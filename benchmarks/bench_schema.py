@@ -0,0 +1,78 @@
+"""Benchmark du parsing des pages de séries Notion.
+
+Compare la lecture champ par champ (`JsonFile.safe_get`, comme avant), la
+lecture page par page via le schéma (`PageSchema.record`) et le parsing par
+lots (`PageSchema.parse`) pour plusieurs tailles de lot, sur les pages de
+séries de `FakeNotion.synthetic`.
+
+    python -m benchmarks.bench_schema --seances 2000 --batch 1 10 100 1000
+"""
+import argparse
+from datetime import datetime as dt
+from itertools import batched
+from time import perf_counter
+from typing import Callable
+
+from backend import SERIE_SCHEMA
+from benchmarks.fake_notion import FakeNotion
+from utility import JsonFile
+
+
+def safe_get_rows(pages: list[dict]) -> list[tuple]:
+    rows = []
+    for page in pages:
+        data = page['properties']
+        rows.append((
+            page['id'],
+            int(JsonFile.safe_get(data, "Sets.title.0.plain_text")),
+            int(JsonFile.safe_get(data, "Reps.number")),
+            float(JsonFile.safe_get(data, "Poids.number")),
+            JsonFile.safe_get(data, "Weekly Split Schedule.relation.0.id"),
+            JsonFile.safe_get(data, "Exercise.relation.0.id"),
+            dt.fromisoformat(JsonFile.safe_get(data, "Date .date.start")).timestamp(),
+        ))
+    return rows
+
+def record_rows(pages: list[dict]) -> list[tuple]:
+    return [(page['id'], *SERIE_SCHEMA.record(page['properties']).values()) for page in pages]
+
+def batch_rows(size: int) -> Callable[[list[dict]], list[tuple]]:
+    def run(pages: list[dict]) -> list[tuple]:
+        return [row for chunk in batched(pages, size) for row in SERIE_SCHEMA.parse(chunk).rows()]
+    return run
+
+
+def best_of(func: Callable[[list[dict]], list[tuple]], pages: list[dict], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        func(pages)
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seances", type=int, default=2000)
+    parser.add_argument("--series", type=int, default=15, help="séries par séance")
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    fake = FakeNotion.synthetic(args.seances, series_per_seance=args.series)
+    pages = [page for page in fake.pages.values() if "Reps" in page['properties']]
+
+    cases = [("safe_get", safe_get_rows), ("record", record_rows)]
+    cases += [(f"parse x{size}", batch_rows(size)) for size in args.batch]
+
+    reference = safe_get_rows(pages)
+    print(f"{len(pages)} pages de séries")
+    print(f"{'variante':<12} | {'temps (s)':>9} | {'pages/s':>10}")
+    for name, func in cases:
+        assert func(pages) == reference, name
+        elapsed = best_of(func, pages, args.repeat)
+        print(f"{name:<12} | {elapsed:>9.4f} | {len(pages) / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
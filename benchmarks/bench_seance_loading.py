@@ -0,0 +1,100 @@
+"""Benchmark du chargement de l'historique des séances.
+
+Compare le nombre de requêtes SQL et le temps de chargement entre
+l'ancienne cascade `SeanceDB(id)` (N+1) et `SeanceDB.load_many`.
+
+    python -m benchmarks.bench_seance_loading
+"""
+import sqlite3
+import tempfile
+from os.path import join as pjoin
+from time import perf_counter
+from unittest.mock import patch
+
+from backend import ConnectionPool, ReferenceCache, SeanceDB, init_db
+from backend import cache, connection
+from settings import DB_PATH
+
+
+SIZES = (10, 100, 500)
+EXOS_PER_SEANCE = 5
+SERIES_PER_EXO = 3
+
+
+def seed(path: str, n_seances: int) -> None:
+    """Remplit une base vide avec `n_seances` séances fictives."""
+    with sqlite3.connect(path) as conn:
+        init_db(conn)
+        conn.executemany(
+            "INSERT INTO muscle_group (id, name, body_part) VALUES (?, ?, ?)",
+            [(f"mg-{i}", f"Muscle {i}", "Upper Body") for i in range(EXOS_PER_SEANCE)],
+        )
+        conn.executemany(
+            "INSERT INTO exercices (id, name, dificulty) VALUES (?, ?, 'medium')",
+            [(f"exo-{i}", f"Exercice {i}") for i in range(EXOS_PER_SEANCE)],
+        )
+        conn.executemany(
+            "INSERT INTO exercice_muscle_group (exercice_id, muscle_group_id, target) VALUES (?, ?, 1)",
+            [(f"exo-{i}", f"mg-{i}") for i in range(EXOS_PER_SEANCE)],
+        )
+        conn.executemany(
+            "INSERT INTO seances (id, name, date_ts, body_part, duration) VALUES (?, ?, ?, 'Upper Body', 3600)",
+            [(f"seance-{i}", "Upper A", 1_600_000_000 + i * 86_400) for i in range(n_seances)],
+        )
+        conn.executemany(
+            "INSERT INTO series (id, seance_id, num, exo_id, reps, weight, date_ts) VALUES (?, ?, ?, ?, 8, 60.0, ?)",
+            [
+                (f"serie-{i}-{e}-{n}", f"seance-{i}", n, f"exo-{e}", 1_600_000_000 + i * 86_400)
+                for i in range(n_seances)
+                for e in range(EXOS_PER_SEANCE)
+                for n in range(1, SERIES_PER_EXO + 1)
+            ],
+        )
+
+
+def measure(path: str, loader) -> tuple[int, int, float]:
+    """Exécute `loader` avec un pool dédié à `path` à la place du pool de DB_PATH.
+
+    Returns:
+        tuple[int, int, float]: (connexions ouvertes, requêtes exécutées, durée en s)
+    """
+    queries = 0
+
+    def count_query(statement: str) -> None:
+        nonlocal queries
+        if not statement.lstrip().upper().startswith(("BEGIN", "COMMIT", "ROLLBACK", "PRAGMA")):
+            queries += 1
+
+    pool = ConnectionPool(path, trace=count_query)
+    with patch.dict(connection._pools, {DB_PATH: pool}), patch.dict(cache._caches, {DB_PATH: ReferenceCache(DB_PATH)}):
+        start = perf_counter()
+        loader()
+        elapsed = perf_counter() - start
+    pool.close()
+
+    return pool.stats.misses, queries, elapsed
+
+
+def legacy_history(path: str) -> None:
+    with sqlite3.connect(path) as conn:
+        ids = [id for id, in conn.execute("SELECT id FROM seances")]
+    [SeanceDB(id) for id in ids]
+
+
+def main() -> None:
+    print(f"{'seances':>8} | {'loader':<10} | {'connexions':>10} | {'requêtes':>9} | {'temps (s)':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in SIZES:
+            path = pjoin(tmp, f"fitness_{size}.db")
+            seed(path, size)
+
+            for name, loader in (
+                ("legacy", lambda: legacy_history(path)),
+                ("load_many", SeanceDB.load_many),
+            ):
+                connections, queries, elapsed = measure(path, loader)
+                print(f"{size:>8} | {name:<10} | {connections:>10} | {queries:>9} | {elapsed:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
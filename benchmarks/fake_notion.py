@@ -0,0 +1,330 @@
+"""Notion local pour les benchmarks et les tests hors ligne.
+
+`FakeNotion` est un transport httpx à brancher sur un client `notion_client` :
+
+    fake = FakeNotion.synthetic(n_seances=100, series_per_seance=15)
+    client = AsyncClient(auth="fake", client=httpx.AsyncClient(transport=fake))
+
+Il répond à `databases.retrieve`, `databases.query`, `data_sources.query` et
+`pages.retrieve` depuis un magasin de pages en mémoire, avec une latence, une
+taille de page et une injection de 429 configurables. Les pages viennent soit
+du générateur synthétique, soit d'une cassette enregistrée contre la vraie API
+avec `RecordingTransport`.
+"""
+import asyncio
+import json
+import random
+from collections import Counter
+from datetime import datetime as dt, timedelta, timezone
+from time import sleep
+
+import httpx
+
+
+EXOS_DB_ID = "026420f9e2b44f2bb72560c9775ac355"
+EXOS_DS_ID = "exos-data-source"
+SEANCES_DS_ID = "848c44b2-c392-4618-9c5a-a761cd9b81e0"
+
+BODY_PARTS = ("Upper Body", "Lower Body", "Full Body")
+DIFFICULTIES = ("easy", "medium", "hard")
+
+
+
+
+def _iso(date: dt) -> str:
+    return date.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+def _parse_iso(value: str) -> dt:
+    return dt.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _title(text: str) -> dict:
+    return {"type": "title", "title": [{"type": "text", "plain_text": text, "text": {"content": text}}]}
+
+def _relation(*ids: str) -> dict:
+    return {"type": "relation", "relation": [{"id": id} for id in ids], "has_more": False}
+
+def _select(name: str) -> dict:
+    return {"type": "select", "select": {"name": name}}
+
+def _date(start: dt, end: dt=None) -> dict:
+    return {"type": "date", "date": {"start": start.isoformat(), "end": end and end.isoformat(), "time_zone": None}}
+
+def _number(value: float) -> dict:
+    return {"type": "number", "number": value}
+
+
+def _error(status: int, code: str, message: str, headers: dict=None) -> httpx.Response:
+    return httpx.Response(
+        status,
+        json={"object": "error", "status": status, "code": code, "message": message},
+        headers=headers,
+    )
+
+
+
+
+class FakeNotion(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """Transport httpx servant un espace Notion en mémoire.
+
+    Args:
+        latency (float, optional): Délai ajouté à chaque réponse, en secondes. Defaults to 0.
+        jitter (float, optional): Délai aléatoire supplémentaire maximal, en secondes. Defaults to 0.
+        page_size (int, optional): Taille maximale des pages de résultats. Defaults to 100 (comme Notion).
+        throttle_every (int, optional): Répond 429 à une requête sur `throttle_every`. Defaults to 0 (jamais).
+        retry_after (float, optional): Valeur de l'en-tête Retry-After des 429. Defaults to 0.
+        seed (int, optional): Graine du générateur aléatoire (jitter). Defaults to 0.
+    """
+    def __init__(self, latency: float=0.0, jitter: float=0.0, page_size: int=100, throttle_every: int=0, retry_after: float=0.0, seed: int=0) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.page_size = page_size
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+
+        self.pages: dict[str, dict] = {}
+        self.databases: dict[str, dict] = {}
+        self.sources: dict[str, list[str]] = {}     # data source / database -> IDs des pages
+        self.calls: Counter[str] = Counter()
+        self.throttled = 0
+        self._requests = 0
+
+
+    # |-----------Contenu---------|
+    def add_database(self, id: str, data_source_id: str, last_edited_time: dt) -> None:
+        self.databases[id] = {
+            "object": "database",
+            "id": id,
+            "last_edited_time": _iso(last_edited_time),
+            "data_sources": [{"id": data_source_id, "name": id}],
+        }
+        self.sources.setdefault(data_source_id, [])
+
+    def add_page(self, page: dict, source: str=None) -> None:
+        if page["id"] not in self.pages and source is not None:
+            self.sources.setdefault(source, []).append(page["id"])
+        self.pages[page["id"]] = page
+
+    def touch(self, ids: list[str], when: dt=None) -> None:
+        """Marque des pages comme modifiées (`last_edited_time`)"""
+        when = _iso(when or dt.now(timezone.utc))
+        for id in ids:
+            self.pages[id]["last_edited_time"] = when
+
+    def reset_counters(self) -> None:
+        self.calls.clear()
+        self.throttled = 0
+        self._requests = 0
+
+    @classmethod
+    def synthetic(cls, n_seances: int, series_per_seance: int=15, n_exos: int=30, n_muscle_groups: int=12, seed: int=0, **kwargs) -> "FakeNotion":
+        """Génère un espace Notion fictif : exercices, groupes musculaires, séances et séries.
+
+        Args:
+            n_seances (int): Nombre de séances
+            series_per_seance (int, optional): Séries par séance. Defaults to 15.
+            n_exos (int, optional): Nombre d'exercices. Defaults to 30.
+            n_muscle_groups (int, optional): Nombre de groupes musculaires. Defaults to 12.
+            seed (int, optional): Graine du générateur. Defaults to 0.
+            **kwargs: Options du transport (latence, 429...)
+        """
+        fake = cls(seed=seed, **kwargs)
+        rng = random.Random(seed)
+        origin = dt(2024, 1, 1, 18, tzinfo=timezone.utc)
+        fake.add_database(EXOS_DB_ID, EXOS_DS_ID, origin)
+
+        mg_ids = [f"mg-{i:04d}" for i in range(n_muscle_groups)]
+        for i, id in enumerate(mg_ids):
+            fake.add_page({
+                "object": "page", "id": id, "last_edited_time": _iso(origin),
+                "properties": {"Name": _title(f"Muscle {i}"), "Body Part": _select(BODY_PARTS[i % 2])},
+            })
+
+        exo_ids = [f"exo-{i:04d}" for i in range(n_exos)]
+        for i, id in enumerate(exo_ids):
+            fake.add_page({
+                "object": "page", "id": id, "last_edited_time": _iso(origin),
+                "properties": {
+                    "Name": _title(f"Exercice {i}"),
+                    "Muscle Group": _relation(*rng.sample(mg_ids, k=min(3, n_muscle_groups))),
+                    "Difficulty": _select(DIFFICULTIES[i % 3]),
+                },
+            }, source=EXOS_DS_ID)
+
+        for s in range(n_seances):
+            seance_id = f"seance-{s:06d}"
+            start = origin + timedelta(days=s)
+            exos = rng.sample(exo_ids, k=min(5, n_exos))
+            serie_ids = [f"{seance_id}-serie-{n:03d}" for n in range(series_per_seance)]
+            fake.add_page({
+                "object": "page", "id": seance_id, "last_edited_time": _iso(start + timedelta(hours=2)),
+                "properties": {
+                    "Name": _title(f"{BODY_PARTS[s % 2].split()[0]} {'AB'[s % 2]}"),
+                    "Body Part": _select(BODY_PARTS[s % 2]),
+                    "Date": _date(start, start + timedelta(minutes=rng.randint(45, 90))),
+                    "Workout Exercises": _relation(*serie_ids),
+                },
+            }, source=SEANCES_DS_ID)
+
+            for n, serie_id in enumerate(serie_ids):
+                fake.add_page({
+                    "object": "page", "id": serie_id, "last_edited_time": _iso(start + timedelta(hours=2)),
+                    "properties": {
+                        "Exercise": _relation(exos[n % len(exos)]),
+                        "Date ": _date(start),
+                        "Sets": _title(str(n // len(exos) + 1)),
+                        "Reps": _number(rng.randint(5, 12)),
+                        "Poids": _number(rng.randint(8, 40) * 2.5),
+                        "Weekly Split Schedule": _relation(seance_id),
+                    },
+                })
+        return fake
+
+    @classmethod
+    def from_cassette(cls, path: str, **kwargs) -> "FakeNotion":
+        """Charge les réponses enregistrées par `RecordingTransport` dans le magasin.
+
+        Les pages sont rejouées à partir de leur contenu et non requête par requête :
+        la pagination et les filtres peuvent donc différer de l'enregistrement.
+        """
+        fake = cls(**kwargs)
+        with open(path) as f:
+            interactions = json.load(f)
+
+        for interaction in interactions:
+            if interaction["status"] != 200:
+                continue
+            parts = interaction["path"].strip("/").split("/")[1:]
+            body = interaction["response"]
+            if body.get("object") == "database":
+                fake.databases[body["id"]] = body
+                for source in body.get("data_sources", []):
+                    fake.sources.setdefault(source["id"], [])
+            elif body.get("object") == "page":
+                fake.add_page(body)
+            elif body.get("object") == "list":
+                for page in body["results"]:
+                    fake.add_page(page, source=parts[1])
+        return fake
+
+
+    # |-----------Routage---------|
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        sleep(self._delay())
+        return self.route(request)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(self._delay())
+        return self.route(request)
+
+    def _delay(self) -> float:
+        return self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0)
+
+    def route(self, request: httpx.Request) -> httpx.Response:
+        # /v1/pages/<id>, /v1/databases/<id>, /v1/data_sources/<id>/query...
+        parts = request.url.path.strip("/").split("/")[1:]
+        endpoint = f"{request.method} {'/'.join([parts[0], *parts[2:]])}"
+        self.calls[endpoint] += 1
+        self._requests += 1
+
+        if self.throttle_every and self._requests % self.throttle_every == 0:
+            self.throttled += 1
+            return _error(429, "rate_limited", "Rate limited", {"Retry-After": str(self.retry_after)})
+
+        match request.method, parts:
+            case "GET", ["pages", id]:
+                return self._retrieve(self.pages, id)
+            case "GET", ["databases", id]:
+                return self._retrieve(self.databases, id)
+            case "POST", ["databases" | "data_sources", id, "query"]:
+                return self._query(id, json.loads(request.content or b"{}"))
+        return _error(400, "invalid_request_url", f"Endpoint non simulé: {endpoint}")
+
+    @staticmethod
+    def _retrieve(store: dict[str, dict], id: str) -> httpx.Response:
+        if id not in store:
+            return _error(404, "object_not_found", f"Could not find object with ID: {id}.")
+        return httpx.Response(200, json=store[id])
+
+    def _query(self, source: str, body: dict) -> httpx.Response:
+        if source in self.databases:
+            source = self.databases[source]["data_sources"][0]["id"]
+        if source not in self.sources:
+            return _error(404, "object_not_found", f"Could not find data source with ID: {source}.")
+
+        pages = [self.pages[id] for id in self.sources[source]]
+        try:
+            if "filter" in body:
+                pages = [page for page in pages if self._match(page, body["filter"])]
+            for sort in reversed(body.get("sorts", [])):
+                pages.sort(key=lambda page: self._sort_key(page, sort), reverse=sort.get("direction") == "descending")
+        except (KeyError, ValueError) as e:
+            return _error(400, "validation_error", f"Filtre ou tri non simulé: {e}")
+
+        start = int(body.get("start_cursor") or 0)
+        end = start + min(body.get("page_size", self.page_size), self.page_size)
+        return httpx.Response(200, json={
+            "object": "list",
+            "results": pages[start:end],
+            "has_more": end < len(pages),
+            "next_cursor": str(end) if end < len(pages) else None,
+        })
+
+    @staticmethod
+    def _match(page: dict, filter: dict) -> bool:
+        if "and" in filter:
+            return all(FakeNotion._match(page, f) for f in filter["and"])
+        if "or" in filter:
+            return any(FakeNotion._match(page, f) for f in filter["or"])
+
+        timestamp = filter["timestamp"]
+        value = _parse_iso(page[timestamp])
+        (op, bound), = filter[timestamp].items()
+        bound = _parse_iso(bound)
+        match op:
+            case "on_or_after": return value >= bound
+            case "after": return value > bound
+            case "on_or_before": return value <= bound
+            case "before": return value < bound
+        raise ValueError(op)
+
+    @staticmethod
+    def _sort_key(page: dict, sort: dict) -> str:
+        if "timestamp" in sort:
+            return page[sort["timestamp"]]
+        prop = page["properties"][sort["property"]]
+        return prop["date"]["start"] if prop["type"] == "date" else str(prop.get(prop["type"]))
+
+
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Enveloppe un transport réel et enregistre les échanges pour `FakeNotion.from_cassette`."""
+    def __init__(self, path: str, transport: httpx.AsyncBaseTransport=None) -> None:
+        self.path = path
+        self.transport = transport or httpx.AsyncHTTPTransport()
+        self.interactions: list[dict] = []
+
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await self.transport.handle_async_request(request)
+        content = await response.aread()
+        self.interactions.append({
+            "method": request.method,
+            "path": request.url.path,
+            "request": json.loads(request.content) if request.content else None,
+            "status": response.status_code,
+            "response": json.loads(content) if content else None,
+        })
+        # Le contenu est déjà décompressé
+        headers = [(k, v) for k, v in response.headers.items() if k.lower() not in ("content-encoding", "content-length")]
+        return httpx.Response(response.status_code, headers=headers, content=content)
+
+    async def aclose(self) -> None:
+        self.save()
+        await self.transport.aclose()
+
+    def save(self) -> None:
+        with open(self.path, "w") as f:
+            json.dump(self.interactions, f, indent=1)
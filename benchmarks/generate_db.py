@@ -0,0 +1,211 @@
+"""Générateur de fitness.db synthétique.
+
+Remplit le schéma de `init_db` avec des groupes musculaires, des exercices
+(et leurs liaisons), et des années de séances au rythme Upper A / Lower /
+Upper B, avec des charges qui progressent dans le temps.
+
+    python -m benchmarks.generate_db /tmp/fitness_10y.db --years 10
+    python -m benchmarks.generate_db /tmp/fitness_xl.db --years 40 --per-week 6 --sets 6   # ~1M séries
+"""
+import argparse
+import random
+import sqlite3
+import uuid
+from datetime import datetime as dt, timedelta
+from itertools import batched
+from time import perf_counter
+from typing import Iterator
+
+from backend import init_db, rebuild_rollups
+
+
+CHUNK_SIZE = 10_000
+ROTATION = ("Upper A", "Lower", "Upper B")
+
+MUSCLE_GROUPS = {
+    "Upper Body": ("Pectoraux", "Dorsaux", "Trapèzes", "Deltoïdes antérieurs", "Deltoïdes latéraux",
+                   "Deltoïdes postérieurs", "Biceps", "Triceps", "Avant-bras"),
+    "Lower Body": ("Quadriceps", "Ischio-jambiers", "Fessiers", "Adducteurs", "Mollets"),
+    "Core": ("Abdominaux", "Lombaires", "Obliques"),
+}
+
+# nom -> (partie du corps de la séance, groupes musculaires par ordre d'importance, charge de départ en kg)
+EXERCICES = {
+    "Développé Couché": ("Upper Body", ("Pectoraux", "Triceps", "Deltoïdes antérieurs"), 60.0),
+    "Développé Incliné Haltères": ("Upper Body", ("Pectoraux", "Deltoïdes antérieurs", "Triceps"), 22.0),
+    "Écarté Poulie": ("Upper Body", ("Pectoraux",), 12.5),
+    "Dips": ("Upper Body", ("Triceps", "Pectoraux"), 10.0),
+    "Tractions": ("Upper Body", ("Dorsaux", "Biceps"), 5.0),
+    "Rowing Barre": ("Upper Body", ("Dorsaux", "Trapèzes", "Biceps"), 50.0),
+    "Tirage Vertical": ("Upper Body", ("Dorsaux", "Biceps"), 45.0),
+    "Rowing Haltère": ("Upper Body", ("Dorsaux", "Deltoïdes postérieurs"), 24.0),
+    "Développé Militaire": ("Upper Body", ("Deltoïdes antérieurs", "Triceps"), 40.0),
+    "Élévations Latérales": ("Upper Body", ("Deltoïdes latéraux",), 8.0),
+    "Face Pull": ("Upper Body", ("Deltoïdes postérieurs", "Trapèzes"), 15.0),
+    "Curl Barre": ("Upper Body", ("Biceps", "Avant-bras"), 25.0),
+    "Curl Marteau": ("Upper Body", ("Biceps", "Avant-bras"), 12.0),
+    "Extension Triceps Poulie": ("Upper Body", ("Triceps",), 20.0),
+    "Barre Front": ("Upper Body", ("Triceps",), 25.0),
+    "Squat": ("Lower Body", ("Quadriceps", "Fessiers", "Adducteurs"), 80.0),
+    "Soulevé de Terre": ("Lower Body", ("Ischio-jambiers", "Fessiers", "Lombaires"), 100.0),
+    "Soulevé de Terre Roumain": ("Lower Body", ("Ischio-jambiers", "Fessiers"), 70.0),
+    "Presse à Cuisses": ("Lower Body", ("Quadriceps", "Fessiers"), 150.0),
+    "Fentes Bulgares": ("Lower Body", ("Quadriceps", "Fessiers"), 16.0),
+    "Leg Curl": ("Lower Body", ("Ischio-jambiers",), 35.0),
+    "Leg Extension": ("Lower Body", ("Quadriceps",), 40.0),
+    "Hip Thrust": ("Lower Body", ("Fessiers", "Ischio-jambiers"), 90.0),
+    "Mollets Debout": ("Lower Body", ("Mollets",), 60.0),
+    "Crunch Poulie": ("Full Body", ("Abdominaux",), 30.0),
+    "Relevé de Jambes": ("Full Body", ("Abdominaux", "Obliques"), 0.0),
+    "Gainage Lesté": ("Full Body", ("Abdominaux", "Lombaires"), 10.0),
+}
+
+SESSION_BODY_PART = {"Upper A": "Upper Body", "Upper B": "Upper Body", "Lower": "Lower Body", "Full Body": "Full Body"}
+
+
+
+
+def new_id(rng: random.Random) -> str:
+    """UUID v4 au format des IDs Notion"""
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def session_dates(rng: random.Random, start: dt, n_seances: int, per_week: int) -> Iterator[dt]:
+    """Dates des séances : `per_week` jours tirés par semaine, à une heure variable"""
+    week = start - timedelta(days=start.weekday())
+    produced = 0
+    while produced < n_seances:
+        for day in sorted(rng.sample(range(7), k=min(per_week, 7))):
+            if produced == n_seances:
+                return
+            yield week + timedelta(days=day, hours=rng.choice((7, 12, 18, 19)), minutes=rng.randrange(60))
+            produced += 1
+        week += timedelta(weeks=1)
+
+
+def generate(conn: sqlite3.Connection, n_seances: int, per_week: int=3, exos_per_seance: int=5, sets: int=4, seed: int=0, end: dt=None) -> dict[str, int]:
+    """Remplit `conn` avec des données d'entraînement fictives.
+
+    Args:
+        conn (sqlite3.Connection): Connexion vers une base vide
+        n_seances (int): Nombre de séances
+        per_week (int, optional): Séances par semaine. Defaults to 3.
+        exos_per_seance (int, optional): Exercices par séance. Defaults to 5.
+        sets (int, optional): Séries par exercice. Defaults to 4.
+        seed (int, optional): Graine du générateur. Defaults to 0.
+        end (dt, optional): Date de la dernière séance environ. Defaults to maintenant.
+
+    Returns:
+        dict[str, int]: Nombre de lignes insérées par table
+    """
+    rng = random.Random(seed)
+    init_db(conn)
+
+    mg_ids = {name: new_id(rng) for names in MUSCLE_GROUPS.values() for name in names}
+    conn.executemany(
+        "INSERT INTO muscle_group (id, name, body_part) VALUES (?, ?, ?)",
+        [(mg_ids[name], name, body_part) for body_part, names in MUSCLE_GROUPS.items() for name in names],
+    )
+
+    exo_ids = {name: new_id(rng) for name in EXERCICES}
+    conn.executemany(
+        "INSERT INTO exercices (id, name, dificulty) VALUES (?, ?, ?)",
+        [(exo_ids[name], name, rng.choice(("easy", "medium", "hard"))) for name in EXERCICES],
+    )
+    conn.executemany(
+        "INSERT INTO exercice_muscle_group (exercice_id, muscle_group_id, target) VALUES (?, ?, ?)",
+        [
+            (exo_ids[name], mg_ids[mg], target)
+            for name, (_, mgs, _) in EXERCICES.items()
+            for target, mg in enumerate(mgs, start=1)
+        ],
+    )
+
+    by_body_part: dict[str, list[str]] = {}
+    for name, (body_part, _, _) in EXERCICES.items():
+        by_body_part.setdefault(body_part, []).append(name)
+
+    end = end or dt.now().astimezone()
+    weeks = n_seances / per_week
+    start = end - timedelta(weeks=weeks)
+    # Progression : charge de départ x (1 + ~8 % par an), avec un bruit de ±5 %
+    yearly_gain = 0.08
+
+    counts = {"seances": 0, "series": 0}
+
+    def rows() -> Iterator[tuple[tuple, list[tuple]]]:
+        for i, date in enumerate(session_dates(rng, start, n_seances, per_week)):
+            name = "Full Body" if rng.random() < 0.05 else ROTATION[i % len(ROTATION)]
+            body_part = SESSION_BODY_PART[name]
+            pool = by_body_part[body_part] if body_part != "Full Body" else list(EXERCICES)
+            exos = rng.sample(pool, k=min(exos_per_seance, len(pool)))
+            if body_part != "Full Body":
+                exos[-1] = rng.choice(by_body_part["Full Body"])    # un exercice de gainage par séance
+
+            seance_id = new_id(rng)
+            years = (date - start).days / 365
+            series = []
+            for exo in exos:
+                base = EXERCICES[exo][2] * (1 + yearly_gain * years)
+                for num in range(1, sets + 1):
+                    weight = round(base * rng.uniform(0.95, 1.05) / 2.5) * 2.5
+                    series.append((new_id(rng), seance_id, num, exo_ids[exo], rng.randint(4, 12), weight, date.timestamp()))
+
+            duration = len(exos) * sets * rng.randint(150, 240)
+            yield (seance_id, name, date.timestamp(), body_part, duration), series
+
+    for chunk in batched(rows(), max(1, CHUNK_SIZE // (exos_per_seance * sets))):
+        conn.executemany(
+            "INSERT INTO seances (id, name, date_ts, body_part, duration) VALUES (?, ?, ?, ?, ?)",
+            [seance for seance, _ in chunk],
+        )
+        series = [serie for _, series in chunk for serie in series]
+        conn.executemany(
+            "INSERT INTO series (id, seance_id, num, exo_id, reps, weight, date_ts) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            series,
+        )
+        counts["seances"] += len(chunk)
+        counts["series"] += len(series)
+
+    conn.executemany(
+        "INSERT OR REPLACE INTO meta (table_name, last_update) VALUES (?, ?)",
+        [(table, end.isoformat()) for table in ("exercices", "muscle_group", "seances", "series")],
+    )
+    rebuild_rollups(conn)
+    conn.commit()
+
+    counts["exercices"] = len(exo_ids)
+    counts["muscle_group"] = len(mg_ids)
+    return counts
+
+
+def create(path: str, **kwargs) -> dict[str, int]:
+    """Crée une base synthétique à `path` (voir `generate`)"""
+    with sqlite3.connect(path) as conn:
+        # Pas de journal ni de fsync : la base est jetable
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        counts = generate(conn, **kwargs)
+    conn.close()
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="fichier .db à créer (doit ne pas exister)")
+    parser.add_argument("--years", type=float, default=10)
+    parser.add_argument("--seances", type=int, help="nombre de séances (remplace --years)")
+    parser.add_argument("--per-week", type=int, default=3)
+    parser.add_argument("--exos", type=int, default=5, help="exercices par séance")
+    parser.add_argument("--sets", type=int, default=4, help="séries par exercice")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    n_seances = args.seances or round(args.years * 52 * args.per_week)
+    start = perf_counter()
+    counts = create(args.path, n_seances=n_seances, per_week=args.per_week, exos_per_seance=args.exos, sets=args.sets, seed=args.seed)
+    print(f"{args.path}: {counts} in {perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
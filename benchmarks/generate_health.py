@@ -0,0 +1,122 @@
+"""Générateur d'export.xml Apple Health synthétique.
+
+Produit un fichier au format de l'export de l'app Santé : en-tête DTD,
+`<Me>`, puis des `<Record>` groupés par type (pas, fréquence cardiaque avec
+MetadataEntry, poids, sommeil en catégorie...) et quelques `<Workout>`.
+
+    python -m benchmarks.generate_health /tmp/export.xml --records 1000000
+"""
+import argparse
+import random
+from datetime import datetime as dt, timedelta, timezone
+from time import perf_counter
+from typing import IO
+
+
+HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE HealthData [
+<!ELEMENT HealthData (ExportDate,Me,(Record|Correlation|Workout|ActivitySummary|ClinicalRecord)*)>
+<!ATTLIST HealthData locale CDATA #REQUIRED>
+<!ELEMENT ExportDate EMPTY>
+<!ATTLIST ExportDate value CDATA #REQUIRED>
+<!ELEMENT Me EMPTY>
+<!ELEMENT Record ((MetadataEntry|HeartRateVariabilityMetadataList)*)>
+<!ATTLIST Record
+  type          CDATA #REQUIRED
+  unit          CDATA #IMPLIED
+  value         CDATA #IMPLIED
+  sourceName    CDATA #REQUIRED
+  sourceVersion CDATA #IMPLIED
+  device        CDATA #IMPLIED
+  creationDate  CDATA #IMPLIED
+  startDate     CDATA #REQUIRED
+  endDate       CDATA #REQUIRED
+>
+<!ELEMENT MetadataEntry EMPTY>
+<!ATTLIST MetadataEntry key CDATA #REQUIRED value CDATA #REQUIRED>
+]>
+<HealthData locale="fr_FR">
+ <ExportDate value="{export_date}"/>
+ <Me HKCharacteristicTypeIdentifierDateOfBirth="1995-01-01" HKCharacteristicTypeIdentifierBiologicalSex="HKBiologicalSexMale"/>
+"""
+
+# type -> (unité, valeur (rng) -> str, durée en secondes, part des records)
+RECORD_TYPES = {
+    "HKQuantityTypeIdentifierStepCount": ("count", lambda rng: str(rng.randint(10, 900)), 600, 0.40),
+    "HKQuantityTypeIdentifierHeartRate": ("count/min", lambda rng: str(rng.randint(48, 175)), 0, 0.35),
+    "HKQuantityTypeIdentifierActiveEnergyBurned": ("Cal", lambda rng: f"{rng.uniform(0.1, 20):.3f}", 60, 0.15),
+    "HKQuantityTypeIdentifierBodyMass": ("kg", lambda rng: f"{rng.gauss(78, 1.5):.1f}", 0, 0.02),
+    "HKCategoryTypeIdentifierSleepAnalysis": (None, lambda rng: rng.choice(("HKCategoryValueSleepAnalysisAsleepCore", "HKCategoryValueSleepAnalysisAsleepDeep", "HKCategoryValueSleepAnalysisAwake")), 1800, 0.08),
+}
+SOURCES = ("iPhone", "Apple Watch")
+
+
+def health_date(date: dt) -> str:
+    return date.strftime("%Y-%m-%d %H:%M:%S %z")
+
+
+def write_export(f: IO[str], n_records: int, seed: int=0, end: dt=None) -> int:
+    """Écrit un export de `n_records` records environ dans `f`.
+
+    Args:
+        f (IO[str]): Fichier texte ouvert en écriture
+        n_records (int): Nombre de records
+        seed (int, optional): Graine du générateur. Defaults to 0.
+        end (dt, optional): Date du dernier record environ. Defaults to maintenant.
+
+    Returns:
+        int: Nombre de records écrits
+    """
+    rng = random.Random(seed)
+    tz = timezone(timedelta(hours=1))
+    end = (end or dt.now(tz)).astimezone(tz).replace(microsecond=0)
+    f.write(HEADER.format(export_date=health_date(end)))
+
+    written = 0
+    for record_type, (unit, value, duration, share) in RECORD_TYPES.items():
+        count = round(n_records * share)
+        step = timedelta(days=3 * 365) / max(count, 1)
+        date = end - step * count
+        unit_attr = f' unit="{unit}"' if unit else ""
+        for _ in range(count):
+            date += step
+            start = date.replace(microsecond=0)
+            stop = start + timedelta(seconds=duration)
+            source = rng.choice(SOURCES)
+            f.write(
+                f' <Record type="{record_type}" sourceName="{source}" sourceVersion="17.4"{unit_attr} '
+                f'creationDate="{health_date(stop + timedelta(minutes=rng.randint(0, 30)))}" '
+                f'startDate="{health_date(start)}" endDate="{health_date(stop)}" value="{value(rng)}"'
+            )
+            if record_type.endswith("HeartRate"):
+                f.write('>\n  <MetadataEntry key="HKMetadataKeyHeartRateMotionContext" value="0"/>\n </Record>\n')
+            else:
+                f.write('/>\n')
+            written += 1
+
+    for i in range(max(1, n_records // 10_000)):
+        start = end - timedelta(days=2 * i, hours=2)
+        f.write(
+            f' <Workout workoutActivityType="HKWorkoutActivityTypeTraditionalStrengthTraining" duration="60" '
+            f'durationUnit="min" sourceName="Apple Watch" startDate="{health_date(start)}" '
+            f'endDate="{health_date(start + timedelta(hours=1))}"/>\n'
+        )
+    f.write("</HealthData>\n")
+    return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="fichier export.xml à créer")
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = perf_counter()
+    with open(args.path, "w", encoding="utf-8") as f:
+        written = write_export(f, args.records, seed=args.seed)
+    print(f"{args.path}: {written} records in {perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
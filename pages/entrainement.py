@@ -1,9 +1,10 @@
 import streamlit as st
 from datetime import datetime as dt, date, timedelta
 import plotly.graph_objects as go
-from backend import SeanceDB, Seance
-from settings import DB_PATH
-import sqlite3
+from backend import SeanceDB
+from backend import loaders
+from backend.loaders import count_streak
+from backend.page_cache import cached_loader
 
 from icecream import ic
 from typing import Generator, Iterable
@@ -22,17 +23,6 @@ st.title("Gérer les entrainements [ici](https://www.notion.so/ZERO-TO-HERO-f0d0
 
 DAYS_NUMBER = 7
 
-@timer_performance
-def open_history() -> list[SeanceDB]:
-    with sqlite3.connect(DB_PATH) as conn:
-        cur = conn.cursor()
-
-        cur.execute("""
-            SELECT * from seances
-        """)
-        
-        return [SeanceDB(*args) for args in cur.fetchall()]
-
 def week_calendar() -> None:
     """Créer un calendrier hebdo avec la date d'aujourd'hui surlignée
     """
@@ -49,52 +39,7 @@ def week_calendar() -> None:
                 st.info(f"**{day.strftime('%a')}**\n" + day.strftime('%d/%m'))
 
 
-   
-def group_workout_by_week(workouts: Iterable[SeanceDB]) -> dict:
-    """Renvoie la liste des séances sous forme de dictionnaire avec comme clé la semaine et valeurs les séances de la semaines
 
-    Args:
-        workouts (Iterable[SeanceDB]): Liste des séances
-
-    Returns:
-        dict: Dictionaire des séances rangé par semaines
-    """
-    weeks = {}
-    for workout in workouts:
-        year, week, _ = workout.date.isocalendar()
-        key = (year, week)
-        
-        if key not in weeks:
-            weeks[key] = set()
-            
-        weeks[key].add(workout.name)
-        
-    return weeks
-
-def count_streak(workouts: Iterable[SeanceDB]) -> int:
-    """Count the number of consecutive weeks with at least one workout.
-
-    Args:
-        workouts (list): List of Workout objects.
-
-    Returns:
-        int: Number of consecutive weeks with at least one workout.
-    """
-    weeks = group_workout_by_week(workouts)
-    sorted_weeks = sorted(weeks.keys(), reverse=True)
-
-    required_sessions = {"Upper A", "Lower", "Upper B"}
-    streak_count = 0
-    current_year, current_week, _ = date.today().isocalendar()
-    for year_week in sorted_weeks:
-        if year_week == (current_year, current_week) and not required_sessions.issubset(weeks[year_week]):
-            continue  # Ignore la semaine actuelle si elle n'est pas terminé
-        elif required_sessions.issubset(weeks[year_week]):
-            streak_count += 1
-        else:
-            break
-        
-    return streak_count
 
 @timer_performance
 def week_streak(workouts: Iterable[SeanceDB]) -> None:
@@ -104,36 +49,13 @@ def week_streak(workouts: Iterable[SeanceDB]) -> None:
     st.write("série actuelle")
 
 
-def weekly_workouts_volume(week_date: date=date.today()) -> int:
-    """Calculate the total volume of workouts for a given week.
-
-    Args:
-        week_date (date): Date to retrieve week from
-
-    Returns:
-        float: Total volume of workouts for the week.
-    """
-    start_of_week = week_date - timedelta(days=week_date.weekday())
-    end_of_week = start_of_week + timedelta(days=6)
-    
-    with sqlite3.connect(DB_PATH) as conn:
-        cur = conn.cursor()
-
-        cur.execute("""
-            SELECT duration FROM seances
-            WHERE date_ts BETWEEN ? AND ?
-        """, (start_of_week.isoformat(), end_of_week.isoformat()))
-        
-        total_seconds = sum([duration for duration, in cur.fetchall()])
-
-    return total_seconds // 60
-
 @timer_performance
 def week_volume() -> None:
     """Display the weekly volume as a progress bar
     """
     TARGET_MINUTES = 3*50
-    volume = weekly_workouts_volume()
+    # Date passée explicitement : la clé de cache change avec la semaine
+    volume = weekly_workouts_volume(date.today())
 
     pourcentage = int((volume / TARGET_MINUTES) * 100) if TARGET_MINUTES else 0
     pourcentage = min(pourcentage, 100)
@@ -143,6 +65,9 @@ def week_volume() -> None:
 
 
 
+open_history = cached_loader(loaders.open_history)
+weekly_workouts_volume = cached_loader(loaders.weekly_workouts_volume)
+
 WORKOUTS = open_history()
 
 week_calendar()
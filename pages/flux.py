@@ -1,54 +1,57 @@
 import streamlit as st
-import sqlite3
-from settings import DB_PATH
+from backend import progression
+from backend.page_cache import cached_loader
+from backend.downsample import downsample_line
 import pandas as pd
 import plotly.graph_objects as go
-from numpy import cos, pi
 
 st.title("Flux")
 st.write("Consultez le flux de vos entraînements.")
 
 
-db = sqlite3.connect(DB_PATH)
-cursor = db.cursor()
+DEFAULT_EXERCISE = "Développé Couché"
 
+# Tous les exercices en un chargement : changer d'exercice ne fait que filtrer
+load_progression = cached_loader(progression.load_progression)
+data = load_progression()
 
-df = pd.read_sql_query("""
-    SELECT e.name AS Exercise, s.num AS "Set Number", s.reps AS Reps, s.weight AS Weight, s.date_ts AS Date
-    FROM series AS s
-    JOIN exercices AS e 
-        ON s.exo_id = e.id
-    WHERE e.name = "Développé Couché"
-    ORDER BY s.date_ts DESC
-""", db)
-df['Date'] = pd.to_datetime(df['Date'], utc=True)
+exercises = data.exercises
+if not exercises:
+    st.info("Aucune série enregistrée.")
+    st.stop()
 
+exercise = st.selectbox(
+    "Exercice",
+    exercises,
+    index=exercises.index(DEFAULT_EXERCISE) if DEFAULT_EXERCISE in exercises else 0,
+)
+df, seances = data.exercise(exercise)
 
-def volume(poids, reps):
-    return poids * reps
+st.dataframe(df[["Exercise", "Set Number", "Reps", "Weight", "Date", "Volume", "Score", "1RM Epley"]])
+st.download_button("Exporter (CSV)", df.to_csv(index=False), file_name=f"{exercise}.csv", mime="text/csv")
 
+# Courbes réduites par LTTB à la largeur du graphique, sauf demande explicite
+raw = st.toggle("Toutes les données", help="Tous les points sur les courbes, pour zoomer finement")
 
-def phi(poids, reps, rep_max=6, rep_min=4):
-    return (1 - cos(pi * (reps - rep_min) / (rep_max - rep_min)))/2
-
-def score(poids, reps, eps=0.07):
-    return poids * (1 - eps*phi(poids, reps))
-
-st.dataframe(df)
+def line(data: pd.DataFrame, y: str, **kwargs) -> go.Scatter:
+    points = data if raw else downsample_line(data, "Date", y)
+    return go.Scatter(x=points['Date'], y=points[y], **kwargs)
 
 
 st.write("### Volume par série")
-df['Volume'] = df.apply(lambda row: volume(row['Weight'], row['Reps']), axis=1)
-df['Score'] = df.apply(lambda row: score(row['Weight'], row['Reps']), axis=1)
-
-fig = go.Figure(data=go.Scatter(
-    x=df['Date'],
-    y=df['Volume'],))
+fig = go.Figure(data=line(df, 'Volume'))
 st.plotly_chart(fig, use_container_width=True)
 
 
 st.write("### Score par série")
-fig2 = go.Figure(data=go.Scatter(
-    x=df['Date'],
-    y=df['Score'],))
+fig2 = go.Figure(data=line(df, 'Score'))
 st.plotly_chart(fig2, use_container_width=True)
+
+
+st.write("### 1RM estimé par séance")
+fig3 = go.Figure([
+    line(seances, '1RM Epley', name="Epley"),
+    line(seances, '1RM Brzycki', name="Brzycki"),
+])
+fig3.update_layout(yaxis_title="kg", xaxis_title="Séance")
+st.plotly_chart(fig3, use_container_width=True)
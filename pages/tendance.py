@@ -1,8 +1,10 @@
 import streamlit as st
 import plotly.graph_objects as go
 import pandas as pd
-import sqlite3
-from backend.models_db import DB_PATH, MuscleGroupDB
+from datetime import date, timedelta
+from backend import loaders
+from backend.downsample import time_buckets
+from backend.page_cache import cached_loader
 import json
 from logs.logger_config import setup_logger
 
@@ -13,140 +15,90 @@ logger = setup_logger()
 
 
 
-def load_seance_data() -> pd.DataFrame:
-    """Charger les données de la table seances
-    """
-    with sqlite3.connect(DB_PATH) as conn:
-        df = pd.read_sql(
-            """SELECT w.date_ts, 
-                      w.duration, 
-                      SUM(s.reps*s.weight) AS volume,
-                      SUM(s.reps) AS total_reps
-                FROM seances AS w
-                JOIN series AS s ON s.seance_id == w.id
-                GROUP BY w.id
-                ORDER BY w.date_ts DESC       
-            """, conn)
-
-    df['date'] = pd.to_datetime(df['date_ts'], utc=True)
-    df["duration"] = pd.to_timedelta(df["duration"], unit="s")
-
-    return df
-
-def load_serie_data() -> pd.DataFrame:
-    """Charger les données de la table series
-    """
-    with sqlite3.connect(DB_PATH) as conn:
-        df = pd.read_sql(
-            """SELECT s.date_ts, 
-                      s.num AS num,
-                      s.reps AS reps,
-                      s.weight AS poids,
-                      s.reps*s.weight AS volume,
-                      e.name AS exercice,
-                      (SELECT muscle_group_id FROM exercice_muscle_group WHERE exercice_id = e.id ORDER BY target LIMIT 1) AS muscle_group
-                FROM series AS s
-                JOIN exercices AS e ON s.exo_id == e.id
-                GROUP BY s.id
-                ORDER BY s.date_ts DESC       
-            """, conn)
-    
-    try:
-        df['muscle_group'] = df['muscle_group'].apply(lambda id: MuscleGroupDB(id))
-    except Exception as e:
-        logger.error(f"Error processing muscle_group column: {e}")
-    df['date'] = pd.to_datetime(df['date_ts'], utc=True)
-
-    return df
-
-
-def get_datat_within_date(df: pd.DataFrame, key=0) -> tuple[pd.DataFrame, pd.Timestamp, pd.Timestamp]:
-    timezone = df['date'][0].tz
-    end_date = pd.Timestamp.today(tz=timezone)
-    end = pd.Timestamp.combine(end_date.date(), pd.Timestamp.max.time()).tz_localize(timezone)
-    start_date = st.date_input(
+def date_window() -> tuple[date, date]:
+    """Fenêtre de dates commune à tous les graphiques de la page, chargée une seule fois"""
+    end = date.today()
+    start = st.date_input(
         "Depuis le",
-        value=end - pd.Timedelta(days=6),
-        key=key
+        value=end - timedelta(days=6),
+        max_value=end,
+        key="window"
     )
-    start = pd.Timestamp.combine(start_date, pd.Timestamp.min.time()).tz_localize(timezone)
+    return start, end
 
 
-    return df[df['date'] > start], start, end
+def chart_bars(df: pd.DataFrame, columns: list[str]) -> pd.DataFrame:
+    """Une barre par séance, ou regroupées par période si elles dépassent la largeur du graphique"""
+    if st.session_state.get("raw"):
+        return df
+    return time_buckets(df, "date", columns)[0]
         
 
-def graph_time(data: pd.DataFrame):
-    df, start, end = get_datat_within_date(data)
-    
+def graph_time(df: pd.DataFrame, start: date, end: date):
     total_duration = df["duration"].sum()
     hours, remainder = divmod(total_duration.total_seconds(), 3600)
     minutes, seconds = divmod(remainder, 60)
     
     st.info(f"""Temps Total: {int(hours):02d}h{int(minutes):02d}\n
-            {start.date().strftime("%d %b")} - {end.date().strftime("%d %b")}
+            {start.strftime("%d %b")} - {end.strftime("%d %b")}
     """)
 
     # Créer le bar chart
-    df['duration'] = df['duration'].dt.total_seconds()/3600
-    fig = go.Figure([go.Bar(x=df['date'], y=df['duration'])])
+    bars = chart_bars(df, ["duration"])
+    fig = go.Figure([go.Bar(x=bars['date'], y=bars['duration'].dt.total_seconds()/3600)])
     fig.update_layout(title="Temps total d'heures par jour de la semaine", yaxis_title="Heures", xaxis_title="Jour")
 
     st.plotly_chart(fig)
 
 
-def graph_volume(data: pd.DataFrame):
-    df, start, end = get_datat_within_date(data)
-    
+def graph_volume(df: pd.DataFrame, start: date, end: date):
     total_volume = df["volume"].sum()
     
     st.info(f"""Volume Total: {int(total_volume):,}kg\n
-            {start.date().strftime("%d %b")} - {end.date().strftime("%d %b")}
+            {start.strftime("%d %b")} - {end.strftime("%d %b")}
     """)
 
     # Créer le bar chart
-    fig = go.Figure([go.Bar(x=df['date'], y=df['volume'])])
+    bars = chart_bars(df, ["volume"])
+    fig = go.Figure([go.Bar(x=bars['date'], y=bars['volume'])])
     fig.update_layout(title="Volume total de la semaine", yaxis_title="kg", xaxis_title="Jour")
 
     st.plotly_chart(fig)
 
 
-def graph_series(data: pd.DataFrame):
-    df, start, end = get_datat_within_date(data)
-    
+def graph_series(df: pd.DataFrame, start: date, end: date):
     total_serie = df["total_serie"].sum()
     
     st.info(f"""Totla de séries: {int(total_serie)}\n
-            {start.date().strftime("%d %b")} - {end.date().strftime("%d %b")}
+            {start.strftime("%d %b")} - {end.strftime("%d %b")}
     """)
 
     # Créer le bar chart
-    fig = go.Figure([go.Bar(x=df['date'], y=df['total_serie'])])
+    bars = chart_bars(df, ["total_serie"])
+    fig = go.Figure([go.Bar(x=bars['date'], y=bars['total_serie'])])
     fig.update_layout(title="Total de séries de la semaine", yaxis_title="kg", xaxis_title="Jour")
 
     st.plotly_chart(fig)
 
 
+def choose(key: str, value: str) -> None:
+    """Callback des boutons : l'état est à jour avant le rerun déclenché par le clic"""
+    st.session_state[key] = value
+
+
 def graph_choice():
     col1, col2, col3 = st.columns(3)
     with col1:
-        if st.button("Temps"):
-            st.session_state.graph = "Temps"
-            st.rerun()
+        st.button("Temps", on_click=choose, args=("graph", "Temps"))
     with col2:
-        if st.button("Volume", key=10):
-            st.session_state.graph = "Volume"
-            st.rerun()
+        st.button("Volume", key=10, on_click=choose, args=("graph", "Volume"))
     with col3:
-        if st.button("Séries", key=11):
-            st.session_state.graph = "Séries"
-            st.rerun()
+        st.button("Séries", key=11, on_click=choose, args=("graph", "Séries"))
 
 
 
 
-def stats(data: pd.DataFrame):
-    df = get_datat_within_date(data, 1)[0]
-    
+def stats(df: pd.DataFrame):
     col1, col2 = st.columns(2)
 
     with col1:
@@ -167,13 +119,8 @@ def stats(data: pd.DataFrame):
 
 
 
-def serie_by_body_part(data: pd.DataFrame) -> pd.Grouper:
-    df = get_datat_within_date(data, 2)[0]
-    
-    df['muscle_group'] = df['muscle_group'].apply(lambda mgs: mgs[0].body_part)
-    df_flat = df.explode('muscle_group', ignore_index=True)
-    
-    return df_flat.groupby('muscle_group')
+def serie_by_body_part(df: pd.DataFrame) -> pd.Grouper:
+    return df.groupby('body_part')
     
     
 def spider_chart(x: pd.Series, y: pd.Series, label: str="") -> None:
@@ -209,49 +156,48 @@ def body_part_reps(data: pd.DataFrame):
     df = serie_by_body_part(data)
 
     df_grouped = df['reps'].sum().reset_index()
-    spider_chart(df_grouped["reps"], df_grouped["muscle_group"])
+    spider_chart(df_grouped["reps"], df_grouped["body_part"])
 
 
 def body_part_series(data: pd.DataFrame):
     df = serie_by_body_part(data)
 
-    df_grouped = df['num'].sum().reset_index()
-    spider_chart(df_grouped["num"], df_grouped["muscle_group"])
+    df_grouped = df['series'].sum().reset_index()
+    spider_chart(df_grouped["series"], df_grouped["body_part"])
 
 
 def body_part_volume(data: pd.DataFrame):
     df = serie_by_body_part(data)
 
     df_grouped = df['volume'].sum().reset_index()
-    spider_chart(df_grouped["volume"], df_grouped["muscle_group"])
+    spider_chart(df_grouped["volume"], df_grouped["body_part"])
 
 
 def spider_choice():
     col1, col2, col3 = st.columns(3)
     with col1:
-        if st.button("Reps"):
-            st.session_state.spider = "Reps"
-            st.rerun()
+        st.button("Reps", on_click=choose, args=("spider", "Reps"))
     with col2:
-        if st.button("Séries", key=12):
-            st.session_state.spider = "Séries"
-            st.rerun()
+        st.button("Séries", key=12, on_click=choose, args=("spider", "Séries"))
     with col3:
-        if st.button("Volume", key=13):
-            st.session_state.spider = "Volume"
-            st.rerun()
+        st.button("Volume", key=13, on_click=choose, args=("spider", "Volume"))
 
 
 
 
 
 
-
-workouts = load_seance_data()
-series = load_serie_data()
+load_seance_data = cached_loader(loaders.load_seance_data)
+load_body_part_data = cached_loader(loaders.load_body_part_data)
 
 st.title("Tendances")
 
+start, end = date_window()
+workouts = load_seance_data(start, end)
+series = load_body_part_data(start, end)
+
+st.toggle("Toutes les données", key="raw", help="Une barre par séance, sans regroupement par période")
+
 
 
 st.write("### Progès")
@@ -263,11 +209,11 @@ if "graph" not in st.session_state:
 # ---- Affichage du graphique correspondant ----
 match st.session_state.graph:
     case "Temps":
-        graph_time(workouts)
+        graph_time(workouts, start, end)
     case "Volume":
-        graph_volume(workouts)
+        graph_volume(workouts, start, end)
     case "Séries":
-        graph_series(workouts)
+        graph_series(workouts, start, end)
 
 
 graph_choice()
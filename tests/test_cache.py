@@ -0,0 +1,70 @@
+import threading
+import unittest
+from time import monotonic
+
+from backend.cache import IdentityMap, ReferenceCache
+from backend.models import MuscleGroup
+
+
+
+
+class IdentityMapEvictionTest(unittest.TestCase):
+    """L'éviction d'un objet ne retire pas le nom d'un homonyme encore en cache."""
+
+    def test_evicting_namesake_keeps_survivor(self) -> None:
+        identity_map = IdentityMap(maxsize=2)
+        identity_map.add(MuscleGroup("mg-1", "Dos", "Torse"))
+        identity_map.add(MuscleGroup("mg-2", "Dos", "Torse"))
+        identity_map.add(MuscleGroup("mg-3", "Biceps", "Bras"))
+
+        self.assertIsNone(identity_map.get("mg-1"))
+        self.assertEqual(identity_map.get_by_name("Dos").id, "mg-2")
+
+    def test_evicting_last_holder_drops_name(self) -> None:
+        identity_map = IdentityMap(maxsize=1)
+        identity_map.add(MuscleGroup("mg-1", "Dos", "Torse"))
+        identity_map.add(MuscleGroup("mg-2", "Biceps", "Bras"))
+
+        self.assertIsNone(identity_map.get_by_name("Dos"))
+
+
+
+class ReferenceCacheLookupTest(unittest.TestCase):
+    """Le chargement d'un défaut de cache se fait hors du verrou du cache."""
+
+    def setUp(self) -> None:
+        self.cache = ReferenceCache(db_path=":memory:", check_interval=float("inf"))
+        # Jeton déjà lu : pas d'accès à la base dans `validate`
+        self.cache._checked_at = monotonic()
+        self.cache.muscle_groups.add(MuscleGroup("mg-cached", "Dos", "Torse"))
+
+
+    def test_loader_runs_without_lock(self) -> None:
+        other = {}
+
+        def loader(id: str) -> MuscleGroup:
+            # Un autre thread lit le cache pendant le chargement
+            thread = threading.Thread(target=lambda: other.setdefault("mg", self.cache.muscle_group("mg-cached", loader)))
+            thread.start()
+            thread.join(timeout=1.0)
+            self.assertFalse(thread.is_alive(), "lecture bloquée par le chargement")
+            return MuscleGroup(id, "Biceps", "Bras")
+
+        loaded = self.cache.muscle_group("mg-new", loader)
+        self.assertEqual(other["mg"].id, "mg-cached")
+        self.assertIs(self.cache.muscle_group("mg-new", loader), loaded)
+
+    def test_cleared_during_load_is_not_cached(self) -> None:
+        def loader(id: str) -> MuscleGroup:
+            self.cache.invalidate()
+            self.cache._checked_at = monotonic()
+            return MuscleGroup(id, "Biceps", "Bras")
+
+        self.cache.muscle_group("mg-new", loader)
+        self.assertIsNone(self.cache.muscle_groups.peek("mg-new"))
+
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import sqlite3
+import unittest
+
+from backend.frame import ReferenceTables
+from backend.models_db import init_db
+
+
+
+
+class PrimaryMuscleGroupTest(unittest.TestCase):
+    """Le groupe principal d'un exercice est celui de plus petit `target`."""
+
+    def setUp(self) -> None:
+        self.conn = sqlite3.connect(":memory:")
+        init_db(self.conn)
+        self.conn.executemany("INSERT INTO muscle_group (id, name, body_part) VALUES (?, ?, ?)", [
+            ("mg-triceps", "Triceps", "Bras"),
+            ("mg-pecs", "Pectoraux", "Torse"),
+            ("mg-quads", "Quadriceps", "Jambes"),
+        ])
+        self.conn.executemany("INSERT INTO exercices (id, name, dificulty) VALUES (?, ?, ?)", [
+            ("exo-bench", "Développé Couché", "medium"),
+            ("exo-squat", "Squat", "hard"),
+            ("exo-plank", "Gainage", "easy"),
+        ])
+        self.conn.executemany("INSERT INTO exercice_muscle_group (exercice_id, muscle_group_id, target) VALUES (?, ?, ?)", [
+            ("exo-bench", "mg-pecs", 1),
+            ("exo-bench", "mg-triceps", 3),
+            ("exo-squat", "mg-quads", 1),
+        ])
+
+    def tearDown(self) -> None:
+        self.conn.close()
+
+
+    def primary(self, tables: ReferenceTables, exercise: str) -> str:
+        code = tables.primary_muscle_group[tables.exercice_code(exercise)]
+        return None if code == -1 else tables.muscle_groups[code]
+
+    def test_two_groups_keeps_lowest_target(self) -> None:
+        tables = ReferenceTables.load(self.conn)
+        self.assertEqual(self.primary(tables, "Développé Couché"), "Pectoraux")
+        self.assertEqual(self.primary(tables, "Squat"), "Quadriceps")
+
+    def test_lowest_target_inserted_last(self) -> None:
+        self.conn.execute("UPDATE exercice_muscle_group SET target = 5 WHERE muscle_group_id = 'mg-pecs'")
+        tables = ReferenceTables.load(self.conn)
+        self.assertEqual(self.primary(tables, "Développé Couché"), "Triceps")
+
+    def test_without_group(self) -> None:
+        tables = ReferenceTables.load(self.conn)
+        self.assertIsNone(self.primary(tables, "Gainage"))
+
+
+
+
+if __name__ == "__main__":
+    unittest.main()
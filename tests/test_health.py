@@ -0,0 +1,46 @@
+import sqlite3
+import unittest
+
+from backend.health import INSERT_HEALTH
+from backend.models_db import init_db
+
+
+
+
+class HealthRecordIdentityTest(unittest.TestCase):
+    """Un réimport n'ajoute rien, mais deux mesures d'une même fenêtre sont gardées."""
+
+    HEART_RATE = ("HeartRate", "Apple Watch", "count/min", 60.0, None, 1000, 1060, 900)
+    SLEEP = ("SleepAnalysis", "Apple Watch", None, None, "HKCategoryValueSleepAnalysisAsleepCore", 1000, 4600, 900)
+
+    def setUp(self) -> None:
+        self.conn = sqlite3.connect(":memory:")
+        init_db(self.conn)
+
+    def tearDown(self) -> None:
+        self.conn.close()
+
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM health_records").fetchone()[0]
+
+    def test_reimport_is_ignored(self) -> None:
+        self.conn.executemany(INSERT_HEALTH, [self.HEART_RATE, self.SLEEP])
+        self.conn.executemany(INSERT_HEALTH, [self.HEART_RATE, self.SLEEP])
+        self.assertEqual(self.count(), 2)
+
+    def test_same_window_different_value_is_kept(self) -> None:
+        other = self.HEART_RATE[:3] + (72.0,) + self.HEART_RATE[4:]
+        self.conn.executemany(INSERT_HEALTH, [self.HEART_RATE, other])
+        self.assertEqual(self.count(), 2)
+
+    def test_same_window_different_unit_is_kept(self) -> None:
+        other = self.HEART_RATE[:2] + ("count/s",) + self.HEART_RATE[3:]
+        self.conn.executemany(INSERT_HEALTH, [self.HEART_RATE, other])
+        self.assertEqual(self.count(), 2)
+
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import asyncio
+import unittest
+
+import httpx
+
+from backend.ratelimit import RateLimitedAsyncClient
+from utility.retry import CircuitBreaker
+
+
+
+
+class ThrottledTrialTest(unittest.TestCase):
+    """Un 429 pendant l'essai du semi-ouvert respecte Retry-After au lieu de rouvrir le disjoncteur."""
+
+    def test_429_during_half_open_trial_is_retried(self) -> None:
+        responses = [
+            httpx.Response(429, headers={"Retry-After": "0"}, json={"object": "error", "status": 429, "code": "rate_limited", "message": "slow down"}),
+            httpx.Response(200, json={"object": "page", "id": "p"}),
+        ]
+        transport = httpx.MockTransport(lambda request: responses.pop(0))
+
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10.0)
+        breaker.on_failure()
+        breaker._opened_at -= 10.0
+
+        async def fetch():
+            async with httpx.AsyncClient(transport=transport) as http:
+                client = RateLimitedAsyncClient(auth="x", client=http, rate=1000, burst=100, breaker=breaker)
+                return await client.request("pages/p", "GET")
+
+        self.assertEqual(asyncio.run(fetch())["id"], "p")
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertFalse(responses)
+
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import asyncio
+import unittest
+
+from utility.retry import CircuitBreaker, CircuitOpenError, RetryPolicy, retry
+
+
+
+
+class NotRetryable(Exception):
+    pass
+
+
+POLICIES = {ConnectionError: RetryPolicy(retries=0, jitter=False)}
+
+
+
+class HalfOpenTrialTest(unittest.TestCase):
+    """L'appel d'essai du semi-ouvert doit toujours conclure l'état du disjoncteur."""
+
+    def setUp(self) -> None:
+        self.breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10.0)
+        self.breaker.on_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        # Délai de réouverture écoulé : le prochain appel est l'essai
+        self.breaker._opened_at -= 10.0
+
+
+    def test_sync_non_retryable_error_reopens(self) -> None:
+        @retry(policies=POLICIES, breaker=self.breaker)
+        def call():
+            raise NotRetryable()
+
+        with self.assertRaises(NotRetryable):
+            call()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+        # Pas bloqué en semi-ouvert : un nouvel essai est permis après le délai
+        self.breaker._opened_at -= 10.0
+        ok = retry(policies=POLICIES, breaker=self.breaker)(lambda: "ok")
+        self.assertEqual(ok(), "ok")
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_async_cancelled_trial_reopens(self) -> None:
+        @retry(policies=POLICIES, breaker=self.breaker)
+        async def call():
+            raise asyncio.CancelledError()
+
+        with self.assertRaises(asyncio.CancelledError):
+            asyncio.run(call())
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+    def test_open_circuit_short_circuits(self) -> None:
+        self.breaker._opened_at += 10.0
+        with self.assertRaises(CircuitOpenError):
+            retry(policies=POLICIES, breaker=self.breaker)(lambda: "ok")()
+
+    def test_neutral_error_allows_next_trial(self) -> None:
+        @retry(policies=POLICIES, breaker=self.breaker, neutral=lambda e: isinstance(e, NotRetryable))
+        def call():
+            raise NotRetryable()
+
+        with self.assertRaises(NotRetryable):
+            call()
+        # Pas de nouveau délai : l'appel suivant est un nouvel essai
+        ok = retry(policies=POLICIES, breaker=self.breaker)(lambda: "ok")
+        self.assertEqual(ok(), "ok")
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_retryable_failure_reopens(self) -> None:
+        @retry(policies=POLICIES, breaker=self.breaker)
+        def call():
+            raise ConnectionError()
+
+        with self.assertRaises(ConnectionError):
+            call()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import sqlite3
+import time
+import unittest
+from datetime import date, datetime as dt
+
+from backend.models_db import init_db
+from backend.rollups import EPOCH, rebuild_rollups, refresh_rollups
+
+
+
+
+class LocalDayTest(unittest.TestCase):
+    """Les agrégats sont rangés par jour et semaine locaux, comme les dates des pages."""
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.previous_tz = os.environ.get("TZ")
+        os.environ["TZ"] = "Europe/Paris"
+        time.tzset()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        if cls.previous_tz is None:
+            del os.environ["TZ"]
+        else:
+            os.environ["TZ"] = cls.previous_tz
+        time.tzset()
+
+
+    def setUp(self) -> None:
+        self.conn = sqlite3.connect(":memory:")
+        init_db(self.conn)
+        # Lundi 1er juillet 2024, 00h30 à Paris : dimanche 30 juin 22h30 UTC
+        self.date_ts = int(dt(2024, 7, 1, 0, 30).timestamp())
+        self.conn.execute(
+            "INSERT INTO seances (id, name, date_ts, body_part, duration) VALUES ('w', 'Lower', ?, 'Lower Body', 3600)",
+            (self.date_ts,)
+        )
+
+    def tearDown(self) -> None:
+        self.conn.close()
+
+
+    def assert_local_day(self) -> None:
+        monday = (date(2024, 7, 1) - EPOCH).days
+        self.assertEqual(self.conn.execute("SELECT day, week FROM rollup_seance").fetchone(), (monday, monday))
+        self.assertEqual(self.conn.execute("SELECT day FROM rollup_day").fetchall(), [(monday,)])
+        self.assertEqual(self.conn.execute("SELECT week FROM rollup_week").fetchall(), [(monday,)])
+
+    def test_refresh_uses_local_day(self) -> None:
+        refresh_rollups(self.conn, ["w"])
+        self.assert_local_day()
+
+    def test_rebuild_uses_local_day(self) -> None:
+        rebuild_rollups(self.conn)
+        self.assert_local_day()
+
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,41 @@
 from .jsonfile import JsonFile
+from .jsonpath import (
+    JsonPath,
+    JsonPathError,
+    Extractor,
+    FailureLog,
+    compile_path,
+)
 
 from .applehealth import HealthRecord
 
 from .tools import (
     timer_performance, 
     timer_performance_ns, 
-    retry
-)
\ No newline at end of file
+)
+
+from .retry import (
+    retry,
+    RetryPolicy,
+    RetryBudget,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+
+
+__all__ = [
+    "JsonFile",
+    "JsonPath",
+    "JsonPathError",
+    "Extractor",
+    "FailureLog",
+    "compile_path",
+    "HealthRecord",
+    "timer_performance",
+    "timer_performance_ns",
+    "retry",
+    "RetryPolicy",
+    "RetryBudget",
+    "CircuitBreaker",
+    "CircuitOpenError",
+]
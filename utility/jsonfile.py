@@ -1,5 +1,6 @@
 
 import json
+from .jsonpath import compile_path, JsonPathError
 from logs.logger_config import setup_logger
 
 logger = setup_logger()
@@ -37,23 +38,21 @@ class JsonFile:
         """Renvoie un élément précis de données au format json
 
         data = {'a':{'b':[{'c':1}]}}
-        safe_get(data, 'a.b.0.C') -> 1
+        safe_get(data, 'a.b.0.c') -> 1
+
+        Le chemin est compilé une fois puis mis en cache (voir `JsonPath`). Si
+        une clé manque, les données sont sauvegardées dans error_data.json et
+        None est renvoyé ; dans une boucle, préférer `JsonPath` ou `Extractor`.
         Args:
             data (dict | list): Les données à traiter
             dot_chained_keys (str): Les clés d'accès sous forme de chaine str
 
         Returns:
-            _type_: L'élément cherché
+            _type_: L'élément cherché, None s'il est introuvable
         """
-        original_data = data
-        keys = dot_chained_keys.split('.')
-        for key in keys:
-            try:
-                data = data[int(key)] if isinstance(data,list) else data[key]
-            except (KeyError, TypeError, IndexError, ValueError) as error:
-                logger.error(f"{error.__class__.__name__} {error}")
-                JsonFile.write(original_data, "error_data")
-                logger.warning(original_data)
-                logger.warning(dot_chained_keys)
-                logger.warning(key)
-        return data
+        try:
+            return compile_path(dot_chained_keys).resolve(data)
+        except JsonPathError as error:
+            logger.error(f"{error.__class__.__name__} {error}")
+            JsonFile.write(data, "error_data")
+            return None
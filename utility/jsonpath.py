@@ -0,0 +1,219 @@
+import json
+import threading
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Mapping
+from logs.logger_config import setup_logger
+
+logger = setup_logger()
+
+
+_MISSING = object()
+
+
+
+
+class JsonPathError(KeyError):
+    """Exception levée par `JsonPath.resolve` lorsqu'une étape du chemin est introuvable."""
+    def __init__(self, path: str, step: int) -> None:
+        self.path = path
+        self.step = step
+        super().__init__(f"{path!r}: étape {step} ({path.split('.')[step]!r}) introuvable")
+
+
+
+class JsonPath:
+    """Chemin pointé pré-compilé vers une valeur JSON.
+
+    JsonPath("properties.Name.title.0.plain_text").get(page)
+
+    Le chemin est découpé une seule fois en étapes (clé, index) ; une étape
+    numérique indexe une liste et sert de clé dans un dict, comme `JsonFile.safe_get`.
+    L'accès ne lève pas d'exception : une valeur manquante renvoie `default`.
+    """
+    __slots__ = ("path", "steps")
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.steps: tuple[tuple[str, int | None], ...] = tuple(_compile_step(key) for key in path.split("."))
+
+
+    def __repr__(self) -> str:
+        return f"JsonPath({self.path!r})"
+
+    def _walk(self, data: Any) -> tuple[Any, int]:
+        """(valeur, -1) si trouvée, sinon (_MISSING, indice de l'étape en échec)"""
+        for i, (key, index) in enumerate(self.steps):
+            data = _step(data, key, index)
+            if data is _MISSING:
+                return _MISSING, i
+        return data, -1
+
+    def get(self, data: Any, default: Any=None) -> Any:
+        value, _ = self._walk(data)
+        return default if value is _MISSING else value
+
+    __call__ = get
+
+    def resolve(self, data: Any) -> Any:
+        """Comme `get`, mais lève `JsonPathError` en précisant l'étape manquante"""
+        value, failed = self._walk(data)
+        if value is _MISSING:
+            raise JsonPathError(self.path, failed)
+        return value
+
+
+
+def _compile_step(key: str) -> tuple[str, int | None]:
+    try:
+        return key, int(key)
+    except ValueError:
+        return key, None
+
+def _step(data: Any, key: str, index: int | None) -> Any:
+    if type(data) is dict:
+        return data.get(key, _MISSING)
+    if type(data) is list and index is not None and -len(data) <= index < len(data):
+        return data[index]
+    return _MISSING
+
+
+@lru_cache(maxsize=1024)
+def compile_path(path: str) -> JsonPath:
+    """`JsonPath` partagé pour `path`, compilé au premier appel"""
+    return JsonPath(path)
+
+
+
+
+@dataclass
+class ExtractionFailure:
+    field: str
+    path: str
+    document: Any
+
+
+
+class FailureLog:
+    """Échecs d'extraction gardés en mémoire (bornés), écrits sur disque à la demande.
+
+    Remplace l'écriture de `error_data.json` à chaque valeur manquante : le coût
+    dans la boucle d'extraction se limite à un ajout dans une deque.
+    """
+    def __init__(self, maxlen: int=100) -> None:
+        self.failures: deque[ExtractionFailure] = deque(maxlen=maxlen)
+        self.count = 0
+        self._lock = threading.Lock()
+
+
+    def __len__(self) -> int:
+        return self.count
+
+    def record(self, field: str, path: str, document: Any) -> None:
+        with self._lock:
+            self.failures.append(ExtractionFailure(field, path, document))
+            self.count += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self.failures.clear()
+            self.count = 0
+
+    def dump(self, path: str="error_data") -> None:
+        """Écrit les derniers échecs dans `<path>.json` et les résume dans les logs"""
+        with self._lock:
+            if not self.failures:
+                return
+            failures = list(self.failures)
+            count = self.count
+
+        logger.warning(f"{count} extraction failures, last {len(failures)} written to {path}.json")
+        with open(f"{path}.json", "w") as f:
+            json.dump([{"field": f.field, "path": f.path, "document": f.document} for f in failures], f, indent=4, default=str)
+
+
+
+
+class Extractor:
+    """Extrait plusieurs champs d'un document en un seul parcours.
+
+    Les chemins sont rangés en arbre : un préfixe commun (`properties.Date.date`
+    pour `start` et `end`) n'est parcouru qu'une fois.
+
+    Args:
+        fields (Mapping[str, str]): Nom du champ -> chemin pointé
+        required (tuple[str], optional): Champs dont l'absence est enregistrée dans `failures`.
+            Defaults to tous les champs.
+        failures (FailureLog, optional): Journal des champs requis manquants. Defaults to None.
+    """
+    def __init__(self, fields: Mapping[str, str], required: tuple[str, ...]=None, failures: FailureLog=None) -> None:
+        self.fields = dict(fields)
+        self.required = tuple(fields) if required is None else tuple(required)
+        self.failures = failures
+        self._tree: dict = {}
+
+        for name, path in self.fields.items():
+            node = self._tree
+            for step in JsonPath(path).steps:
+                child = node.setdefault(step, ([], {}))
+                node = child[1]
+            child[0].append(name)
+
+
+    def _walk(self, node: dict, data: Any, out: dict) -> None:
+        for (key, index), (names, children) in node.items():
+            value = _step(data, key, index)
+            if value is _MISSING:
+                continue
+            for name in names:
+                out[name] = value
+            if children:
+                self._walk(children, value, out)
+
+    def extract(self, data: Any) -> dict[str, Any]:
+        """Valeurs des champs ; un champ manquant vaut None"""
+        out = dict.fromkeys(self.fields)
+        found: dict[str, Any] = {}
+        self._walk(self._tree, data, found)
+        out.update(found)
+
+        if self.failures is not None and len(found) < len(self.fields):
+            for name in self.required:
+                if name not in found:
+                    self.failures.record(name, self.fields[name], data)
+        return out
+
+    __call__ = extract
+
+    def extract_many(self, documents: list) -> dict[str, list]:
+        """Valeurs des champs pour une liste de documents, une liste par champ.
+
+        Chaque étape du chemin est appliquée à toute la colonne d'un coup, sans
+        appel de fonction par document ; un champ manquant vaut None.
+        """
+        out = {name: [None] * len(documents) for name in self.fields}
+        self._walk_many(self._tree, documents, out)
+        for name, values in out.items():
+            if self.failures is not None and name in self.required:
+                for document, value in zip(documents, values):
+                    if value is _MISSING:
+                        self.failures.record(name, self.fields[name], document)
+            out[name] = [None if value is _MISSING else value for value in values]
+        return out
+
+    def _walk_many(self, node: dict, column: list, out: dict) -> None:
+        for (key, index), (names, children) in node.items():
+            if index is None:
+                values = [value.get(key, _MISSING) if type(value) is dict else _MISSING for value in column]
+            else:
+                values = [
+                    value.get(key, _MISSING) if type(value) is dict
+                    else value[index] if type(value) is list and -len(value) <= index < len(value)
+                    else _MISSING
+                    for value in column
+                ]
+            for name in names:
+                out[name] = values
+            if children:
+                self._walk_many(children, values, out)
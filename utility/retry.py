@@ -0,0 +1,244 @@
+import asyncio
+import random
+import threading
+from dataclasses import dataclass
+from functools import wraps
+from inspect import iscoroutinefunction
+from time import monotonic, sleep
+from typing import Callable
+from logs.logger_config import setup_logger
+
+logger = setup_logger()
+
+
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Nombre d'essais et délais d'attente pour un type d'erreur.
+
+    Le délai avant la tentative n+1 vaut `base_delay * multiplier**n`, plafonné
+    à `max_delay`, puis tiré uniformément entre 0 et cette valeur si `jitter`.
+    """
+    retries: int = 3
+    base_delay: float = 1.0
+    multiplier: float = 2.0
+    max_delay: float = 30.0
+    jitter: bool = True
+
+    def delay(self, attempt: int) -> float:
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** attempt)
+        return random.uniform(0, delay) if self.jitter else delay
+
+
+
+class RetryBudget:
+    """Limite la part de nouvelles tentatives par rapport aux appels.
+
+    Chaque appel crédite `ratio` jeton (plafonné à `max_tokens`) et chaque
+    nouvelle tentative en consomme un : en cas de panne franche, on cesse de
+    réessayer au lieu de multiplier la charge.
+    """
+    def __init__(self, ratio: float=0.2, max_tokens: float=10.0) -> None:
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._lock = threading.Lock()
+
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+
+class CircuitOpenError(RuntimeError):
+    """Exception levée lorsqu'un appel est court-circuité par un disjoncteur ouvert."""
+    pass
+
+
+
+class CircuitBreaker:
+    """Disjoncteur : après `failure_threshold` échecs consécutifs, les appels
+    échouent immédiatement pendant `reset_timeout` secondes, puis un seul appel
+    d'essai est autorisé (semi-ouvert) pour décider de refermer ou non.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, name: str, failure_threshold: int=5, reset_timeout: float=30.0) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+
+    def before_call(self) -> bool:
+        """Autorise ou court-circuite un appel.
+
+        Returns:
+            bool: True si l'appel est l'essai du semi-ouvert, qui doit se conclure par `end_trial`
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return False
+            if self.state == self.OPEN and monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                logger.info(f"Circuit {self.name} half-open, trying one call")
+                return True
+            raise CircuitOpenError(f"Circuit {self.name} ouvert, appel court-circuité.")
+
+    def end_trial(self, neutral: bool=False) -> None:
+        """Fin de l'appel d'essai : s'il n'a été conclu ni par `on_success` ni par
+        `on_failure` (erreur sans politique, annulation...), le circuit se rouvre
+        au lieu de rester semi-ouvert et de tout refuser indéfiniment.
+
+        Args:
+            neutral (bool, optional): L'essai n'a rien appris de l'état du service
+                (429 par exemple) : le prochain appel est un nouvel essai, sans
+                attendre `reset_timeout`. Defaults to False.
+        """
+        with self._lock:
+            if self.state != self.HALF_OPEN:
+                return
+            self.state = self.OPEN
+            if neutral:
+                logger.info(f"Circuit {self.name} trial call throttled, next call is a new trial")
+                self._opened_at = monotonic() - self.reset_timeout
+            else:
+                logger.warning(f"Circuit {self.name} trial call ended without result, open for {self.reset_timeout}s")
+                self._opened_at = monotonic()
+
+    def on_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit {self.name} closed")
+            self.state = self.CLOSED
+            self._failures = 0
+
+    def on_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit {self.name} open for {self.reset_timeout}s after {self._failures} failures")
+                self.state = self.OPEN
+                self._opened_at = monotonic()
+
+
+
+
+def _policy_for(error: BaseException, policies: dict[type[BaseException], RetryPolicy | None]) -> RetryPolicy | None:
+    for exc_type, policy in policies.items():
+        if isinstance(error, exc_type):
+            return policy
+    return None
+
+
+def retry(func: Callable=None, *, retries: int=3, delay: float=1.0, policies: dict[type[BaseException], RetryPolicy | None]=None, budget: RetryBudget=None, breaker: CircuitBreaker=None, neutral: Callable[[Exception], bool]=None):
+    """Réessaie une fonction, synchrone ou `async def`, en cas d'erreur.
+
+    Utilisable nu (`@retry`) ou paramétré (`@retry(retries=5, policies=...)`).
+    Sans `policies`, toute `Exception` est réessayée avec un backoff exponentiel
+    à partir de `delay`. Après le dernier essai, l'erreur est relancée.
+
+    Args:
+        retries (int, optional): Nombre de nouvelles tentatives par défaut. Defaults to 3.
+        delay (float, optional): Délai de base du backoff en secondes. Defaults to 1.0.
+        policies (dict, optional): Politique par type d'exception, la première correspondante
+            s'applique ; None exclut un type et les erreurs sans politique ne sont pas réessayées.
+        budget (RetryBudget, optional): Budget de tentatives partagé entre appels.
+        breaker (CircuitBreaker, optional): Disjoncteur partagé entre appels.
+        neutral (Callable, optional): Reconnaît les erreurs qui ne disent rien de la santé
+            du service (limitation de débit) : jamais comptées comme échec, et un essai
+            du disjoncteur qui en reçoit une laisse le suivant se faire aussitôt.
+    """
+    policies = policies if policies is not None else {Exception: RetryPolicy(retries=retries, base_delay=delay)}
+
+    def decorator(func: Callable) -> Callable:
+        def next_delay(error: Exception, attempt: int) -> float | None:
+            """Délai avant la prochaine tentative, None si l'erreur doit être relancée"""
+            policy = _policy_for(error, policies)
+            if policy is None or isinstance(error, CircuitOpenError) or (neutral is not None and neutral(error)):
+                return None
+            if breaker is not None:
+                breaker.on_failure()
+            if attempt >= policy.retries:
+                return None
+            if budget is not None and not budget.withdraw():
+                logger.warning(f"{func.__name__}: retry budget exhausted")
+                return None
+            wait = policy.delay(attempt)
+            logger.warning(f"{func.__name__}: attempt {attempt + 1} failed: {error!r}. Retrying in {wait:.2f} seconds...")
+            return wait
+
+        def before_call() -> bool:
+            return breaker.before_call() if breaker is not None else False
+
+        def end_call(trial: bool, error: Exception) -> None:
+            if trial:
+                breaker.end_trial(neutral=error is not None and neutral is not None and neutral(error))
+
+        def on_success() -> None:
+            if breaker is not None:
+                breaker.on_success()
+
+        if iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if budget is not None:
+                    budget.deposit()
+                attempt = 0
+                while True:
+                    trial = before_call()
+                    error = None
+                    try:
+                        res = await func(*args, **kwargs)
+                    except Exception as e:
+                        error = e
+                        wait = next_delay(e, attempt)
+                        if wait is None:
+                            raise
+                    else:
+                        on_success()
+                        return res
+                    finally:
+                        end_call(trial, error)
+                    attempt += 1
+                    await asyncio.sleep(wait)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if budget is not None:
+                budget.deposit()
+            attempt = 0
+            while True:
+                trial = before_call()
+                error = None
+                try:
+                    res = func(*args, **kwargs)
+                except Exception as e:
+                    error = e
+                    wait = next_delay(e, attempt)
+                    if wait is None:
+                        raise
+                else:
+                    on_success()
+                    return res
+                finally:
+                    end_call(trial, error)
+                attempt += 1
+                sleep(wait)
+        return wrapper
+
+    return decorator(func) if func is not None else decorator